@@ -11,39 +11,33 @@ from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods, require_POST
 from django.views.decorators.csrf import csrf_exempt
-from django.db import transaction
+from django.db.models import Q
 import json
 import logging
-import requests
-from django.conf import settings
 
 logger = logging.getLogger(__name__) # Inicializa el logger
-from apps.catalog.models import Producto, Categoria # Importa Categoria para usarla en generate_response
+from apps.catalog import imagenes
+from apps.catalog.models import Producto
+from apps.core import recaptcha
+from apps.catalog.resolver import ids_categoria_exacta
 from apps.orders.models import Carrito, ItemCarrito
+from apps.orders.cart import CartSnapshot, fusionar_carrito_sesion
+from apps.orders.ranking import top_productos
 
 def verificar_recaptcha(recaptcha_response):
     """
     Valida la respuesta del reCAPTCHA con los servidores de Google.
     """
-    secret_key = getattr(settings, 'RECAPTCHA_PRIVATE_KEY', None)
-    if not secret_key:
-        logger.error("RECAPTCHA_PRIVATE_KEY no configurada en settings.")
+    resultado = recaptcha.verificar(recaptcha_response)
+    if resultado == recaptcha.SIN_CONFIGURAR:
         return False, "El servidor no tiene configurado el servicio de seguridad."
-    
-    if not recaptcha_response:
+    if resultado == recaptcha.SIN_TOKEN:
         return False, "Por favor, completa la verificación de seguridad (CAPTCHA)."
-        
-    try:
-        data = {'secret': secret_key, 'response': recaptcha_response}
-        r = requests.post('https://www.google.com/recaptcha/api/siteverify', data=data, timeout=5)
-        r.raise_for_status()
-        result = r.json()
-        if not result.get('success'):
-            return False, "Verificación de seguridad inválida. Inténtalo de nuevo."
-        return True, None
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error de conexión con Google reCAPTCHA: {str(e)}")
+    if resultado == recaptcha.INVALIDO:
+        return False, "Verificación de seguridad inválida. Inténtalo de nuevo."
+    if resultado == recaptcha.ERROR_CONEXION:
         return False, "No se pudo conectar con el servicio de seguridad."
+    return True, None
 
 # ============================================================
 # VISTAS DE AUTENTICACIÓN FRONTEND
@@ -211,21 +205,8 @@ def migrar_carrito_sesion(request, user):
     
     try:
         carrito_user = Carrito.objects.get(usuario=user)
-        
-        with transaction.atomic():
-            for producto_id, cantidad in carrito_sesion.items():
-                try:
-                    producto = Producto.objects.get(id=int(producto_id))
-                    item, created = ItemCarrito.objects.get_or_create(
-                        carrito=carrito_user,
-                        producto=producto,
-                        defaults={'cantidad': 0}
-                    )
-                    # Sumar cantidades si el item ya existía
-                    item.cantidad += int(cantidad)
-                    item.save()
-                except Producto.DoesNotExist:
-                    continue
+        # Validación, lectura y upsert en bloque, en una sola transacción
+        fusionar_carrito_sesion(carrito_user, carrito_sesion)
         
         # Limpiar sesión
         guardar_carrito_sesion(request, {})
@@ -261,52 +242,14 @@ def obtener_carrito(request):
         # Carrito persistente
         try:
             carrito = Carrito.objects.get(usuario=request.user)
-            items = []
-            for item in carrito.items.all():
-                items.append({
-                    'id': item.id,
-                    'producto_id': item.producto.id,
-                    'nombre': item.producto.nombre,
-                    'precio': float(item.producto.precio),
-                    'cantidad': item.cantidad,
-                    'subtotal': float(item.subtotal),
-                })
-            
-            return JsonResponse({
-                'exito': True,
-                'items': items,
-                'total': float(carrito.total),
-                'cantidad_items': carrito.cantidad_items,
-            })
+            return JsonResponse(CartSnapshot.de_carrito(carrito).como_dict())
         except Carrito.DoesNotExist:
             return JsonResponse({'exito': False, 'error': 'Carrito no encontrado'})
     else:
-        # Carrito de sesión
-        carrito_sesion = obtener_carrito_sesion(request)
-        items = []
-        total = 0
-        
-        for producto_id, cantidad in carrito_sesion.items():
-            try:
-                producto = Producto.objects.get(id=int(producto_id))
-                subtotal = float(producto.precio) * cantidad
-                items.append({
-                    'producto_id': producto.id,
-                    'nombre': producto.nombre,
-                    'precio': float(producto.precio),
-                    'cantidad': cantidad,
-                    'subtotal': subtotal,
-                })
-                total += subtotal
-            except Producto.DoesNotExist:
-                continue
-        
-        return JsonResponse({
-            'exito': True,
-            'items': items,
-            'total': total,
-            'cantidad_items': len(items),  # Ojo: corregido para que el frontend lo use
-        })
+        # Carrito de sesión: todos los productos en una sola consulta
+        payload = CartSnapshot.de_sesion(obtener_carrito_sesion(request)).como_dict()
+        payload['cantidad_items'] = len(payload['items'])  # Ojo: corregido para que el frontend lo use
+        return JsonResponse(payload)
 
 
 def agregar_carrito(request):
@@ -434,25 +377,13 @@ def carrito_view(request):
     """
     if request.user.is_authenticated:
         carrito = Carrito.objects.get(usuario=request.user)
-        items = carrito.items.all()
-        total = carrito.total
+        snapshot = CartSnapshot.de_carrito(carrito)
+        items = snapshot.items
+        total = snapshot.total
     else:
-        carrito_sesion = obtener_carrito_sesion(request)
-        items = []
-        total = 0
-        
-        for producto_id, cantidad in carrito_sesion.items():
-            try:
-                producto = Producto.objects.get(id=int(producto_id))
-                subtotal = producto.precio * cantidad
-                items.append({
-                    'producto': producto,
-                    'cantidad': cantidad,
-                    'subtotal': subtotal,
-                })
-                total += subtotal
-            except Producto.DoesNotExist:
-                continue
+        snapshot = CartSnapshot.de_sesion(obtener_carrito_sesion(request))
+        items = snapshot.items
+        total = snapshot.total
     
     return render(request, 'carrito.html', {
         'items': items,
@@ -533,12 +464,12 @@ def generate_response(intent, message, user):
                 break
 
         if found_aroma_category:
-            # Intenta encontrar una categoría coincidente en la base de datos
-            categoria_obj = Categoria.objects.filter(Q(nombre__iexact=found_aroma_category) | Q(slug__iexact=found_aroma_category)).first()
+            # Intenta encontrar una categoría coincidente en la tabla de categorías en memoria
+            cat_ids = ids_categoria_exacta(found_aroma_category)
             
             productos = Producto.objects.none() # Inicializa un queryset vacío
-            if categoria_obj:
-                productos = Producto.objects.filter(Q(categoria=categoria_obj) | Q(categorias_secundarias=categoria_obj)).distinct()[:5]
+            if cat_ids:
+                productos = Producto.objects.filter(Q(categoria_id=cat_ids[0]) | Q(categorias_secundarias=cat_ids[0])).distinct()[:5]
             else:
                 # Fallback para descripciones generales de aroma si no es un nombre de categoría directo
                 productos = Producto.objects.filter(descripcion__icontains=found_aroma_category).distinct()[:5]
@@ -549,7 +480,8 @@ def generate_response(intent, message, user):
                         "id": producto.id,
                         "nombre": producto.nombre,
                         "precio": f"{producto.precio:.2f}",
-                        "imagen": producto.imagen.url if producto.imagen else ""
+                        "imagen": producto.imagen.url if producto.imagen else "",
+                        "imagen_miniatura": imagenes.url(producto) or "",
                     }
                     for producto in productos
                 ]
@@ -562,14 +494,15 @@ def generate_response(intent, message, user):
         return {"reply": "No encontré productos con esas características de aroma."}
 
     elif intent == "best_sellers": # Manejador para el nuevo intento "best_sellers"
-        productos_list = Producto.objects.filter(activo=True).order_by('-creado_en')[:5] # Limitar a 5 para el chatbot
-        if productos_list.exists():
+        productos_list = top_productos(5) # Limitar a 5 para el chatbot
+        if productos_list:
             productos_data = [
                 {
                     "id": producto.id,
                     "nombre": producto.nombre,
                     "precio": f"{producto.precio:.2f}",
-                    "imagen": producto.imagen.url if producto.imagen else ""
+                    "imagen": producto.imagen.url if producto.imagen else "",
+                    "imagen_miniatura": imagenes.url(producto) or "",
                 }
                 for producto in productos_list
             ]
@@ -1,3 +1,592 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from http.server import ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from apps.catalog import imagenes
+from apps.catalog.models import Categoria, Marca, Producto
+from apps.core import backup, hunter, media_s3, recaptcha
+from apps.core.management.commands.fake_hunter import HunterFalso
+from apps.core.management.commands.fake_s3 import S3Falso
+from apps.core.models import ValidacionEmail
+from apps.core.models import Job
+from apps.orders import payments, webhooks
+from apps.orders.management.commands.fake_mercadopago import MercadoPagoFalso
+from apps.orders.models import Carrito, DetallePedido, ItemCarrito, Pago, Pedido, WebhookEvent
+
+
+class HistorialPedidosConsultasTest(TestCase):
+    """
+    El historial de pedidos hace una cantidad fija de consultas, sin importar
+    cuántos pedidos o líneas tenga el usuario (ver `apps.orders.history`).
+    """
+
+    # Listado: solo la tabla de pedidos (resumen desnormalizado)
+    CONSULTAS_LISTADO = 1
+    # Detalle: pedido + usuario + pago, líneas con producto/marca/categoría y categorías secundarias
+    CONSULTAS_DETALLE = 3
+    ENDPOINTS = ('/api/pedidos/', '/api/core/pedidos/')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('cliente', 'cliente@example.com', 'clave-segura')
+        marca = Marca.objects.create(nombre='Marca')
+        categoria = Categoria.objects.create(nombre='Florales')
+        secundaria = Categoria.objects.create(nombre='Noche')
+        cls.productos = []
+        for i in range(4):
+            producto = Producto.objects.create(
+                nombre=f'Perfume {i}', sku=f'SKU-{i}', precio=Decimal('10.00'),
+                marca=marca, categoria=categoria, stock=100,
+            )
+            producto.categorias_secundarias.add(secundaria)
+            cls.productos.append(producto)
+
+    def setUp(self):
+        self.cliente = APIClient()
+        self.cliente.force_authenticate(self.usuario)
+
+    def crear_pedidos(self, cantidad, lineas=3):
+        inicio = Pedido.objects.count()
+        for n in range(inicio, inicio + cantidad):
+            pedido = Pedido.objects.create(
+                usuario=self.usuario, numero_pedido=f'PED-{n:05d}', total=Decimal('30.00'),
+                direccion_envio='Calle 1', telefono='5550000',
+            )
+            DetallePedido.objects.bulk_create([
+                DetallePedido(
+                    pedido=pedido, producto=producto, cantidad=1,
+                    precio_unitario=producto.precio, subtotal=producto.precio,
+                )
+                for producto in self.productos[:lineas]
+            ])
+            Pago.objects.create(pedido=pedido, monto=pedido.total)
+        return Pedido.objects.filter(usuario=self.usuario).order_by('-id').first()
+
+    def test_listado_con_consultas_fijas(self):
+        for cantidad in (2, 15):
+            self.crear_pedidos(cantidad)
+            for endpoint in self.ENDPOINTS:
+                with self.subTest(pedidos=Pedido.objects.count(), endpoint=endpoint):
+                    with self.assertNumQueries(self.CONSULTAS_LISTADO):
+                        respuesta = self.cliente.get(endpoint)
+                    self.assertEqual(respuesta.status_code, 200)
+                    self.assertEqual(len(respuesta.json()['results']), Pedido.objects.count())
+
+    def test_detalle_con_consultas_fijas(self):
+        for lineas in (1, 4):
+            pedido = self.crear_pedidos(1, lineas=lineas)
+            for endpoint in self.ENDPOINTS:
+                with self.subTest(lineas=lineas, endpoint=endpoint):
+                    with self.assertNumQueries(self.CONSULTAS_DETALLE):
+                        respuesta = self.cliente.get(f'{endpoint}{pedido.id}/')
+                    self.assertEqual(respuesta.status_code, 200)
+                    self.assertEqual(len(respuesta.json()['detalles']), lineas)
+
+
+@override_settings(RECAPTCHA_PRIVATE_KEY='secreto', RECAPTCHA_BACKEND='google')
+class RecaptchaTest(TestCase):
+    """Un token aceptado no se puede reutilizar desde la caché."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_token_aceptado_no_se_reutiliza(self):
+        # Google acepta el token la primera vez y lo rechaza como duplicado después
+        with mock.patch.object(recaptcha.GoogleBackend, 'verificar_token', side_effect=[True, False]) as google:
+            self.assertEqual(recaptcha.verificar('token'), recaptcha.OK)
+            self.assertEqual(recaptcha.verificar('token'), recaptcha.INVALIDO)
+        self.assertEqual(google.call_count, 2)
+
+    def test_token_rechazado_se_cachea(self):
+        with mock.patch.object(recaptcha.GoogleBackend, 'verificar_token', return_value=False) as google:
+            self.assertEqual(recaptcha.verificar('malo'), recaptcha.INVALIDO)
+            self.assertEqual(recaptcha.verificar('malo'), recaptcha.INVALIDO)
+        self.assertEqual(google.call_count, 1)
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET='whsec_prueba', JOBS_SINCRONICO=False)
+class WebhookStripeTest(TestCase):
+    """
+    El endpoint de webhooks guarda los eventos firmados y la cola los procesa
+    una sola vez, en orden, sin que un evento defectuoso bloquee al resto.
+    """
+
+    def setUp(self):
+        self.cliente = APIClient()
+        usuario = User.objects.create_user('pagador', 'pagador@example.com', 'clave-segura')
+        self.pedidos = []
+        for n in range(2):
+            pedido = Pedido.objects.create(
+                usuario=usuario, numero_pedido=f'PED-WH-{n}', total=Decimal('50.00'),
+                direccion_envio='Calle 1', telefono='5550000',
+            )
+            Pago.objects.create(pedido=pedido, monto=pedido.total, stripe_payment_intent_id=f'pi_{n}')
+            self.pedidos.append(pedido)
+
+    def enviar(self, evento_id, tipo, objeto, creado=None):
+        cuerpo = json.dumps({
+            'id': evento_id, 'type': tipo, 'created': creado or int(time.time()), 'data': {'object': objeto},
+        })
+        marca = int(time.time())
+        firma = hmac.new(b'whsec_prueba', f'{marca}.{cuerpo}'.encode(), hashlib.sha256).hexdigest()
+        respuesta = self.cliente.post(
+            '/api/pago/webhook/', cuerpo, content_type='application/json',
+            HTTP_STRIPE_SIGNATURE=f't={marca},v1={firma}',
+        )
+        self.assertEqual(respuesta.status_code, 200)
+
+    def exitoso(self, evento_id, n=0, creado=None):
+        self.enviar(evento_id, 'payment_intent.succeeded', {
+            'id': f'pi_{n}', 'status': 'succeeded', 'payment_method_details': {'type': 'card'},
+        }, creado)
+
+    def test_evento_duplicado_no_se_reprocesa(self):
+        self.exitoso('evt_1')
+        self.assertEqual(webhooks.procesar_pendientes(), {'procesado': 1, 'ignorado': 0, 'sin_pago': 0})
+        self.exitoso('evt_1')
+        self.assertEqual(webhooks.procesar_pendientes(), {})
+
+        evento = WebhookEvent.objects.get()
+        self.assertEqual((evento.estado, evento.intentos), ('procesado', 1))
+        self.assertEqual(Job.objects.filter(tarea='procesar_webhooks').count(), 1)
+
+    def test_fallo_tardio_no_revierte_el_exito(self):
+        ahora = int(time.time())
+        self.exitoso('evt_ok', creado=ahora)
+        webhooks.procesar_pendientes()
+        self.enviar('evt_fallo', 'payment_intent.payment_failed', {
+            'id': 'pi_0', 'status': 'requires_payment_method',
+            'last_payment_error': {'message': 'Tarjeta rechazada'},
+        }, creado=ahora - 60)
+        webhooks.procesar_pendientes()
+
+        pago = Pago.objects.select_related('pedido').get(stripe_payment_intent_id='pi_0')
+        self.assertEqual((pago.estado, pago.razon_fallo), ('exitoso', None))
+        self.assertEqual(pago.pedido.estado, 'procesando')
+
+    def test_evento_defectuoso_no_bloquea_el_lote(self):
+        self.exitoso('evt_0', n=0)
+        # Sin id de PaymentIntent: rompe el procesamiento del lote completo
+        self.enviar('evt_roto', 'payment_intent.succeeded', {'status': 'succeeded'})
+        self.exitoso('evt_1', n=1)
+        with self.assertLogs('apps.orders.webhooks', 'ERROR'):
+            totales = webhooks.procesar_pendientes()
+
+        self.assertEqual((totales['procesado'], totales['fallido']), (2, 1))
+        self.assertEqual(WebhookEvent.objects.get(evento_id='evt_roto').estado, 'fallido')
+        self.assertEqual(
+            set(Pago.objects.values_list('estado', flat=True)), {'exitoso'},
+        )
+
+
+@override_settings(PAGOS_FRESCURA=60)
+class VerificarPagoTest(TestCase):
+    """El polling de `/api/pago/verificar/` consulta a Stripe como mucho una vez por ventana."""
+
+    def setUp(self):
+        cache.clear()
+        self.cliente = APIClient()
+        usuario = User.objects.create_user('sondeo', 'sondeo@example.com', 'clave-segura')
+        pedido = Pedido.objects.create(
+            usuario=usuario, numero_pedido='PED-VER-1', total=Decimal('40.00'),
+            direccion_envio='Calle 1', telefono='5550000',
+        )
+        Pago.objects.create(pedido=pedido, monto=pedido.total, stripe_payment_intent_id='pi_sondeo', estado='procesando')
+        self.url = '/api/pago/verificar/pi_sondeo/'
+
+    def test_una_consulta_a_stripe_por_ventana(self):
+        intent = mock.Mock()
+        intent.to_dict.return_value = {'id': 'pi_sondeo', 'status': 'processing'}
+        with mock.patch.object(payments.StripeProveedor, 'obtener_payment_intent', return_value=intent) as obtener:
+            primera = self.cliente.get(self.url).json()
+            segunda = self.cliente.get(self.url).json()
+        obtener.assert_called_once_with('pi_sondeo')
+        self.assertEqual((primera['fuente'], segunda['fuente']), ('stripe', 'local'))
+        self.assertEqual(segunda['status'], 'processing')
+
+    @override_settings(STRIPE_SECRET_KEY='')
+    def test_sin_credenciales_responde_el_estado_local(self):
+        payments.configurar()
+        self.addCleanup(payments.configurar)
+        with self.assertLogs('apps.orders.reconciliation', 'ERROR'):
+            respuesta = self.cliente.get(self.url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual((respuesta.json()['fuente'], respuesta.json()['estado_local']), ('local', 'procesando'))
+
+
+class ServidorFalsoMixin:
+    """Levanta en un hilo, durante la clase, uno de los servidores sustitutos locales."""
+    manejador = None
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.servidor = ThreadingHTTPServer(('127.0.0.1', 0), cls.manejador)
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+        cls.url_servidor = f'http://127.0.0.1:{cls.servidor.server_port}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+        super().tearDownClass()
+
+
+class ValidacionHunterTest(ServidorFalsoMixin, TestCase):
+    """Caché persistente de `apps.core.hunter` y circuit breaker, contra el Hunter falso."""
+    manejador = HunterFalso
+
+    def setUp(self):
+        ajustes = override_settings(
+            HUNTER_API_KEY='prueba', HUNTER_API_URL=f'{self.url_servidor}/v2/email-verifier',
+            HUNTER_UMBRAL_LENTO=0.05, HUNTER_CIRCUITO_FALLOS=2, HUNTER_CIRCUITO_ENFRIAMIENTO=60,
+        )
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        for parche in (mock.patch.object(hunter, 'circuito', hunter.Circuito()),
+                       mock.patch.object(HunterFalso, 'demora', 0.1)):
+            parche.start()
+            self.addCleanup(parche.stop)
+        self.inicial = HunterFalso.consultas
+
+    def consultas(self):
+        return HunterFalso.consultas - self.inicial
+
+    def test_segunda_validacion_sale_de_la_cache(self):
+        self.assertEqual(hunter.validar(' Ana@Example.com ')['status'], 'valid')
+        self.assertEqual(hunter.validar('ana@example.com'), {'status': 'valid', 'score': 95.0})
+        self.assertEqual(self.consultas(), 1)
+        self.assertTrue(ValidacionEmail.objects.filter(email='ana@example.com').exists())
+
+    def test_los_errores_no_se_cachean(self):
+        self.assertEqual(hunter.validar('error@example.com')['status'], 'error')
+        self.assertFalse(ValidacionEmail.objects.filter(email='error@example.com').exists())
+        with self.assertLogs('apps.core.hunter', 'WARNING'):  # el segundo fallo abre el circuito
+            hunter.validar('error@example.com')
+        self.assertEqual(self.consultas(), 2)
+
+    def test_respuestas_lentas_abren_el_circuito(self):
+        with self.assertLogs('apps.core.hunter', 'WARNING'):
+            for email in ('lento1@example.com', 'lento2@example.com'):
+                self.assertEqual(hunter.validar(email)['status'], 'valid')
+        resultado = hunter.validar('ana@example.com')
+        self.assertEqual(resultado['status'], 'error')
+        self.assertIn('circuito abierto', resultado['message'])
+        self.assertEqual(self.consultas(), 2)
+
+    def test_semiabierto_deja_pasar_una_sola_prueba(self):
+        circuito = hunter.circuito
+        with self.assertLogs('apps.core.hunter', 'WARNING'):
+            circuito.fallo()
+            circuito.fallo()
+        self.assertFalse(circuito.permitir())
+        circuito.abierto_hasta = 0.0  # vence el enfriamiento
+        self.assertEqual([circuito.permitir() for _ in range(3)], [True, False, False])
+        circuito.exito()
+        self.assertTrue(circuito.permitir())
+
+
+class PreferenciaMercadoPagoTest(ServidorFalsoMixin, TestCase):
+    """El carrito sin cambios reutiliza su preferencia; un cambio crea otra."""
+    manejador = MercadoPagoFalso
+    BACK_URLS = {'success': 'https://tienda.example.com/ok'}
+
+    def setUp(self):
+        cache.clear()
+        self.ajustes = override_settings(MERCADOPAGO_ACCESS_TOKEN='TEST-token', MERCADOPAGO_API_BASE=self.url_servidor)
+        self.ajustes.enable()
+        payments.configurar()
+        self.addCleanup(payments.configurar)
+        self.addCleanup(self.ajustes.disable)
+
+        self.usuario = User.objects.create_user('comprador', 'comprador@example.com', 'clave-segura')
+        carrito = Carrito.objects.create(usuario=self.usuario)
+        producto = Producto.objects.create(nombre='Perfume', sku='SKU-MP', precio=Decimal('25.00'), stock=10)
+        self.item = ItemCarrito.objects.create(carrito=carrito, producto=producto, cantidad=1)
+
+    def test_reutiliza_preferencia_si_el_carrito_no_cambia(self):
+        inicial = MercadoPagoFalso.preferencias
+        primera = payments.MercadoPagoManager.preferencia_para_carrito(self.usuario, self.BACK_URLS)
+        segunda = payments.MercadoPagoManager.preferencia_para_carrito(self.usuario, self.BACK_URLS)
+        self.assertEqual(primera, segunda)
+        self.assertEqual(MercadoPagoFalso.preferencias - inicial, 1)
+
+    def test_crea_otra_preferencia_si_el_carrito_cambia(self):
+        inicial = MercadoPagoFalso.preferencias
+        primera = payments.MercadoPagoManager.preferencia_para_carrito(self.usuario, self.BACK_URLS)
+        self.item.cantidad = 2
+        self.item.save()
+        segunda = payments.MercadoPagoManager.preferencia_para_carrito(self.usuario, self.BACK_URLS)
+        self.assertNotEqual(primera['preference_id'], segunda['preference_id'])
+        self.assertEqual(MercadoPagoFalso.preferencias - inicial, 2)
+
+    def test_crear_pago_sin_back_urls(self):
+        pedido = Pedido.objects.create(
+            usuario=self.usuario, numero_pedido='PED-MP-1', total=Decimal('25.00'),
+            direccion_envio='Calle 1', telefono='5550000',
+        )
+        DetallePedido.objects.create(
+            pedido=pedido, producto=self.item.producto, cantidad=1,
+            precio_unitario=Decimal('25.00'), subtotal=Decimal('25.00'),
+        )
+        respuesta = payments.proveedor('mercadopago').crear_pago(pedido, self.usuario.email, 'Comprador')
+        self.assertTrue(respuesta['preference_id'].startswith('pref-'))
+
+
+class ProveedorPagoTest(SimpleTestCase):
+    def test_adaptador_incompleto_no_se_instancia(self):
+        class SinConsulta(payments.ProveedorPago):
+            def configurado(self):
+                return True
+
+            def crear_pago(self, pedido, email, nombre, **opciones):
+                return {}
+
+        with self.assertRaises(TypeError):
+            SinConsulta()
+
+
+class SincronizacionS3Test(ServidorFalsoMixin, SimpleTestCase):
+    """`media_s3.sincronizar` no resube lo que ya está y retoma desde el diario."""
+    manejador = S3Falso
+    BUCKET = 'media-pruebas'
+
+    def setUp(self):
+        S3Falso.objetos.clear()
+        ajustes = override_settings(
+            AWS_ACCESS_KEY_ID='prueba', AWS_SECRET_ACCESS_KEY='prueba', AWS_S3_ENDPOINT_URL=self.url_servidor,
+        )
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        temporal = tempfile.TemporaryDirectory()
+        self.addCleanup(temporal.cleanup)
+        self.raiz = os.path.join(temporal.name, 'media')
+        self.manifiesto = os.path.join(temporal.name, 'media_s3.json')
+        self.archivos = {'productos/a.jpg': b'a' * 100, 'productos/b.jpg': b'b' * 200, 'marcas/c.png': b'c' * 50}
+        for relativa, datos in self.archivos.items():
+            ruta = os.path.join(self.raiz, relativa)
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            with open(ruta, 'wb') as salida:
+                salida.write(datos)
+
+    def sincronizar(self):
+        return media_s3.sincronizar(self.raiz, self.BUCKET, hilos=2, manifiesto=self.manifiesto)
+
+    def test_omite_los_archivos_ya_subidos(self):
+        primera = self.sincronizar()
+        self.assertEqual((primera[media_s3.SUBIDO], primera[media_s3.OMITIDO]), (3, 0))
+        self.assertEqual(
+            {clave: objeto['datos'] for (_, clave), objeto in S3Falso.objetos.items()}, self.archivos,
+        )
+
+        with mock.patch.object(media_s3, 'etag_local', wraps=media_s3.etag_local) as etag_local:
+            segunda = self.sincronizar()
+        self.assertEqual((segunda[media_s3.SUBIDO], segunda[media_s3.OMITIDO]), (0, 3))
+        # El manifiesto alcanza para saber que no cambiaron: no se vuelven a leer
+        etag_local.assert_not_called()
+
+    def test_retoma_desde_el_diario(self):
+        # Corrida interrumpida: un archivo llegó a subirse y quedó en el diario
+        media_s3.cliente().upload_file(os.path.join(self.raiz, 'productos/a.jpg'), self.BUCKET, 'productos/a.jpg')
+        interrumpido = media_s3.Manifiesto(self.manifiesto)
+        ruta = os.path.join(self.raiz, 'productos/a.jpg')
+        interrumpido.registrar('productos/a.jpg', media_s3.etag_local(ruta), os.stat(ruta))
+        interrumpido._salida.close()
+
+        subidos = []
+
+        def progreso(clave, resultado, detalle):
+            if resultado == media_s3.SUBIDO:
+                subidos.append(clave)
+
+        with mock.patch.object(media_s3, 'etag_local', wraps=media_s3.etag_local) as etag_local:
+            totales = media_s3.sincronizar(self.raiz, self.BUCKET, hilos=2, manifiesto=self.manifiesto, progreso=progreso)
+        self.assertEqual((totales[media_s3.SUBIDO], totales[media_s3.OMITIDO]), (2, 1))
+        self.assertEqual(sorted(subidos), ['marcas/c.png', 'productos/b.jpg'])
+        self.assertNotIn(mock.call(ruta), etag_local.call_args_list)
+
+        # Al terminar, el diario se integra al manifiesto
+        self.assertFalse(os.path.exists(f'{self.manifiesto}.parcial'))
+        with open(self.manifiesto, encoding='utf-8') as entrada:
+            self.assertEqual(sorted(json.load(entrada)), sorted(self.archivos))
+
+
+@override_settings(METRICAS_MUESTREO=1, METRICAS_SERVER_TIMING=False)
+class ServerTimingTest(TestCase):
+    """Sin `METRICAS_SERVER_TIMING`, los tiempos internos solo se exponen a staff."""
+
+    def test_anonimo_no_recibe_server_timing(self):
+        respuesta = self.client.get('/legal/terminos/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotIn('Server-Timing', respuesta)
+
+    def test_staff_recibe_server_timing(self):
+        self.client.force_login(User.objects.create_user('staff', 'staff@example.com', 'clave-segura', is_staff=True))
+        respuesta = self.client.get('/legal/terminos/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('db;dur=', respuesta['Server-Timing'])
+
+
+class RespaldoIncrementalTest(TestCase):
+    """Base + deltas (`apps.core.backup.exportar_incremental`) restaurados con `restore_database`."""
+
+    def setUp(self):
+        temporal = tempfile.TemporaryDirectory()
+        self.addCleanup(temporal.cleanup)
+        self.ruta = os.path.join(temporal.name, 'db_backup.json')
+
+        self.usuario = User.objects.create_user('respaldo', 'respaldo@example.com', 'clave-segura')
+        marca = Marca.objects.create(nombre='Marca')
+        categoria = Categoria.objects.create(nombre='Florales')
+        producto = Producto.objects.create(
+            nombre='Perfume', sku='SKU-R', precio=Decimal('20.00'), marca=marca, categoria=categoria, stock=10,
+        )
+        self.producto = producto
+        self.pedido = self.crear_pedido('PED-R-1')
+        # Filas viejas: fuera del margen de solapamiento entre deltas respecto de las nuevas
+        hace_una_hora = timezone.now() - timedelta(hours=1)
+        Producto.objects.update(actualizado_en=hace_una_hora)
+        Pedido.objects.update(actualizado_en=hace_una_hora)
+        self.crear_pedido('PED-R-2')
+
+    def crear_pedido(self, numero):
+        pedido = Pedido.objects.create(
+            usuario=self.usuario, numero_pedido=numero, total=Decimal('20.00'),
+            direccion_envio='Calle 1', telefono='5550000', estado='procesando',
+        )
+        DetallePedido.objects.create(
+            pedido=pedido, producto=self.producto, cantidad=1,
+            precio_unitario=self.producto.precio, subtotal=self.producto.precio,
+        )
+        return pedido
+
+    def respaldar(self):
+        return backup.exportar_incremental(self.ruta)
+
+    def restaurar(self, *apps_restauradas):
+        call_command(
+            'restore_database', fixture=self.ruta, force=True, apps=list(apps_restauradas), verbosity=0, stdout=StringIO(),
+        )
+
+    def test_accion_del_admin_sobrevive_a_la_restauracion(self):
+        self.assertTrue(self.respaldar()[2])
+        admin.site._registry[Pedido]._marcar(Pedido.objects.filter(pk=self.pedido.pk), 'enviado')
+        archivo, conteos, es_base = self.respaldar()
+        self.assertFalse(es_base)
+        self.assertIn(('orders.Pedido', 2), conteos)  # el modificado y el reciente (solapamiento)
+
+        Pedido.objects.all().delete()
+        self.restaurar('orders')
+        self.assertEqual(Pedido.objects.get(numero_pedido='PED-R-1').estado, 'enviado')
+
+    def test_bajas_y_cambios_del_delta_se_restauran(self):
+        Group.objects.create(name='mayoristas')
+        self.assertTrue(self.respaldar()[2])
+        # Con pk y con clave natural (los grupos se respaldan sin pk)
+        Group.objects.filter(name='mayoristas').delete()
+        Pedido.objects.filter(numero_pedido='PED-R-1').delete()
+        self.producto.precio = Decimal('25.00')
+        self.producto.save()
+        _, conteos, es_base = self.respaldar()
+        self.assertFalse(es_base)
+        self.assertIn(('orders.Pedido (bajas)', 1), conteos)
+
+        Pedido.objects.all().delete()
+        Producto.objects.all().delete()
+        Group.objects.create(name='mayoristas')
+        self.restaurar('auth', 'catalog', 'orders')
+        self.assertFalse(Group.objects.filter(name='mayoristas').exists())
+        self.assertEqual(list(Pedido.objects.values_list('numero_pedido', flat=True)), ['PED-R-2'])
+        self.assertEqual(DetallePedido.objects.count(), 1)
+        self.assertEqual(Producto.objects.get(sku='SKU-R').precio, Decimal('25.00'))
+
+    def test_sin_bajas_el_delta_no_registra_borrados(self):
+        self.respaldar()
+        _, conteos, _ = self.respaldar()
+        self.assertFalse([etiqueta for etiqueta, _ in conteos if etiqueta.endswith('(bajas)')])
+        self.assertEqual(
+            backup.leer_claves(self.ruta)['orders.pedido'],
+            {str(pk) for pk in Pedido.objects.values_list('pk', flat=True)},
+        )
+
+
+@override_settings(JOBS_SINCRONICO=True, IMAGENES_ANCHOS=[160, 320, 640], IMAGENES_FORMATOS=['webp'])
+class DerivadosImagenTest(TestCase):
+    """Versiones reducidas de `Producto.imagen` (`apps.catalog.imagenes`), generadas por la cola."""
+
+    def setUp(self):
+        temporal = tempfile.TemporaryDirectory()
+        self.addCleanup(temporal.cleanup)
+        ajustes = override_settings(MEDIA_ROOT=temporal.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.media = temporal.name
+
+    def jpeg(self, ancho, alto, nombre='perfume.jpg'):
+        contenido = BytesIO()
+        Image.new('RGB', (ancho, alto), (180, 120, 200)).save(contenido, format='JPEG')
+        return SimpleUploadedFile(nombre, contenido.getvalue(), content_type='image/jpeg')
+
+    def guardar(self, producto):
+        # La tarea corre al confirmar la transacción (JOBS_SINCRONICO)
+        with self.captureOnCommitCallbacks(execute=True):
+            producto.save()
+        producto.refresh_from_db()
+        return producto
+
+    def existe(self, nombre):
+        return os.path.exists(os.path.join(self.media, nombre))
+
+    def test_genera_webp_por_ancho(self):
+        producto = self.guardar(Producto(nombre='Perfume', sku='SKU-IMG', precio=Decimal('10.00'), imagen=self.jpeg(1000, 800)))
+        derivados = producto.imagen_derivados
+        self.assertEqual((derivados['origen'], derivados['ancho']), (producto.imagen.name, 1000))
+        self.assertEqual(sorted(derivados['webp'], key=int), ['160', '320', '640'])
+        for ancho, nombre in derivados['webp'].items():
+            with Image.open(os.path.join(self.media, nombre)) as imagen:
+                self.assertEqual((imagen.format, imagen.width), ('WEBP', int(ancho)))
+
+        self.assertTrue(imagenes.url(producto, 300).endswith('-320.webp'))
+        self.assertTrue(imagenes.url(producto, 2000).endswith('-640.webp'))
+        self.assertEqual(
+            [candidato.rsplit(' ', 1)[1] for candidato in imagenes.srcset(producto).split(', ')], ['160w', '320w', '640w'],
+        )
+        self.assertTrue(imagenes.srcset(producto, original=True).endswith(f'{producto.imagen.url} 1000w'))
+
+    def test_no_agranda_imagenes_chicas(self):
+        producto = self.guardar(Producto(nombre='Mini', sku='SKU-MINI', precio=Decimal('10.00'), imagen=self.jpeg(200, 200)))
+        self.assertEqual(sorted(producto.imagen_derivados['webp'], key=int), ['160', '200'])
+        self.assertEqual(imagenes.srcset(producto, original=True).count(' 200w'), 1)
+
+    def test_limpia_derivados_al_cambiar_imagen_y_al_borrar(self):
+        producto = self.guardar(Producto(nombre='Perfume', sku='SKU-IMG', precio=Decimal('10.00'), imagen=self.jpeg(800, 800)))
+        anteriores = list(producto.imagen_derivados['webp'].values())
+
+        producto.imagen = self.jpeg(700, 700, 'otro.jpg')
+        producto = self.guardar(producto)
+        actuales = list(producto.imagen_derivados['webp'].values())
+        self.assertFalse(any(self.existe(nombre) for nombre in anteriores))
+        self.assertTrue(all(self.existe(nombre) for nombre in actuales))
+
+        producto.delete()
+        self.assertFalse(any(self.existe(nombre) for nombre in actuales))
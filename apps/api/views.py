@@ -16,7 +16,7 @@ import hashlib
 from django.contrib.auth import get_user_model
 
 from apps.catalog.models import Producto, Categoria
-from apps.orders.models import Pedido, DetallePedido, Pago
+from apps.orders.models import DetallePedido, Pago
 
 from .serializers import (
     ProductoSerializer, 
@@ -26,7 +26,12 @@ from .serializers import (
     PagoSerializer,
     CrearPagoSerializer,
 )
-from .payments import StripePaymentManager
+from apps.orders.payments import StripePaymentManager
+from apps.catalog.pagination import ProductoCursorPagination
+from apps.orders import reconciliation, webhooks
+from apps.orders.history import pedidos_resumen, pedidos_detalle
+from apps.orders.pagination import PedidoCursorPagination
+from apps.orders.serializers import PedidoResumenSerializer
 import logging
 
 logger = logging.getLogger(__name__)
@@ -67,9 +72,10 @@ class ProductoViewSet(viewsets.ModelViewSet):
     ViewSet para gestionar Productos.
     Permite: GET (listar, obtener), POST/PUT/PATCH/DELETE (solo admin/staff)
     """
-    queryset = Producto.objects.all()
+    queryset = Producto.objects.select_related('marca', 'categoria').order_by('-id')
     serializer_class = ProductoSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = ProductoCursorPagination
     
     def get_permissions(self):
         """Permitir lectura sin autenticación, escritura solo autenticados."""
@@ -126,10 +132,19 @@ class PedidoViewSet(viewsets.ModelViewSet):
     """
     serializer_class = PedidoSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = PedidoCursorPagination
     
     def get_queryset(self):
-        """Los usuarios solo ven sus propios pedidos."""
-        return Pedido.objects.filter(usuario=self.request.user)
+        """Los usuarios solo ven sus propios pedidos (consultas acotadas)."""
+        if self.action == 'list':
+            return pedidos_resumen(self.request.user)
+        return pedidos_detalle(self.request.user)
+    
+    def get_serializer_class(self):
+        """Resumen en el listado; representación completa en el detalle."""
+        if self.action == 'list':
+            return PedidoResumenSerializer
+        return PedidoSerializer
     
     def perform_create(self, serializer):
         """Asociar el pedido al usuario actual."""
@@ -166,7 +181,8 @@ class CrearPagoView(viewsets.ViewSet):
             resultado = StripePaymentManager.crear_payment_intent(
                 pedido_id=serializer.validated_data['pedido_id'],
                 email=serializer.validated_data['email'],
-                nombre=serializer.validated_data['nombre']
+                nombre=serializer.validated_data['nombre'],
+                usuario=request.user,
             )
             
             return Response(resultado, status=status.HTTP_200_OK)
@@ -195,7 +211,7 @@ def stripe_webhook(request):
     - Un pago se completa exitosamente (payment_intent.succeeded)
     - Un pago falla (payment_intent.payment_failed)
     
-    Actualiza automáticamente:
+    Actualiza automáticamente (en segundo plano, ver apps.orders.webhooks):
     - Estado del pago en la BD
     - Estado del pedido (si el pago es exitoso)
     
@@ -214,7 +230,7 @@ def stripe_webhook(request):
     
     # Verificar la firma del webhook
     try:
-        event = stripe.Webhook.construct_event(
+        stripe.Webhook.construct_event(
             payload,
             sig_header,
             settings.STRIPE_WEBHOOK_SECRET
@@ -226,9 +242,9 @@ def stripe_webhook(request):
         logger.error(f"Firma inválida: {str(e)}")
         return JsonResponse({'error': 'Firma inválida'}, status=400)
     
-    # Procesar el evento
-    if StripePaymentManager.procesar_webhook(event):
-        logger.info(f"Webhook procesado exitosamente: {event['type']}")
+    # Guardar y confirmar de inmediato: el evento se procesa en la cola de tareas
+    # y los reintentos de Stripe con el mismo id no se reprocesan
+    webhooks.registrar_stripe(json.loads(payload))
     
     return JsonResponse({'success': True}, status=200)
 
@@ -246,15 +262,18 @@ def verificar_pago(request, payment_intent_id):
         "status": "succeeded" | "processing" | "requires_payment_method",
         "monto": 99.99,
         "moneda": "USD",
-        "estado_local": "exitoso" | "procesando" | "pendiente"
+        "estado_local": "exitoso" | "procesando" | "pendiente",
+        "verificado_en": "2026-01-01T12:00:00+00:00",
+        "fuente": "local" | "stripe"
     }
+    
+    Responde desde la base local (`verificado_en` indica cuándo se confirmó
+    con Stripe por última vez); solo consulta a Stripe si el dato está vencido.
     """
-    try:
-        resultado = StripePaymentManager.verificar_estado_pago(payment_intent_id)
-        return JsonResponse(resultado, status=200)
-    except Exception as e:
-        logger.error(f"Error verificando pago: {str(e)}")
-        return JsonResponse({'error': str(e)}, status=400)
+    resultado = reconciliation.estado_pago(payment_intent_id)
+    if resultado is None:
+        return JsonResponse({'error': 'Pago no registrado'}, status=404)
+    return JsonResponse(resultado, status=200)
 
 
 def create_admin_user(request):
@@ -3,6 +3,7 @@ from django.contrib import admin
 from django.db.models import Q
 from django.utils.html import format_html
 from .models import Producto, Marca, Categoria
+from . import imagenes
 
 
 class EstadoImagenFilter(admin.SimpleListFilter):
@@ -50,7 +51,7 @@ class ProductoAdmin(admin.ModelAdmin):
 
     def imagen_preview(self, obj):
         if obj.imagen and hasattr(obj.imagen, 'url'):
-            return format_html('<img src="{}" style="width: 50px; height: 50px; object-fit: cover; border-radius: 5px;" />', obj.imagen.url)
+            return format_html('<img src="{}" style="width: 50px; height: 50px; object-fit: cover; border-radius: 5px;" />', imagenes.url(obj, 160))
         return "No Image"
     imagen_preview.short_description = "Imagen"
 
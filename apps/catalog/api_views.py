@@ -2,18 +2,21 @@ from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from django.db.models import Sum
+from apps.orders.ranking import alcance_desde_parametros, top_productos
 from .models import Producto
 from .serializers import ProductoSerializer
+from .pagination import ProductoCursorPagination
+from .caching import cachear_json, GRUPO_CATALOGO, GRUPO_VENTAS
 
 class ProductoViewSet(viewsets.ModelViewSet):
     """
     ViewSet para gestionar Productos.
     Permite: GET (listar, obtener), POST/PUT/PATCH/DELETE (solo admin/staff)
     """
-    queryset = Producto.objects.all()
+    queryset = Producto.objects.select_related('marca', 'categoria').prefetch_related('categorias_secundarias').order_by('-id')
     serializer_class = ProductoSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = ProductoCursorPagination
     
     def get_permissions(self):
         """Permitir lectura sin autenticación, escritura solo autenticados."""
@@ -22,17 +25,26 @@ class ProductoViewSet(viewsets.ModelViewSet):
         return [IsAuthenticated()]
 
 
+@cachear_json(GRUPO_CATALOGO, GRUPO_VENTAS)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def best_sellers(request):
-    """Obtiene los 8 productos más vendidos por cantidad"""
-    productos = Producto.objects.filter(activo=True).annotate(
-        total_vendido=Sum('detallepedido__cantidad')
-    ).order_by('-total_vendido')[:8]
+    """
+    Obtiene los 8 productos más vendidos desde el ranking materializado.
+    Acepta ?ventana=7|30|90 y opcionalmente ?genero= o ?categoria=.
+    """
+    ventana, alcance = alcance_desde_parametros(
+        genero=request.query_params.get('genero'),
+        categoria=request.query_params.get('categoria'),
+        ventana=request.query_params.get('ventana'),
+    )
+    queryset = Producto.objects.select_related('marca', 'categoria').prefetch_related('categorias_secundarias')
+    productos = top_productos(8, ventana=ventana, alcance=alcance, queryset=queryset)
     serializer = ProductoSerializer(productos, many=True, context={'request': request})
     return Response(serializer.data)
 
 
+@cachear_json(GRUPO_CATALOGO)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def productos_por_genero(request, genero):
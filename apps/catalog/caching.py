@@ -0,0 +1,115 @@
+"""
+Caché de respuestas JSON públicas del catálogo.
+
+`cachear_json` guarda el cuerpo ya serializado de la respuesta, con clave
+endpoint + parámetros (host, ruta y query ordenada), y responde con `ETag`;
+si el navegador envía un `If-None-Match` que coincide se devuelve 304 sin
+cuerpo.
+
+La invalidación es por versión de grupo: cada clave incluye la versión de
+los grupos de los que depende ('catalogo', 'ventas'). Al cambiar un
+`Producto`, `Categoria` o `Marca` se incrementa la versión de 'catalogo' (ver
+`apps.catalog.signals`) y todas las entradas viejas dejan de leerse; expiran
+solas por TTL. El stock que descuenta el checkout (UPDATE sin señales) y el
+ranking incremental de ventas se refrescan por TTL (`CATALOGO_CACHE_TIMEOUT`).
+
+Las versiones viven en la caché por defecto, así que la invalidación solo
+llega a todos los procesos con un backend compartido (`CACHE_BACKEND=redis`,
+como en render.yaml). Con la memoria local de cada proceso, los demás
+workers pueden servir respuestas viejas hasta `CATALOGO_CACHE_TIMEOUT`.
+
+La clave distingue la variante HTML (API navegable de DRF) de la JSON según
+`Accept`, y las respuestas llevan `Vary: Accept` para las cachés intermedias.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags, quote_etag, urlencode
+
+GRUPO_CATALOGO = 'catalogo'
+GRUPO_VENTAS = 'ventas'
+
+_PREFIJO = 'catalogo:resp'
+
+
+def _clave_version(grupo):
+    return f'{_PREFIJO}:version:{grupo}'
+
+
+def version(grupo):
+    """Versión vigente de `grupo`. Si se perdió (desalojo, reinicio) se crea una nueva."""
+    clave = _clave_version(grupo)
+    valor = cache.get(clave)
+    if valor is None:
+        # Basada en el reloj para no reutilizar una versión anterior
+        cache.add(clave, int(time.time() * 1000), None)
+        valor = cache.get(clave)
+    return valor
+
+
+def invalidar(*grupos):
+    """Descarta de un golpe todas las respuestas cacheadas que dependen de `grupos`."""
+    for grupo in grupos:
+        clave = _clave_version(grupo)
+        try:
+            cache.incr(clave)
+        except ValueError:
+            cache.set(clave, int(time.time() * 1000), None)
+
+
+def _clave(request, grupos):
+    variante = 'html' if 'text/html' in request.META.get('HTTP_ACCEPT', '') else 'json'
+    query = urlencode(sorted((k, sorted(v)) for k, v in request.GET.lists()), doseq=True)
+    base = f'{request.get_host()}|{request.path}|{query}|{variante}'
+    versiones = '.'.join(str(version(grupo)) for grupo in grupos)
+    return f'{_PREFIJO}:{versiones}:{hashlib.md5(base.encode("utf-8"), usedforsecurity=False).hexdigest()}'
+
+
+def _responder(request, entrada):
+    contenido, content_type, etag = entrada
+    if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        respuesta = HttpResponseNotModified()
+    else:
+        respuesta = HttpResponse(contenido, content_type=content_type)
+    respuesta['ETag'] = etag
+    # Siempre revalidar: el navegador reutiliza su copia mientras el ETag coincida
+    patch_cache_control(respuesta, public=True, max_age=0, must_revalidate=True)
+    patch_vary_headers(respuesta, ['Accept'])
+    return respuesta
+
+
+def cachear_json(*grupos, timeout=None):
+    """
+    Decorador para vistas GET que devuelven JSON idéntico para cualquier
+    visitante (`JsonResponse` o `Response` de DRF). Solo se cachean respuestas
+    200 con `Content-Type` JSON.
+    """
+    grupos = grupos or (GRUPO_CATALOGO,)
+
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return vista(request, *args, **kwargs)
+
+            clave = _clave(request, grupos)
+            entrada = cache.get(clave)
+            if entrada is None:
+                respuesta = vista(request, *args, **kwargs)
+                if hasattr(respuesta, 'render') and not respuesta.is_rendered:
+                    respuesta.render()
+                content_type = respuesta.get('Content-Type', '')
+                if respuesta.status_code != 200 or not content_type.startswith('application/json'):
+                    return respuesta
+                contenido = respuesta.content
+                etag = quote_etag(hashlib.md5(contenido, usedforsecurity=False).hexdigest())
+                entrada = (contenido, content_type, etag)
+                cache.set(clave, entrada, timeout if timeout is not None else settings.CATALOGO_CACHE_TIMEOUT)
+            return _responder(request, entrada)
+        return envoltura
+    return decorador
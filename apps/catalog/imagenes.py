@@ -0,0 +1,178 @@
+"""
+Derivados de `Producto.imagen`: versiones reducidas a anchos fijos.
+
+Al guardar un producto con una imagen nueva se encola la tarea
+'generar_derivados_imagen' (ver `apps.catalog.signals` y `tasks`), que fuera
+del request redimensiona el original con Pillow a cada ancho de
+`IMAGENES_ANCHOS` (sin agrandarlo) y lo guarda en cada formato de
+`IMAGENES_FORMATOS` ('webp' y, si Pillow lo soporta, 'avif') junto al
+original, en el storage configurado (disco o S3): `productos/derivados/`.
+
+Los nombres guardados quedan en `Producto.imagen_derivados` junto con el
+nombre del original del que salieron; si la imagen cambia y los derivados
+todavía no se regeneraron, las URLs caen al original. Así armar una URL no
+requiere consultar el storage (en S3 sería un HEAD por imagen).
+
+`python manage.py generate_image_derivatives` genera los que falten.
+"""
+import logging
+import posixpath
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+from . import caching
+from .models import Producto
+
+logger = logging.getLogger(__name__)
+
+ANCHOS = (160, 320, 640)
+FORMATOS = ('webp',)
+DIRECTORIO = 'derivados'
+# Ancho de las miniaturas (tarjetas del catálogo, chatbot, carrito, admin)
+ANCHO_MINIATURA = 320
+
+CALIDAD = {'webp': 80, 'avif': 60}
+TIPOS = {'webp': 'image/webp', 'avif': 'image/avif'}
+
+
+def anchos():
+    return tuple(sorted(getattr(settings, 'IMAGENES_ANCHOS', ANCHOS)))
+
+
+def formatos():
+    """Formatos configurados que la instalación de Pillow puede escribir."""
+    return tuple(
+        formato for formato in getattr(settings, 'IMAGENES_FORMATOS', FORMATOS)
+        if formato in TIPOS and features.check(formato)
+    )
+
+
+def vigentes(producto):
+    """Derivados de la imagen actual de `producto` ({formato: {ancho: nombre}}), o {}."""
+    derivados = producto.imagen_derivados or {}
+    if not producto.imagen or derivados.get('origen') != producto.imagen.name:
+        return {}
+    return {formato: derivados[formato] for formato in TIPOS if derivados.get(formato)}
+
+
+def url(producto, ancho=ANCHO_MINIATURA, formato='webp'):
+    """
+    URL del derivado más chico que cubre `ancho` (o el más grande que haya);
+    sin derivados, la del original. None si el producto no tiene imagen.
+    """
+    if not producto.imagen:
+        return None
+    por_ancho = vigentes(producto).get(formato)
+    if not por_ancho:
+        return producto.imagen.url
+    disponibles = sorted(int(a) for a in por_ancho)
+    elegido = next((a for a in disponibles if a >= ancho), disponibles[-1])
+    return default_storage.url(por_ancho[str(elegido)])
+
+
+def srcset(producto, formato='webp', original=False):
+    """
+    Valor de `srcset` ("url 160w, url 320w, ...") o '' sin derivados. Con
+    `original` agrega la imagen original si es más ancha que los derivados.
+    """
+    por_ancho = vigentes(producto).get(formato) or {}
+    anchos_derivados = sorted(int(a) for a in por_ancho)
+    candidatos = [f"{default_storage.url(por_ancho[str(a)])} {a}w" for a in anchos_derivados]
+    ancho_original = (producto.imagen_derivados or {}).get('ancho')
+    if original and candidatos and ancho_original and ancho_original > anchos_derivados[-1]:
+        candidatos.append(f"{producto.imagen.url} {ancho_original}w")
+    return ', '.join(candidatos)
+
+
+def datos_json(producto, ancho=ANCHO_MINIATURA):
+    """Campos de imagen para las respuestas JSON de productos."""
+    return {
+        'imagen_miniatura': url(producto, ancho),
+        'imagen_srcset': srcset(producto),
+    }
+
+
+def _nombre(original, ancho, formato):
+    directorio, archivo = posixpath.split(original)
+    base = posixpath.splitext(archivo)[0]
+    return posixpath.join(directorio, DIRECTORIO, f"{base}-{ancho}.{formato}")
+
+
+def _abrir(campo):
+    campo.open('rb')
+    try:
+        imagen = Image.open(BytesIO(campo.read()))
+        imagen.load()
+    finally:
+        campo.close()
+    # Respeta la orientación de las fotos de cámara y normaliza el modo de color
+    imagen = ImageOps.exif_transpose(imagen)
+    return imagen.convert('RGBA' if 'A' in imagen.getbands() or imagen.mode == 'P' else 'RGB')
+
+
+def generar(producto):
+    """
+    Genera los derivados de la imagen actual de `producto` y retorna el valor
+    para `imagen_derivados` ({} si no tiene imagen).
+    """
+    if not producto.imagen:
+        return {}
+    original = _abrir(producto.imagen)
+    derivados = {'origen': producto.imagen.name, 'ancho': original.width}
+    # Sin agrandar: los anchos mayores que el original se reemplazan por el original
+    objetivos = sorted({min(ancho, original.width) for ancho in anchos()})
+    for formato in formatos():
+        derivados[formato] = {}
+        for ancho in objetivos:
+            copia = original.copy()
+            copia.thumbnail((ancho, ancho * 10), Image.LANCZOS)
+            contenido = BytesIO()
+            copia.save(contenido, format=formato.upper(), quality=CALIDAD[formato])
+            nombre = default_storage.save(
+                _nombre(producto.imagen.name, ancho, formato), ContentFile(contenido.getvalue()),
+            )
+            derivados[formato][str(ancho)] = nombre
+    return derivados
+
+
+def _archivos(derivados):
+    return {nombre for formato in TIPOS for nombre in (derivados.get(formato) or {}).values()}
+
+
+def eliminar(derivados, conservar=None):
+    """Borra del storage los archivos de un valor de `imagen_derivados` (salvo los de `conservar`)."""
+    for nombre in _archivos(derivados) - _archivos(conservar or {}):
+        try:
+            default_storage.delete(nombre)
+        except Exception as exc:
+            logger.warning("No se pudo borrar el derivado %s: %s", nombre, exc)
+
+
+def actualizar(producto_id):
+    """
+    (Re)genera los derivados del producto y los registra si la imagen no
+    cambió mientras tanto. Retorna True si se registraron.
+    """
+    producto = Producto.objects.filter(pk=producto_id).first()
+    if producto is None:
+        return False
+    anteriores = producto.imagen_derivados or {}
+    derivados = generar(producto)
+    misma_imagen = Q(imagen=producto.imagen.name) if producto.imagen else Q(imagen__isnull=True) | Q(imagen='')
+    actualizados = Producto.objects.filter(misma_imagen, pk=producto_id).update(
+        imagen_derivados=derivados, actualizado_en=timezone.now(),
+    )
+    if not actualizados:
+        # La imagen cambió durante la generación: su propia tarea la regenera
+        eliminar(derivados)
+        return False
+    eliminar(anteriores, conservar=derivados)
+    # Las respuestas cacheadas del catálogo llevan las URLs de los derivados
+    caching.invalidar(caching.GRUPO_CATALOGO)
+    return True
@@ -0,0 +1,66 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Q
+
+from apps.catalog import imagenes
+from apps.catalog.models import Producto
+from apps.core.jobs import encolar
+
+
+class Command(BaseCommand):
+    help = "Genera las versiones reducidas de las imágenes de producto que falten o estén desactualizadas."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--todos",
+            action="store_true",
+            help="Regenera los derivados de todos los productos con imagen, aunque estén al día.",
+        )
+        parser.add_argument(
+            "--encolar",
+            action="store_true",
+            help="En lugar de generarlos aquí, encola una tarea por producto para el worker.",
+        )
+        parser.add_argument(
+            "--hilos",
+            type=int,
+            default=4,
+            help="Productos procesados en paralelo (por defecto 4).",
+        )
+
+    def handle(self, *args, **options):
+        productos = Producto.objects.exclude(Q(imagen__isnull=True) | Q(imagen='')).order_by('id')
+        if options["todos"]:
+            ids = list(productos.values_list('id', flat=True))
+        else:
+            # Al día son los que registran como origen la imagen actual
+            ids = [pk for pk, imagen, derivados in productos.values_list('id', 'imagen', 'imagen_derivados')
+                   if (derivados or {}).get('origen') != imagen]
+
+        if not ids:
+            self.stdout.write("No hay imágenes pendientes.")
+            return
+
+        if options["encolar"]:
+            for producto_id in ids:
+                encolar('generar_derivados_imagen', {'producto_id': producto_id})
+            self.stdout.write(self.style.SUCCESS(f"Tareas encoladas: {len(ids)}"))
+            return
+
+        def procesar(producto_id):
+            try:
+                return imagenes.actualizar(producto_id), None
+            except Exception as exc:
+                return False, f"Producto {producto_id}: {exc}"
+            finally:
+                connections.close_all()
+
+        generados = 0
+        with ThreadPoolExecutor(max_workers=max(options["hilos"], 1)) as pool:
+            for ok, error in pool.map(procesar, ids):
+                generados += ok
+                if error:
+                    self.stderr.write(self.style.ERROR(error))
+        self.stdout.write(self.style.SUCCESS(f"Derivados generados: {generados} de {len(ids)} productos."))
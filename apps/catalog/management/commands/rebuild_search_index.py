@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from apps.catalog.search import indexar_productos
+
+
+class Command(BaseCommand):
+    help = "Reconstruye los documentos de búsqueda de todos los productos."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Cantidad de productos procesados por lote.",
+        )
+
+    def handle(self, *args, **options):
+        total = indexar_productos(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Índice de búsqueda reconstruido: {total} productos."))
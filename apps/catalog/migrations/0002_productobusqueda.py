@@ -0,0 +1,119 @@
+# Generated by Django 6.0.2 on 2026-10-18 19:40
+
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+POSTGRES_SQL = [
+    # Columna tsvector generada a partir del documento + índice GIN
+    "ALTER TABLE productos_busqueda ADD COLUMN vector tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('simple', documento)) STORED",
+    "CREATE INDEX productos_busqueda_vector_gin ON productos_busqueda USING gin (vector)",
+]
+
+POSTGRES_REVERSE_SQL = [
+    "DROP INDEX IF EXISTS productos_busqueda_vector_gin",
+    "ALTER TABLE productos_busqueda DROP COLUMN IF EXISTS vector",
+]
+
+SQLITE_SQL = [
+    # Tabla FTS5 "sombra" con contenido externo, sincronizada por triggers
+    "CREATE VIRTUAL TABLE productos_fts USING fts5("
+    "documento, content='productos_busqueda', content_rowid='producto_id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER productos_busqueda_ai AFTER INSERT ON productos_busqueda BEGIN "
+    "INSERT INTO productos_fts(rowid, documento) VALUES (new.producto_id, new.documento); END",
+    "CREATE TRIGGER productos_busqueda_ad AFTER DELETE ON productos_busqueda BEGIN "
+    "INSERT INTO productos_fts(productos_fts, rowid, documento) VALUES ('delete', old.producto_id, old.documento); END",
+    "CREATE TRIGGER productos_busqueda_au AFTER UPDATE ON productos_busqueda BEGIN "
+    "INSERT INTO productos_fts(productos_fts, rowid, documento) VALUES ('delete', old.producto_id, old.documento); "
+    "INSERT INTO productos_fts(rowid, documento) VALUES (new.producto_id, new.documento); END",
+]
+
+SQLITE_REVERSE_SQL = [
+    "DROP TRIGGER IF EXISTS productos_busqueda_au",
+    "DROP TRIGGER IF EXISTS productos_busqueda_ad",
+    "DROP TRIGGER IF EXISTS productos_busqueda_ai",
+    "DROP TABLE IF EXISTS productos_fts",
+]
+
+
+def _normalizar(texto):
+    if not texto:
+        return ''
+    return unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii').lower()
+
+
+def _sqlite_tiene_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        return any(fila[0] == 'ENABLE_FTS5' for fila in cursor.fetchall())
+
+
+def crear_indice(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        sentencias = POSTGRES_SQL
+    elif vendor == 'sqlite' and _sqlite_tiene_fts5(schema_editor.connection):
+        sentencias = SQLITE_SQL
+    else:
+        sentencias = []
+    for sql in sentencias:
+        schema_editor.execute(sql)
+
+    # Poblar documentos para los productos existentes
+    Producto = apps.get_model('catalog', 'Producto')
+    ProductoBusqueda = apps.get_model('catalog', 'ProductoBusqueda')
+    documentos = []
+    productos = Producto.objects.select_related('marca', 'categoria').prefetch_related('categorias_secundarias')
+    for producto in productos.iterator(chunk_size=500):
+        partes = [
+            producto.nombre,
+            producto.marca.nombre if producto.marca else '',
+            producto.categoria.nombre if producto.categoria else '',
+            ' '.join(c.nombre for c in producto.categorias_secundarias.all()),
+            producto.descripcion or '',
+        ]
+        documentos.append(ProductoBusqueda(
+            producto_id=producto.id,
+            documento=_normalizar(' '.join(p for p in partes if p)),
+        ))
+    ProductoBusqueda.objects.bulk_create(documentos, batch_size=500)
+
+
+def eliminar_indice(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        sentencias = POSTGRES_REVERSE_SQL
+    elif vendor == 'sqlite':
+        sentencias = SQLITE_REVERSE_SQL
+    else:
+        sentencias = []
+    for sql in sentencias:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductoBusqueda',
+            fields=[
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='busqueda', serialize=False, to='catalog.producto')),
+                ('documento', models.TextField(blank=True, default='')),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Documento de búsqueda',
+                'verbose_name_plural': 'Documentos de búsqueda',
+                'db_table': 'productos_busqueda',
+            },
+        ),
+        migrations.RunPython(crear_indice, eliminar_indice),
+    ]
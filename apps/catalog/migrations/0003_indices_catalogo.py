@@ -0,0 +1,66 @@
+# Generated by Django 6.0.2 on 2026-10-18 20:10
+
+import django.db.models.functions.text
+from django.db import DatabaseError, migrations, models, transaction
+
+
+# Solo PostgreSQL: índices trigram para `icontains` (Django compara con
+# UPPER(columna::text) LIKE UPPER(...)), usados por el admin y el chatbot
+POSTGRES_TRGM_SQL = [
+    "CREATE INDEX IF NOT EXISTS categorias_nombre_trgm_idx ON categorias "
+    "USING gin (UPPER(nombre::text) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS categorias_slug_trgm_idx ON categorias "
+    "USING gin (UPPER(slug::text) gin_trgm_ops)",
+]
+
+POSTGRES_TRGM_REVERSE_SQL = [
+    "DROP INDEX IF EXISTS categorias_slug_trgm_idx",
+    "DROP INDEX IF EXISTS categorias_nombre_trgm_idx",
+]
+
+
+def crear_indices_trigram(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    try:
+        # Puede fallar si el rol no tiene permiso para crear extensiones
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except DatabaseError:
+        return
+    for sql in POSTGRES_TRGM_SQL:
+        schema_editor.execute(sql)
+
+
+def eliminar_indices_trigram(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in POSTGRES_TRGM_REVERSE_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0002_productobusqueda'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='categoria',
+            index=models.Index(django.db.models.functions.text.Upper('slug'), name='categoria_slug_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['activo', 'genero', '-id'], name='producto_activo_genero_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['-id'], name='producto_activos_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['-creado_en'], name='producto_creado_idx'),
+        ),
+        migrations.RunPython(crear_indices_trigram, eliminar_indices_trigram),
+    ]
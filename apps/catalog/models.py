@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Upper
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 
@@ -27,6 +29,10 @@ class Categoria(models.Model):
         db_table = 'categorias'
         verbose_name = 'Categoría'
         verbose_name_plural = 'Categorías'
+        indexes = [
+            # slug__iexact: en PostgreSQL Django compara UPPER(slug) = UPPER(valor)
+            models.Index(Upper('slug'), name='categoria_slug_upper_idx'),
+        ]
     
     def __str__(self):
         return self.nombre
@@ -46,6 +52,8 @@ class Producto(models.Model):
     precio = models.DecimalField(max_digits=10, decimal_places=2)
     precio_oferta = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, help_text='Precio en oferta (opcional). Si está presente se mostrará como precio actual.')
     imagen = models.ImageField(upload_to='productos/', null=True, blank=True)
+    # Versiones reducidas de `imagen` (ver apps.catalog.imagenes)
+    imagen_derivados = models.JSONField(default=dict, blank=True, editable=False)
     volumen_ml = models.PositiveIntegerField(null=True, blank=True, help_text='Capacidad en mililitros (ml)')
     marca = models.ForeignKey(Marca, on_delete=models.SET_NULL, null=True, blank=True, related_name='productos')
     categoria = models.ForeignKey(Categoria, on_delete=models.SET_NULL, null=True, blank=True, related_name='productos')
@@ -60,6 +68,13 @@ class Producto(models.Model):
         db_table = 'productos'
         verbose_name = 'Producto'
         verbose_name_plural = 'Productos'
+        indexes = [
+            # Catálogo y APIs por género: filtro activo/género ordenado por -id
+            models.Index(fields=['activo', 'genero', '-id'], name='producto_activo_genero_idx'),
+            # Listados de productos activos ordenados por -id (índice parcial)
+            models.Index(fields=['-id'], condition=Q(activo=True), name='producto_activos_idx'),
+            models.Index(fields=['-creado_en'], name='producto_creado_idx'),
+        ]
     
     def __str__(self):
         return self.nombre
@@ -70,3 +85,23 @@ class Producto(models.Model):
             raise ValidationError(
                 {'precio_oferta': 'El precio de oferta debe ser menor que el precio original.'}
             )
+
+
+class ProductoBusqueda(models.Model):
+    """
+    Documento de búsqueda por producto (nombre, marca, categorías y descripción
+    sin acentos). En PostgreSQL la tabla lleva además una columna `tsvector`
+    generada con índice GIN y en SQLite una tabla FTS5 sincronizada por
+    triggers; ambas se crean en la migración (ver `apps.catalog.search`).
+    """
+    producto = models.OneToOneField(Producto, on_delete=models.CASCADE, primary_key=True, related_name='busqueda')
+    documento = models.TextField(blank=True, default='')
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'productos_busqueda'
+        verbose_name = 'Documento de búsqueda'
+        verbose_name_plural = 'Documentos de búsqueda'
+
+    def __str__(self):
+        return f"Búsqueda({self.producto_id})"
@@ -0,0 +1,196 @@
+"""
+Paginación por cursor (keyset) para el catálogo.
+
+En lugar de `OFFSET` + `COUNT(*)`, cada página se pide con la clave de
+ordenamiento del último (o primer) elemento visto: `WHERE id < :cursor
+ORDER BY id DESC LIMIT n`. El costo de una página no depende de qué tan
+profunda sea. El total es opcional y aproximado (estimación del planificador
+en PostgreSQL).
+"""
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+def contar_aproximado(queryset):
+    """
+    Total aproximado de filas de `queryset`. En PostgreSQL usa la estimación
+    de `EXPLAIN` (no recorre la tabla); en otros motores hace `COUNT`.
+    """
+    queryset = queryset.order_by()
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def codificar_cursor(valores):
+    crudo = json.dumps(valores, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(crudo).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(token):
+    """Retorna la lista de valores del cursor o None si el token es inválido."""
+    if not token:
+        return None
+    try:
+        relleno = '=' * (-len(token) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(token + relleno))
+    except (ValueError, TypeError):
+        return None
+    return valores if isinstance(valores, list) else None
+
+
+class PaginaKeyset:
+    """Página de resultados con los cursores hacia la siguiente y la anterior."""
+
+    def __init__(self, object_list, next_cursor, previous_cursor, total=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.total = total
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Paginador por cursor sobre un ordenamiento cuya última columna es única
+    (por defecto `-id`). `ordering` acepta nombres de campo o anotaciones,
+    con `-` para orden descendente.
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-id',)):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = list(ordering)
+        self.campos = [campo.lstrip('-') for campo in self.ordering]
+
+    def _valores(self, obj):
+        return [getattr(obj, campo) for campo in self.campos]
+
+    def _campo(self, nombre):
+        anotacion = self.queryset.query.annotations.get(nombre)
+        if anotacion is not None:
+            return anotacion.output_field
+        return self.queryset.model._meta.get_field(nombre)
+
+    def _convertir(self, valores):
+        """
+        Valores del cursor convertidos al tipo de cada campo del ordenamiento,
+        o None si no corresponden (cursor alterado o de otro ordenamiento).
+        """
+        if not valores or len(valores) != len(self.campos):
+            return None
+        try:
+            convertidos = [self._campo(campo).to_python(valor) for campo, valor in zip(self.campos, valores)]
+        except (ValidationError, TypeError, ValueError, FieldDoesNotExist):
+            return None
+        return None if any(valor is None for valor in convertidos) else convertidos
+
+    def _filtro(self, valores, hacia_atras):
+        # (a, b) "después de" (x, y) en orden DESC: a < x OR (a = x AND b < y)
+        condicion = Q()
+        iguales = {}
+        for campo, orden, valor in zip(self.campos, self.ordering, valores):
+            descendente = orden.startswith('-') != hacia_atras
+            lookup = f'{campo}__lt' if descendente else f'{campo}__gt'
+            condicion |= Q(**iguales, **{lookup: valor})
+            iguales[campo] = valor
+        return condicion
+
+    def page(self, despues=None, antes=None, con_total=False):
+        """
+        Retorna la página que sigue al cursor `despues`, o la que precede al
+        cursor `antes`. Sin cursores retorna la primera página.
+        """
+        queryset = self.queryset
+        total = contar_aproximado(queryset) if con_total else None
+
+        # Un cursor inválido se ignora: se sirve la primera página
+        valores_antes = self._convertir(decodificar_cursor(antes))
+        valores_despues = None if valores_antes else self._convertir(decodificar_cursor(despues))
+        if valores_antes:
+            invertido = [c[1:] if c.startswith('-') else f'-{c}' for c in self.ordering]
+            filas = list(
+                queryset.filter(self._filtro(valores_antes, hacia_atras=True))
+                .order_by(*invertido)[:self.per_page + 1]
+            )
+            hay_anterior = len(filas) > self.per_page
+            filas = filas[:self.per_page][::-1]
+            hay_siguiente = True
+        else:
+            if valores_despues:
+                queryset = queryset.filter(self._filtro(valores_despues, hacia_atras=False))
+                hay_anterior = True
+            else:
+                hay_anterior = False
+            filas = list(queryset.order_by(*self.ordering)[:self.per_page + 1])
+            hay_siguiente = len(filas) > self.per_page
+            filas = filas[:self.per_page]
+
+        if not filas:
+            return PaginaKeyset([], None, None, total)
+        next_cursor = codificar_cursor(self._valores(filas[-1])) if hay_siguiente else None
+        previous_cursor = codificar_cursor(self._valores(filas[0])) if hay_anterior else None
+        return PaginaKeyset(filas, next_cursor, previous_cursor, total)
+
+
+class ProductoCursorPagination(CursorPagination):
+    """
+    Paginación por cursor para los endpoints REST de productos, ordenada por
+    `-id`. Con `?con_total=1` agrega `total_aproximado` a la respuesta.
+    """
+    ordering = '-id'
+    page_size = 24
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    total_query_param = 'con_total'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.total_aproximado = None
+        if request.query_params.get(self.total_query_param) in ('1', 'true'):
+            self.total_aproximado = contar_aproximado(queryset)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        payload = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.total_aproximado is not None:
+            payload['total_aproximado'] = self.total_aproximado
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        respuesta = super().get_paginated_response_schema(schema)
+        respuesta['properties']['total_aproximado'] = {'type': 'integer', 'nullable': True}
+        return respuesta
@@ -0,0 +1,131 @@
+"""
+Resolución de claves de filtro a categorías.
+
+Mantiene en memoria del proceso una tabla con todas las categorías
+(id, slug y nombre normalizados) construida con una sola consulta. La tabla
+se invalida con las señales de guardado/borrado de `Categoria`
+(ver `apps.catalog.signals`), de modo que en estado estable resolver un
+filtro del catálogo, de la API o del chatbot no toca la base de datos.
+"""
+import threading
+import unicodedata
+
+from .models import Categoria
+
+# Conjunto fijo y ordenado de etiquetas para los filtros del catálogo
+FILTROS_CATALOGO = (
+    ('todas', 'Todos'),
+    ('hombre', 'Hombre'),
+    ('mujer', 'Mujer'),
+    ('unisex', 'Unisex'),
+    ('floral', 'Floral'),
+    ('amaderado', 'Amaderado'),
+    ('citrico', 'Cítrico'),
+    ('oriental', 'Oriental'),
+)
+
+# Máximo de claves arbitrarias (p. ej. ?categoria=... escrito a mano) memorizadas
+MAX_CLAVES_MEMORIZADAS = 512
+
+_lock = threading.Lock()
+_tabla = None
+
+
+def normalizar(texto):
+    """Quita acentos y convierte a minúsculas."""
+    if not texto:
+        return ''
+    return unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii').lower()
+
+
+class TablaCategorias:
+    """Mapa precalculado clave normalizada -> id de categoría."""
+
+    def __init__(self, filas):
+        # filas: [(id, slug, nombre)] ordenadas por id
+        self.filas = [
+            (cat_id, (slug or '').lower(), (nombre or '').lower(), normalizar(nombre))
+            for cat_id, slug, nombre in filas
+        ]
+        self.ids = {fila[0] for fila in self.filas}
+        self._exactos = {}
+        for cat_id, slug, nombre, _ in self.filas:
+            for clave in {slug, nombre}:
+                if clave:
+                    self._exactos.setdefault(clave, []).append(cat_id)
+        self._resueltas = {}
+        self.filtros = [
+            {'id': 'todas' if key == 'todas' else (self.resolver(key) or key), 'nombre': label}
+            for key, label in FILTROS_CATALOGO
+        ]
+
+    def ids_exactos(self, clave):
+        """Ids cuyas slug o nombre coinciden exactamente (sin distinguir mayúsculas)."""
+        return list(self._exactos.get((clave or '').lower(), []))
+
+    def resolver(self, clave):
+        """
+        Resuelve una clave textual a un id de categoría.
+
+        Orden de preferencia: slug exacto, nombre exacto, nombre que contiene
+        la clave y, por último, coincidencia sin acentos. Ante empates gana
+        el id más bajo. Retorna None si no hay coincidencia.
+        """
+        clave = (clave or '').strip().lower()
+        if not clave:
+            return None
+        if clave in self._resueltas:
+            return self._resueltas[clave]
+
+        cat_id = None
+        for _id, slug, _nombre, _norm in self.filas:
+            if slug == clave:
+                cat_id = _id
+                break
+        if cat_id is None:
+            cat_id = next((_id for _id, _s, nombre, _n in self.filas if nombre == clave), None)
+        if cat_id is None:
+            cat_id = next((_id for _id, _s, nombre, _n in self.filas if clave in nombre), None)
+        if cat_id is None:
+            clave_norm = normalizar(clave)
+            cat_id = next((_id for _id, _s, _nombre, norm in self.filas if clave_norm in norm), None)
+
+        if len(self._resueltas) >= MAX_CLAVES_MEMORIZADAS:
+            self._resueltas.clear()
+        self._resueltas[clave] = cat_id
+        return cat_id
+
+
+def obtener_tabla():
+    """Retorna la tabla de categorías, construyéndola si fue invalidada."""
+    global _tabla
+    tabla = _tabla
+    if tabla is not None:
+        return tabla
+    with _lock:
+        if _tabla is None:
+            filas = Categoria.objects.order_by('id').values_list('id', 'slug', 'nombre')
+            _tabla = TablaCategorias(list(filas))
+        return _tabla
+
+
+def invalidar(**kwargs):
+    """Descarta la tabla; la siguiente lectura la reconstruye."""
+    global _tabla
+    with _lock:
+        _tabla = None
+
+
+def resolver_categoria(clave):
+    """Atajo para `obtener_tabla().resolver(clave)`."""
+    return obtener_tabla().resolver(clave)
+
+
+def ids_categoria_exacta(clave):
+    """Atajo para `obtener_tabla().ids_exactos(clave)`."""
+    return obtener_tabla().ids_exactos(clave)
+
+
+def filtros_catalogo():
+    """Lista de filtros (`id`, `nombre`) para la plantilla del catálogo."""
+    return [dict(filtro) for filtro in obtener_tabla().filtros]
@@ -0,0 +1,131 @@
+"""
+Búsqueda de texto completo sobre el catálogo.
+
+Cada `Producto` tiene un `ProductoBusqueda` con su documento (nombre, marca,
+categorías y descripción sin acentos). El índice depende del motor:
+
+- PostgreSQL: columna `vector` (tsvector generado) con índice GIN.
+- SQLite: tabla virtual FTS5 `productos_fts` sincronizada por triggers.
+- Cualquier otro caso: `contains` sobre el documento (ya en minúsculas).
+
+Los documentos se mantienen al día con las señales de `apps.catalog.signals`.
+"""
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Prefetch, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Producto, ProductoBusqueda, Categoria
+from .resolver import normalizar
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+_fts5_disponible = None
+
+
+def tokenizar(texto):
+    """Separa un texto en términos sin acentos, en minúsculas."""
+    return _TOKEN_RE.findall(normalizar(texto))
+
+
+def construir_documento(producto):
+    """Arma el texto indexable de un producto."""
+    partes = [
+        producto.nombre,
+        producto.marca.nombre if producto.marca else '',
+        producto.categoria.nombre if producto.categoria else '',
+        ' '.join(c.nombre for c in producto.categorias_secundarias.all()),
+        producto.descripcion or '',
+    ]
+    return normalizar(' '.join(p for p in partes if p))
+
+
+def _productos_para_indexar():
+    return Producto.objects.select_related('marca', 'categoria').prefetch_related(
+        Prefetch('categorias_secundarias', queryset=Categoria.objects.only('id', 'nombre'))
+    )
+
+
+def indexar_producto(producto):
+    """Crea o actualiza el documento de un producto."""
+    ProductoBusqueda.objects.update_or_create(
+        producto_id=producto.pk,
+        defaults={'documento': construir_documento(producto)},
+    )
+
+
+def indexar_productos(ids=None, batch_size=500):
+    """
+    (Re)construye documentos en bloque. Sin `ids` recorre todo el catálogo.
+    Retorna la cantidad de documentos escritos.
+    """
+    productos = _productos_para_indexar().order_by('id')
+    if ids is not None:
+        productos = productos.filter(id__in=list(ids))
+
+    total = 0
+    lote = []
+    for producto in productos.iterator(chunk_size=batch_size):
+        lote.append(ProductoBusqueda(producto_id=producto.id, documento=construir_documento(producto)))
+        if len(lote) >= batch_size:
+            total += _guardar_lote(lote)
+            lote = []
+    if lote:
+        total += _guardar_lote(lote)
+    return total
+
+
+def _guardar_lote(lote):
+    ProductoBusqueda.objects.bulk_create(
+        lote,
+        update_conflicts=True,
+        unique_fields=['producto'],
+        update_fields=['documento', 'actualizado_en'],
+    )
+    return len(lote)
+
+
+def _usa_fts5():
+    """Indica si existe la tabla FTS5 en SQLite (se crea solo si el motor la soporta)."""
+    global _fts5_disponible
+    if _fts5_disponible is None:
+        _fts5_disponible = 'productos_fts' in connection.introspection.table_names()
+    return _fts5_disponible
+
+
+def buscar_productos(queryset, texto):
+    """
+    Filtra `queryset` con los productos que contienen todos los términos de
+    `texto` (con coincidencia por prefijo) y lo ordena por relevancia.
+    Agrega la anotación `relevancia` (mayor es mejor).
+    """
+    terminos = tokenizar(texto)
+    if not terminos:
+        return queryset
+
+    tabla = Producto._meta.db_table
+    if connection.vendor == 'postgresql':
+        consulta = ' & '.join(f'{t}:*' for t in terminos)
+        queryset = queryset.filter(id__in=RawSQL(
+            "SELECT producto_id FROM productos_busqueda "
+            "WHERE vector @@ to_tsquery('simple', %s)", [consulta]
+        )).annotate(relevancia=RawSQL(
+            "SELECT ts_rank(vector, to_tsquery('simple', %s)) FROM productos_busqueda "
+            f"WHERE producto_id = {tabla}.id", [consulta]
+        ))
+    elif connection.vendor == 'sqlite' and _usa_fts5():
+        consulta = ' '.join(f'"{t}"*' for t in terminos)
+        # bm25 de FTS5 es menor cuanto más relevante; se invierte el signo
+        queryset = queryset.filter(id__in=RawSQL(
+            "SELECT rowid FROM productos_fts WHERE productos_fts MATCH %s", [consulta]
+        )).annotate(relevancia=RawSQL(
+            "SELECT -rank FROM productos_fts WHERE productos_fts MATCH %s "
+            f"AND rowid = {tabla}.id", [consulta]
+        ))
+    else:
+        for termino in terminos:
+            queryset = queryset.filter(busqueda__documento__contains=termino)
+        queryset = queryset.annotate(relevancia=Value(0.0, output_field=FloatField()))
+
+    return queryset.order_by('-relevancia', '-id')
@@ -0,0 +1,83 @@
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from apps.core.jobs import encolar
+from .models import Categoria, Marca, Producto
+from . import caching, imagenes, resolver, search
+
+
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+def invalidar_tabla_categorias(sender, **kwargs):
+    # Cualquier alta, cambio o baja de categoría invalida la tabla de resolución
+    resolver.invalidar()
+
+
+@receiver(post_save, sender=Producto)
+def indexar_producto(sender, instance, raw=False, **kwargs):
+    # Las cargas de fixtures (raw) se indexan en bloque después
+    if raw:
+        return
+    search.indexar_producto(instance)
+
+
+@receiver(post_save, sender=Producto)
+def encolar_derivados_imagen(sender, instance, raw=False, **kwargs):
+    # Los derivados se generan fuera del request; los cargados con la imagen (raw) ya vienen
+    if raw:
+        return
+    origen = (instance.imagen_derivados or {}).get('origen')
+    if (instance.imagen.name or None) != origen:
+        encolar('generar_derivados_imagen', {'producto_id': instance.id})
+
+
+@receiver(post_delete, sender=Producto)
+def eliminar_derivados_imagen(sender, instance, **kwargs):
+    imagenes.eliminar(instance.imagen_derivados or {})
+
+
+@receiver(m2m_changed, sender=Producto.categorias_secundarias.through)
+def indexar_categorias_secundarias(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # Recordar los productos afectados antes de que se borre la relación
+        instance._ids_reindexar = list(instance.productos_secundarios.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        # Cambios desde el lado de la categoría: reindexar los productos afectados
+        ids = pk_set if pk_set else getattr(instance, '_ids_reindexar', [])
+        search.indexar_productos(ids=ids)
+    else:
+        search.indexar_producto(instance)
+
+
+@receiver(post_save, sender=Categoria)
+def reindexar_por_categoria(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    ids = Producto.objects.filter(
+        Q(categoria=instance) | Q(categorias_secundarias=instance)
+    ).values_list('id', flat=True).distinct()
+    search.indexar_productos(ids=ids)
+
+
+@receiver(post_save, sender=Marca)
+def reindexar_por_marca(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    search.indexar_productos(ids=instance.productos.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+@receiver(post_save, sender=Marca)
+@receiver(post_delete, sender=Marca)
+@receiver(m2m_changed, sender=Producto.categorias_secundarias.through)
+def invalidar_respuestas_catalogo(sender, **kwargs):
+    # Las respuestas JSON cacheadas del catálogo dejan de ser válidas
+    if kwargs.get('action', 'post_').startswith('post_'):
+        caching.invalidar(caching.GRUPO_CATALOGO)
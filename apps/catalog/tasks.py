@@ -0,0 +1,8 @@
+"""Tareas diferidas del catálogo (ver `apps.core.jobs`)."""
+from apps.core.jobs import tarea
+from . import imagenes
+
+
+@tarea('generar_derivados_imagen')
+def generar_derivados_imagen(producto_id):
+    imagenes.actualizar(producto_id)
@@ -0,0 +1,23 @@
+from django import template
+
+from apps.catalog import imagenes
+
+register = template.Library()
+
+
+@register.filter
+def miniatura(producto, ancho=imagenes.ANCHO_MINIATURA):
+    """URL de la versión reducida de la imagen del producto (o del original)."""
+    return imagenes.url(producto, int(ancho))
+
+
+@register.filter
+def srcset(producto):
+    """`srcset` con los derivados de la imagen del producto."""
+    return imagenes.srcset(producto)
+
+
+@register.filter
+def srcset_completo(producto):
+    """`srcset` con los derivados y el original, para imágenes grandes."""
+    return imagenes.srcset(producto, original=True)
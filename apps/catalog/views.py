@@ -1,9 +1,13 @@
 from django.shortcuts import render, get_object_or_404
-import logging
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.db.models import Q
-from .models import Producto, Categoria
+from .models import Producto
+from . import imagenes
+from .resolver import resolver_categoria, ids_categoria_exacta, filtros_catalogo
+from .search import buscar_productos
+from .pagination import KeysetPaginator
+from .caching import cachear_json, GRUPO_CATALOGO, GRUPO_VENTAS
 from django.http import JsonResponse
+from apps.orders.ranking import alcance_desde_parametros, top_productos
 
 def catalogo(request):
     """Vista que renderiza el catálogo adaptado a la perfumería."""
@@ -17,97 +21,41 @@ def catalogo(request):
         if categoria_param in genero_keys:
             productos_list = productos_list.filter(genero=categoria_param)
         elif categoria_param.isdigit():
-            # Si se pasó un id numérico, buscar la categoría y filtrar tanto por
-            # categoría principal como por categorías secundarias.
-            try:
-                cat_by_id = Categoria.objects.filter(id=int(categoria_param)).first()
-            except (ValueError, TypeError):
-                cat_by_id = None
-            if cat_by_id:
-                productos_list = productos_list.filter(Q(categoria=cat_by_id) | Q(categorias_secundarias=cat_by_id))
-            else:
-                productos_list = productos_list.filter(categoria_id=categoria_param)
+            # Si se pasó un id numérico, filtrar tanto por categoría principal
+            # como por categorías secundarias.
+            cat_id = int(categoria_param)
+            productos_list = productos_list.filter(Q(categoria_id=cat_id) | Q(categorias_secundarias=cat_id))
         else:
             # mapear clave textual a una categoría existente por slug o coincidencia parcial
-            cat_match = Categoria.objects.filter(slug__iexact=categoria_param).order_by('id').first()
-            if not cat_match:
-                cat_match = Categoria.objects.filter(nombre__icontains=categoria_param).order_by('id').first()
-            if cat_match:
+            cat_id = resolver_categoria(categoria_param)
+            if cat_id:
                 # incluir productos cuya categoria principal sea la buscada o que tengan la categoria en las secundarias
-                productos_list = productos_list.filter(Q(categoria=cat_match) | Q(categorias_secundarias=cat_match))
+                productos_list = productos_list.filter(Q(categoria_id=cat_id) | Q(categorias_secundarias=cat_id))
             else:
-                # Fallback: buscar directamente en los nombres/slugs de las categorías principales o secundarias
-                productos_list = productos_list.filter(
-                    Q(categoria__slug__iexact=categoria_param) |
-                    Q(categoria__nombre__icontains=categoria_param) |
-                    Q(categorias_secundarias__slug__iexact=categoria_param) |
-                    Q(categorias_secundarias__nombre__icontains=categoria_param)
-                )
-
-    # Filtrado por búsqueda
-    query = request.GET.get('q')
-    if query:
-        productos_list = productos_list.filter(nombre__icontains=query)
-    
+                productos_list = productos_list.none()
+
     # Evitar duplicados cuando se usan relaciones ManyToMany en filtros
     productos_list = productos_list.distinct()
-    # (removed temporary debug logging)
-    paginator = Paginator(productos_list, 12)  # Mostrar 12 productos por página
-    page = request.GET.get('page')
-    
-    try:
-        productos = paginator.page(page)
-    except PageNotAnInteger:
-        # Si la página no es un entero, mostrar la primera página.
-        productos = paginator.page(1)
-    except EmptyPage:
-        # Si la página está fuera de rango, mostrar la última página de resultados.
-        productos = paginator.page(paginator.num_pages)
-
-    # Usar un conjunto fijo y ordenado de etiquetas para los filtros del catálogo
-    fixed = [
-        ('todas', 'Todos'),
-        ('hombre', 'Hombre'),
-        ('mujer', 'Mujer'),
-        ('unisex', 'Unisex'),
-        ('floral', 'Floral'),
-        ('amaderado', 'Amaderado'),
-        ('citrico', 'Cítrico'),
-        ('oriental', 'Oriental'),
-    ]
-
-    # Construir lista de diccionarios con keys `id` y `nombre` para mantener compatibilidad con la plantilla
-    categorias = []
-    import unicodedata
-    def _norm(s):
-        if not s:
-            return ''
-        return unicodedata.normalize('NFKD', s).encode('ascii', 'ignore').decode('ascii').lower()
-
-    for key, label in fixed:
-        if key == 'todas':
-            categorias.append({'id': 'todas', 'nombre': label})
-        else:
-            # Prefer exact matches by slug or name, fallback to contains or normalized match
-            cat = Categoria.objects.filter(slug__iexact=key).first()
-            if not cat:
-                cat = Categoria.objects.filter(nombre__iexact=key).first()
-            if not cat:
-                cat = Categoria.objects.filter(nombre__icontains=key).order_by('id').first()
-            if not cat:
-                key_norm = _norm(key)
-                for c in Categoria.objects.all():
-                    if key_norm in _norm(c.nombre):
-                        cat = c
-                        break
-            categorias.append({'id': cat.id if cat else key, 'nombre': label})
-
-    # Debug: log sample de categorias y productos para ayudar a depurar
-    logger = logging.getLogger(__name__)
-    try:
-        logger.warning('DEBUG categorias count=%s sample=%s', len(categorias), [c['nombre'] for c in categorias[:10]])
-    except Exception as e:
-        logger.exception('Error logging categorias: %s', e)
+
+    # Búsqueda de texto completo (nombre, marca, categorías y descripción), ordenada por relevancia
+    query = request.GET.get('q')
+    if query:
+        productos_list = buscar_productos(productos_list, query)
+    if 'relevancia' in productos_list.query.annotations:
+        ordering = ('-relevancia', '-id')
+    else:
+        ordering = ('-id',)
+
+    # Paginación por cursor: 12 productos por página, sin OFFSET ni COUNT (el total es opcional)
+    paginator = KeysetPaginator(productos_list, 12, ordering=ordering)
+    productos = paginator.page(
+        despues=request.GET.get('despues'),
+        antes=request.GET.get('antes'),
+        con_total=request.GET.get('con_total') == '1',
+    )
+
+    # Etiquetas fijas de filtros resueltas contra la tabla de categorías en memoria
+    categorias = filtros_catalogo()
     context = {
         'productos': productos,
         'categorias': categorias,
@@ -128,6 +76,7 @@ def detalle_producto(request, producto_id):
     return render(request, 'catalogo/detalle.html', context)
 
 
+@cachear_json(GRUPO_CATALOGO)
 def api_productos_por_genero(request, genero_param):
     """
     API que retorna productos filtrados por género.
@@ -141,6 +90,7 @@ def api_productos_por_genero(request, genero_param):
             'nombre': producto.nombre,
             'precio': float(producto.precio_oferta if producto.precio_oferta else producto.precio),
             'imagen': producto.imagen.url if producto.imagen else '/static/img/placeholder.jpg', # Asumiendo un placeholder por defecto
+            **imagenes.datos_json(producto),
             'marca': producto.marca.nombre if producto.marca else '',
             'genero': producto.get_genero_display(),
             'categoria_principal': producto.categoria.nombre if producto.categoria else '',
@@ -149,18 +99,19 @@ def api_productos_por_genero(request, genero_param):
     return JsonResponse(products_data, safe=False)
 
 
+@cachear_json(GRUPO_CATALOGO)
 def api_productos_por_categoria(request, categoria_param):
     """
     API que retorna productos filtrados por categoría (nombre o slug).
     """
     productos_list = Producto.objects.filter(activo=True).select_related('marca', 'categoria').prefetch_related('categorias_secundarias').order_by('-id')
 
-    # Construir un objeto Q para filtrar por categorías principales o secundarias
-    category_filter = Q(categoria__slug__iexact=categoria_param) | \
-                      Q(categoria__nombre__iexact=categoria_param) | \
-                      Q(categorias_secundarias__slug__iexact=categoria_param) | \
-                      Q(categorias_secundarias__nombre__iexact=categoria_param)
-    
+    # Ids de categorías cuyo slug o nombre coincide exactamente
+    cat_ids = ids_categoria_exacta(categoria_param)
+    if not cat_ids:
+        return JsonResponse([], safe=False)
+
+    category_filter = Q(categoria_id__in=cat_ids) | Q(categorias_secundarias__in=cat_ids)
     productos_list = productos_list.filter(category_filter).distinct()
 
     products_data = []
@@ -170,6 +121,7 @@ def api_productos_por_categoria(request, categoria_param):
             'nombre': producto.nombre,
             'precio': float(producto.precio_oferta if producto.precio_oferta else producto.precio),
             'imagen': producto.imagen.url if producto.imagen else '/static/img/placeholder.jpg', # Asumiendo un placeholder por defecto
+            **imagenes.datos_json(producto),
             'marca': producto.marca.nombre if producto.marca else '',
             'genero': producto.get_genero_display(),
             'categoria_principal': producto.categoria.nombre if producto.categoria else '',
@@ -179,17 +131,20 @@ def api_productos_por_categoria(request, categoria_param):
     return JsonResponse(products_data, safe=False)
 
 
+@cachear_json(GRUPO_CATALOGO, GRUPO_VENTAS)
 def api_best_sellers(request):
     """
-    API que retorna los productos más vendidos.
-    (Placeholder: actualmente retorna los 8 productos más recientes)
-    Para una implementación real, se necesitaría un modelo de ventas/pedidos
-    para calcular los más vendidos.
+    API que retorna los 8 productos más vendidos según el ranking materializado
+    (`apps.orders.ranking`). Acepta ?ventana=7|30|90 y ?genero= o ?categoria=.
     """
-    # Placeholder: Retorna los 8 productos más recientes como "best sellers"
-    # En una implementación real, esto se basaría en datos de ventas.
-    productos_list = Producto.objects.filter(activo=True).order_by('-creado_en')[:8] # O por conteo de ventas
-    
+    ventana, alcance = alcance_desde_parametros(
+        genero=request.GET.get('genero'),
+        categoria=request.GET.get('categoria'),
+        ventana=request.GET.get('ventana'),
+    )
+    queryset = Producto.objects.select_related('marca', 'categoria').prefetch_related('categorias_secundarias')
+    productos_list = top_productos(8, ventana=ventana, alcance=alcance, queryset=queryset)
+
     products_data = []
     for producto in productos_list:
         products_data.append({
@@ -197,6 +152,7 @@ def api_best_sellers(request):
             'nombre': producto.nombre,
             'precio': float(producto.precio_oferta if producto.precio_oferta else producto.precio),
             'imagen': producto.imagen.url if producto.imagen else '/static/img/placeholder.jpg',
+            **imagenes.datos_json(producto),
             'marca': producto.marca.nombre if producto.marca else '',
             'genero': producto.get_genero_display(),
             'categoria_principal': producto.categoria.nombre if producto.categoria else '',
@@ -0,0 +1,21 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tarea', 'estado', 'intentos', 'max_intentos', 'ejecutar_desde', 'worker', 'creado_en')
+    list_filter = ('estado', 'tarea')
+    search_fields = ('tarea', 'ultimo_error')
+    readonly_fields = ('creado_en', 'actualizado_en', 'completado_en', 'worker', 'bloqueado_hasta')
+    actions = ['reintentar']
+
+    def reintentar(self, request, queryset):
+        actualizadas = queryset.exclude(estado='en_proceso').update(
+            estado='pendiente', intentos=0, ejecutar_desde=timezone.now(), ultimo_error='',
+            actualizado_en=timezone.now(),
+        )
+        self.message_user(request, f'{actualizadas} tareas reprogramadas')
+    reintentar.short_description = 'Reintentar ahora'
@@ -1,5 +1,14 @@
-from django.apps import AppConfig
+from importlib import import_module
+
+from django.apps import AppConfig, apps
+from django.utils.module_loading import module_has_submodule
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.core'
+
+    def ready(self):
+        # Registrar las tareas de la cola (módulo tasks.py de cada app del proyecto)
+        for config in apps.get_app_configs():
+            if config.name.startswith('apps.') and module_has_submodule(config.module, 'tasks'):
+                import_module(f'{config.name}.tasks')
@@ -0,0 +1,635 @@
+"""
+Respaldo y restauración de la base de datos en formato fixture de Django.
+
+El respaldo se escribe en streaming: cada modelo se recorre con
+`QuerySet.iterator(chunk_size=...)` y cada registro se serializa y escribe
+apenas se lee, así que la memoria no crece con el tamaño de la base. Los
+conteos salen del propio recorrido (sin un `count()` aparte).
+
+Formatos:
+- 'json': arreglo JSON con un registro por línea, compatible con `loaddata`.
+- 'jsonl': JSON Lines, un registro por línea sin arreglo.
+Con la extensión `.gz` (o `comprimir=True`) el archivo se escribe con gzip.
+
+Con `hilos > 1` cada modelo se exporta en paralelo a un archivo parcial y al
+final se concatenan en orden de modelo, de modo que el resultado es el mismo
+que en serie. El archivo final se escribe en un temporal y se renombra: un
+respaldo interrumpido nunca reemplaza al anterior.
+
+`restaurar` lee el respaldo en streaming (cualquiera de los formatos, también
+los fixtures con sangría de versiones anteriores), separa los registros por
+modelo en archivos temporales y los inserta en orden de dependencias con
+`bulk_create` por lotes, todo en una transacción. Los M2M se insertan en
+bloque en la tabla intermedia después de cada lote. `bulk_create` no envía
+señales por fila: los datos derivados (índice de búsqueda, perfiles,
+agregados) los reconstruye en bloque quien restaura (`restore_database`).
+
+Respaldos incrementales (`exportar_incremental`): la primera vez se genera la
+base y un manifiesto (`<nombre>.manifest.json`) con la marca de agua de cada
+modelo, el máximo de su `actualizado_en`. Las corridas siguientes escriben un
+delta encadenado (`<nombre>.delta-0001.json`, ...) solo con las filas
+modificadas desde la marca anterior. Los modelos sin columna de cambio van
+completos en cada delta. Las bajas se registran comparando las claves
+vigentes con las del respaldo anterior (`<nombre>.claves.json`): cada delta
+lleva, por modelo, un registro `{"model": ..., "borrados": [...]}` con los pk
+(o claves naturales) eliminados, que `restaurar` borra después de insertar.
+Por esos registros los deltas no son fixtures para `loaddata`; la base sí.
+Cada `MAX_DELTAS` deltas (o a pedido) se genera una base nueva.
+`cadena` devuelve base + deltas en orden para restaurarlos.
+"""
+import gzip
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from datetime import timedelta
+from itertools import islice
+from pathlib import Path
+
+from django.apps import apps
+from django.core import serializers
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, connections, transaction
+from django.db.models import F, Max
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+FORMATOS = ('json', 'jsonl')
+LOTE = 2000
+
+# Respaldos incrementales: columna de última modificación, solapamiento entre
+# deltas (las filas repetidas se sobrescriben al restaurar) y largo máximo de
+# la cadena antes de generar una base nueva
+CAMPO_CAMBIO = 'actualizado_en'
+CAMPOS_CAMBIO = {
+    # Las líneas se crean y editan junto con su pedido, que sí registra el cambio
+    'orders.detallepedido': 'pedido__actualizado_en',
+    # Los eventos cambian al recibirse y al procesarse
+    'orders.webhookevent': Coalesce('procesado_en', 'recibido_en'),
+}
+MARGEN_DELTA = timedelta(minutes=1)
+MAX_DELTAS = 20
+
+EXCLUIDOS = {
+    "admin.logentry",
+    "auth.permission",
+    "contenttypes.contenttype",
+    "sessions.session",
+    # Tablas derivadas: restore_database las reconstruye desde sus fuentes
+    "catalog.productobusqueda",
+    "orders.rankingventas",
+    "orders.ventadiaria",
+}
+
+
+def abrir(ruta, modo='rt'):
+    """Abre `ruta` como texto UTF-8, con gzip si termina en `.gz`."""
+    ruta = Path(ruta)
+    if ruta.suffix == '.gz':
+        return gzip.open(ruta, modo, encoding='utf-8', compresslevel=6)
+    return ruta.open(modo[0], encoding='utf-8')
+
+
+def modelos_exportables():
+    """Retorna (modelos a exportar, etiquetas omitidas por exclusión o por no tener tabla)."""
+    tablas = set(connection.introspection.table_names())
+    modelos, omitidos = [], []
+    for model in sorted(apps.get_models(include_auto_created=False), key=lambda item: item._meta.label_lower):
+        if not model._meta.managed or model._meta.proxy:
+            continue
+        if model._meta.label_lower in EXCLUIDOS or model._meta.db_table not in tablas:
+            omitidos.append(model._meta.label)
+            continue
+        modelos.append(model)
+    return modelos, omitidos
+
+
+def campo_cambio(model):
+    """
+    Columna (o expresión) que registra la última modificación de las filas de
+    `model`, o None si no tiene: entonces cada delta la copia entera.
+    """
+    campo = CAMPOS_CAMBIO.get(model._meta.label_lower)
+    if campo is None and any(field.name == CAMPO_CAMBIO for field in model._meta.concrete_fields):
+        campo = CAMPO_CAMBIO
+    return campo
+
+
+def queryset_respaldo(model, desde=None):
+    """
+    QuerySet de `model` listo para serializar sin consultas por fila: las FK
+    a modelos con clave natural van en el mismo SELECT y los M2M se
+    precargan por lote. Con `desde` (y un campo de cambio) solo las filas
+    modificadas desde ese momento.
+    """
+    relacionados = [
+        field.name for field in model._meta.concrete_fields
+        if field.is_relation and hasattr(field.related_model, 'natural_key')
+    ]
+    m2m = [
+        field.name for field in model._meta.many_to_many
+        if field.remote_field.through._meta.auto_created
+    ]
+    queryset = model._default_manager.order_by('pk')
+    campo = campo_cambio(model)
+    if desde is not None and campo:
+        queryset = queryset.alias(cambio_respaldo=F(campo) if isinstance(campo, str) else campo)
+        queryset = queryset.filter(cambio_respaldo__gte=desde)
+    if relacionados:
+        queryset = queryset.select_related(*relacionados)
+    if m2m:
+        queryset = queryset.prefetch_related(*m2m)
+    return queryset
+
+
+def registros(queryset, lote=LOTE):
+    """
+    Itera los registros serializados (dicts del formato fixture) de
+    `queryset`, de a `lote` objetos: nunca hay más de un lote en memoria.
+    """
+    objetos = queryset.iterator(chunk_size=lote)
+    while True:
+        bloque = list(islice(objetos, lote))
+        if not bloque:
+            return
+        yield from serializers.serialize(
+            "python", bloque, use_natural_foreign_keys=True, use_natural_primary_keys=True,
+        )
+
+
+def linea(registro):
+    return json.dumps(registro, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+class Escritor:
+    """Escribe líneas de registro en `salida` con el formato del respaldo."""
+
+    def __init__(self, salida, formato='json'):
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato de respaldo desconocido: {formato}")
+        self.salida = salida
+        self.arreglo = formato == 'json'
+        self.primero = True
+        if self.arreglo:
+            self.salida.write('[\n')
+
+    def escribir(self, linea_json):
+        if not self.primero:
+            self.salida.write(',\n' if self.arreglo else '\n')
+        self.salida.write(linea_json)
+        self.primero = False
+
+    def cerrar(self):
+        if self.arreglo:
+            self.salida.write('\n]\n')
+        elif not self.primero:
+            self.salida.write('\n')
+
+
+def exportar_modelo(model, escribir, lote=LOTE, desde=None):
+    """Pasa a `escribir` una línea JSON por registro de `model`. Retorna la cantidad."""
+    cantidad = 0
+    for registro in registros(queryset_respaldo(model, desde), lote):
+        escribir(linea(registro))
+        cantidad += 1
+    return cantidad
+
+
+def _exportar_parcial(model, directorio, lote, desde):
+    """Exporta `model` a su archivo parcial (una línea por registro) desde un hilo."""
+    ruta = Path(directorio) / f"{model._meta.label_lower}.jsonl"
+    try:
+        with ruta.open('w', encoding='utf-8') as parcial:
+            cantidad = exportar_modelo(model, lambda texto: parcial.write(texto + '\n'), lote, desde)
+    finally:
+        connections.close_all()
+    return ruta, cantidad
+
+
+def exportar(ruta, formato='json', lote=LOTE, hilos=1, modelos=None, desde=None, borrados=None):
+    """
+    Exporta `modelos` (por defecto todos los exportables) a `ruta`. Retorna
+    una lista de (etiqueta, cantidad) en orden de modelo; si no hay registros
+    no se toca el archivo existente. `desde` (etiqueta -> datetime) limita
+    cada modelo a las filas modificadas desde esa fecha; `borrados`
+    (etiqueta -> claves) agrega al final los registros de bajas.
+    """
+    ruta = Path(ruta)
+    if modelos is None:
+        modelos, _ = modelos_exportables()
+    desde = desde or {}
+    filtro = lambda model: desde.get(model._meta.label_lower)
+    temporal = ruta.with_name(f".{ruta.name}")
+    conteos = []
+    try:
+        with abrir(temporal, 'wt') as salida:
+            escritor = Escritor(salida, formato)
+            if hilos > 1 and len(modelos) > 1:
+                with tempfile.TemporaryDirectory(dir=ruta.parent) as directorio:
+                    with ThreadPoolExecutor(max_workers=hilos) as pool:
+                        partes = list(pool.map(lambda model: _exportar_parcial(model, directorio, lote, filtro(model)), modelos))
+                    for model, (parcial, cantidad) in zip(modelos, partes):
+                        with parcial.open('r', encoding='utf-8') as entrada:
+                            for texto in entrada:
+                                escritor.escribir(texto.rstrip('\n'))
+                        conteos.append((model._meta.label, cantidad))
+            else:
+                for model in modelos:
+                    conteos.append((model._meta.label, exportar_modelo(model, escritor.escribir, lote, filtro(model))))
+            for etiqueta, claves in (borrados or {}).items():
+                escritor.escribir(linea({'model': etiqueta, 'borrados': claves}))
+            escritor.cerrar()
+        if any(cantidad for _, cantidad in conteos) or borrados:
+            os.replace(temporal, ruta)
+    finally:
+        if temporal.exists():
+            temporal.unlink()
+    return [(etiqueta, cantidad) for etiqueta, cantidad in conteos if cantidad]
+
+
+def leer_registros(ruta, tamano=1 << 16):
+    """
+    Itera los registros de un respaldo sin cargarlo completo: sirve para el
+    arreglo JSON (con o sin sangría) y para JSON Lines, comprimidos o no.
+    """
+    decoder = json.JSONDecoder()
+    with abrir(ruta) as entrada:
+        buffer, pos, agotado = '', 0, False
+        while True:
+            # Entre registros solo hay espacios, comas y los corchetes del arreglo
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,[]':
+                pos += 1
+            if pos == len(buffer):
+                buffer, pos = entrada.read(tamano), 0
+                if not buffer:
+                    return
+                continue
+            try:
+                registro, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if agotado:
+                    raise
+                # Registro cortado al final del bloque: leer más y reintentar
+                resto = entrada.read(tamano)
+                agotado = not resto
+                buffer, pos = buffer[pos:] + resto, 0
+                continue
+            agotado = False
+            yield registro
+
+
+def orden_dependencias(modelos):
+    """Ordena `modelos` de modo que cada uno venga después de los que referencia."""
+    pendientes = sorted(modelos, key=lambda model: model._meta.label_lower)
+    dependencias = {
+        model: {
+            field.related_model for field in (*model._meta.concrete_fields, *model._meta.many_to_many)
+            if field.is_relation and field.related_model in pendientes and field.related_model is not model
+        }
+        for model in pendientes
+    }
+    ordenados = []
+    while pendientes:
+        listos = [model for model in pendientes if dependencias[model] <= set(ordenados)]
+        # Con un ciclo se sigue en orden alfabético: las FK se validan al confirmar
+        for model in listos or pendientes[:1]:
+            ordenados.append(model)
+            pendientes.remove(model)
+    return ordenados
+
+
+class _Claves:
+    """Resuelve claves naturales a pk con una consulta por modelo, no por fila."""
+
+    def __init__(self):
+        self._pks = {}
+        self._cargados = set()
+
+    def _cargar(self, model):
+        if model not in self._cargados:
+            self._cargados.add(model)
+            for obj in model._default_manager.iterator():
+                self.registrar(obj)
+
+    def registrar(self, obj):
+        self._pks[(obj._meta.label_lower, tuple(obj.natural_key()))] = obj.pk
+
+    def existente(self, model, clave):
+        self._cargar(model)
+        return self._pks.get((model._meta.label_lower, tuple(clave)))
+
+    def pk(self, model, clave):
+        pk = self.existente(model, clave)
+        if pk is None:
+            pk = model._default_manager.get_by_natural_key(*clave).pk
+            self._pks[(model._meta.label_lower, tuple(clave))] = pk
+        return pk
+
+
+def _referencia(field, valor, claves):
+    if isinstance(valor, list):
+        return claves.pk(field.related_model, valor)
+    return field.target_field.to_python(valor)
+
+
+def construir(model, registro, claves):
+    """Retorna (instancia, {campo M2M: [pks]}) a partir de un registro del respaldo."""
+    datos, m2m = {}, {}
+    for nombre, valor in registro.get('fields', {}).items():
+        try:
+            field = model._meta.get_field(nombre)
+        except FieldDoesNotExist:
+            continue
+        if field.many_to_many:
+            m2m[field] = [_referencia(field, item, claves) for item in valor]
+        elif field.is_relation:
+            datos[field.attname] = None if valor is None else _referencia(field, valor, claves)
+        else:
+            datos[field.attname] = field.to_python(valor)
+    instancia = model(**datos)
+    if registro.get('pk') is not None:
+        instancia.pk = model._meta.pk.to_python(registro['pk'])
+    elif hasattr(model, 'natural_key'):
+        # Sin pk (clave natural primaria): se actualiza la fila existente, si la hay
+        instancia.pk = claves.existente(model, instancia.natural_key())
+    return instancia, m2m
+
+
+@contextmanager
+def _fechas_originales(model):
+    """Evita que `bulk_create` reemplace por la hora actual los campos auto_now del respaldo."""
+    campos = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    estados = [(field, field.auto_now, field.auto_now_add) for field in campos]
+    for field in campos:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in estados:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _insertar(model, instancias, m2m, claves):
+    """Inserta (o actualiza por pk) un lote de `model` y reemplaza sus filas M2M."""
+    con_pk = [obj for obj in instancias if obj.pk is not None]
+    sin_pk = [obj for obj in instancias if obj.pk is None]
+    campos = [field.name for field in model._meta.concrete_fields if not field.primary_key]
+    with _fechas_originales(model):
+        if con_pk:
+            model._default_manager.bulk_create(
+                con_pk, update_conflicts=bool(campos), ignore_conflicts=not campos,
+                unique_fields=[model._meta.pk.name] if campos else None, update_fields=campos or None,
+            )
+        if sin_pk:
+            model._default_manager.bulk_create(sin_pk)
+    if hasattr(model, 'natural_key'):
+        for obj in instancias:
+            if obj.pk is not None:
+                claves.registrar(obj)
+
+    for field, filas in m2m.items():
+        through = field.remote_field.through
+        origen, destino = field.m2m_field_name(), field.m2m_reverse_field_name()
+        through.objects.filter(**{f'{origen}__in': [obj.pk for obj, _ in filas]}).delete()
+        through.objects.bulk_create(
+            [through(**{f'{origen}_id': obj.pk, f'{destino}_id': pk}) for obj, pks in filas for pk in pks],
+            ignore_conflicts=True,
+        )
+
+
+def _borrar(model, borrados, lote, claves):
+    """
+    Borra las filas de `model` dadas de baja (pk o claves naturales), en
+    cascada como en el origen. Retorna la cantidad de filas de `model` borradas.
+    """
+    if hasattr(model, 'natural_key'):
+        pks = [claves.existente(model, clave) for clave in borrados]
+    else:
+        pks = [model._meta.pk.to_python(clave) for clave in borrados]
+    pks = [pk for pk in pks if pk is not None]
+    cantidad = 0
+    for inicio in range(0, len(pks), lote):
+        _, por_modelo = model._default_manager.filter(pk__in=pks[inicio:inicio + lote]).delete()
+        cantidad += por_modelo.get(model._meta.label, 0)
+    return cantidad
+
+
+def _cargar_modelo(model, ruta, lote, claves):
+    cantidad = 0
+    instancias, m2m = [], {}
+    for registro in leer_registros(ruta):
+        instancia, relaciones = construir(model, registro, claves)
+        instancias.append(instancia)
+        for field, pks in relaciones.items():
+            m2m.setdefault(field, []).append((instancia, pks))
+        if len(instancias) >= lote:
+            _insertar(model, instancias, m2m, claves)
+            cantidad += len(instancias)
+            instancias, m2m = [], {}
+    if instancias:
+        _insertar(model, instancias, m2m, claves)
+        cantidad += len(instancias)
+    return cantidad
+
+
+def restaurar(ruta, incluir=None, lote=1000, bajas=None):
+    """
+    Restaura el respaldo `ruta`. `incluir` limita la restauración a esas
+    etiquetas de app (por ejemplo ('catalog',)). Retorna una lista de
+    (etiqueta del modelo, cantidad) en el orden en que se insertaron. Las
+    bajas de un delta se aplican al final; con `bajas` (un dict) se acumula
+    ahí cuántas filas se borraron por modelo.
+    """
+    borrados = {}
+    with tempfile.TemporaryDirectory() as directorio:
+        rutas = {}
+        with ExitStack() as archivos:
+            salidas = {}
+            for registro in leer_registros(ruta):
+                etiqueta = registro.get('model', '')
+                if incluir is not None and etiqueta.split('.')[0] not in incluir:
+                    continue
+                if 'borrados' in registro:
+                    borrados.setdefault(etiqueta, []).extend(registro['borrados'])
+                    continue
+                if etiqueta not in salidas:
+                    rutas[etiqueta] = Path(directorio) / f'{etiqueta}.jsonl'
+                    salidas[etiqueta] = archivos.enter_context(rutas[etiqueta].open('w', encoding='utf-8'))
+                salidas[etiqueta].write(linea(registro) + '\n')
+
+        modelos = {apps.get_model(etiqueta): etiqueta for etiqueta in rutas}
+        claves = _Claves()
+        conteos = []
+        with transaction.atomic():
+            for model in orden_dependencias(modelos):
+                cantidad = _cargar_modelo(model, rutas[modelos[model]], lote, claves)
+                conteos.append((model._meta.label, cantidad))
+            # De los modelos que referencian a los referenciados
+            for model in reversed(orden_dependencias([apps.get_model(etiqueta) for etiqueta in borrados])):
+                cantidad = _borrar(model, borrados[model._meta.label_lower], lote, claves)
+                if bajas is not None:
+                    bajas[model._meta.label] = bajas.get(model._meta.label, 0) + cantidad
+        return conteos
+
+
+def ruta_manifiesto(ruta):
+    ruta = Path(ruta)
+    return ruta.with_name(f"{ruta.name.partition('.')[0]}.manifest.json")
+
+
+def ruta_claves(ruta):
+    ruta = Path(ruta)
+    return ruta.with_name(f"{ruta.name.partition('.')[0]}.claves.json")
+
+
+def _ruta_delta(ruta, numero):
+    nombre, _, extension = Path(ruta).name.partition('.')
+    return Path(ruta).with_name(f"{nombre}.delta-{numero:04d}" + (f".{extension}" if extension else ''))
+
+
+def leer_manifiesto(ruta):
+    """Manifiesto de la cadena cuya base es `ruta`, o None si no hay (o es de otra base)."""
+    manifiesto_path = ruta_manifiesto(ruta)
+    if not manifiesto_path.exists():
+        return None
+    with manifiesto_path.open('r', encoding='utf-8') as entrada:
+        manifiesto = json.load(entrada)
+    if manifiesto.get('base', {}).get('archivo') != Path(ruta).name:
+        return None
+    return manifiesto
+
+
+def _guardar_manifiesto(ruta, manifiesto):
+    manifiesto_path = ruta_manifiesto(ruta)
+    temporal = manifiesto_path.with_name(f".{manifiesto_path.name}")
+    with temporal.open('w', encoding='utf-8') as salida:
+        json.dump(manifiesto, salida, ensure_ascii=False, indent=2)
+    os.replace(temporal, manifiesto_path)
+
+
+def marcas_actuales(modelos):
+    """Marca de agua (máximo del campo de cambio, en ISO 8601) de cada modelo que lo tiene."""
+    marcas = {}
+    for model in modelos:
+        campo = campo_cambio(model)
+        if campo:
+            maximo = model._default_manager.aggregate(maximo=Max(campo))['maximo']
+            if maximo is not None:
+                marcas[model._meta.label_lower] = maximo.isoformat()
+    return marcas
+
+
+def claves_vigentes(model):
+    """
+    Claves de las filas de `model` como las identifica el respaldo: el pk o,
+    si el modelo tiene clave natural (se serializa sin pk), la clave natural.
+    Cada clave va como texto JSON para poder compararlas en conjuntos.
+    """
+    if hasattr(model, 'natural_key'):
+        return {linea(list(obj.natural_key())) for obj in model._default_manager.iterator()}
+    return {linea(pk) for pk in model._default_manager.values_list('pk', flat=True).iterator()}
+
+
+def leer_claves(ruta):
+    """Claves vigentes (etiqueta -> set) al último respaldo de la cadena de `ruta`; {} si no hay."""
+    claves_path = ruta_claves(ruta)
+    if not claves_path.exists():
+        return {}
+    with claves_path.open('r', encoding='utf-8') as entrada:
+        return {etiqueta: set(claves) for etiqueta, claves in json.load(entrada).items()}
+
+
+def _guardar_claves(ruta, modelos, antes):
+    """
+    Guarda las claves vigentes de `modelos` unidas a las tomadas `antes` de
+    exportar: lo borrado durante la exportación queda registrado y se da de
+    baja en el delta siguiente (un borrado de más no tiene efecto).
+    """
+    claves = {
+        model._meta.label_lower: sorted(antes.get(model._meta.label_lower, set()) | claves_vigentes(model))
+        for model in modelos
+    }
+    claves_path = ruta_claves(ruta)
+    temporal = claves_path.with_name(f".{claves_path.name}")
+    with temporal.open('w', encoding='utf-8') as salida:
+        json.dump(claves, salida, ensure_ascii=False, separators=(',', ':'))
+    os.replace(temporal, claves_path)
+
+
+def cadena(ruta):
+    """Archivos a restaurar en orden: la base `ruta` y, si hay manifiesto, sus deltas."""
+    ruta = Path(ruta)
+    manifiesto = leer_manifiesto(ruta)
+    deltas = manifiesto['deltas'] if manifiesto else []
+    return [ruta] + [ruta.with_name(delta['archivo']) for delta in deltas]
+
+
+def exportar_incremental(ruta, formato='json', lote=LOTE, hilos=1, modelos=None,
+                         max_deltas=MAX_DELTAS, completo=False):
+    """
+    Agrega un delta a la cadena de `ruta` o, si no hay base válida, la cadena
+    llegó a `max_deltas` o se pide `completo`, genera una base nueva (y borra
+    los deltas anteriores). Retorna (archivo escrito, conteos, es_base); en
+    un delta, los conteos incluyen las bajas de cada modelo como "<etiqueta> (bajas)".
+    """
+    ruta = Path(ruta)
+    if modelos is None:
+        modelos, _ = modelos_exportables()
+    manifiesto = leer_manifiesto(ruta)
+    # Las marcas se toman antes de exportar: lo que cambie durante la
+    # exportación queda por encima de la marca y entra en el delta siguiente
+    marcas = marcas_actuales(modelos)
+    vigentes = {model._meta.label_lower: claves_vigentes(model) for model in modelos}
+    ahora = timezone.now().isoformat()
+
+    if (completo or manifiesto is None or not ruta.exists()
+            or manifiesto.get('formato') != formato or len(manifiesto['deltas']) >= max_deltas):
+        conteos = exportar(ruta, formato, lote, hilos, modelos)
+        if conteos:
+            anteriores = cadena(ruta)[1:]
+            _guardar_manifiesto(ruta, {
+                'formato': formato,
+                'base': {'archivo': ruta.name, 'creado_en': ahora},
+                'deltas': [],
+                'marcas': marcas,
+            })
+            _guardar_claves(ruta, modelos, vigentes)
+            for delta in anteriores:
+                delta.unlink(missing_ok=True)
+        return ruta, conteos, True
+
+    desde = {
+        etiqueta: parse_datetime(marca) - MARGEN_DELTA
+        for etiqueta, marca in manifiesto['marcas'].items()
+    }
+    # Sin claves del respaldo anterior (cadenas de versiones previas) no se
+    # pueden detectar bajas todavía: este delta solo deja registradas las actuales
+    anteriores = leer_claves(ruta)
+    borrados = {}
+    for etiqueta, claves in vigentes.items():
+        faltan = anteriores.get(etiqueta, set()) - claves
+        if faltan:
+            borrados[etiqueta] = [json.loads(clave) for clave in sorted(faltan)]
+
+    archivo = _ruta_delta(ruta, len(manifiesto['deltas']) + 1)
+    conteos = exportar(archivo, formato, lote, hilos, modelos, desde=desde, borrados=borrados)
+    if conteos or borrados:
+        manifiesto['deltas'].append({
+            'archivo': archivo.name,
+            'creado_en': ahora,
+            'registros': sum(cantidad for _, cantidad in conteos),
+            'bajas': sum(len(claves) for claves in borrados.values()),
+        })
+        manifiesto['marcas'].update(marcas)
+        _guardar_manifiesto(ruta, manifiesto)
+    if conteos or borrados or not ruta_claves(ruta).exists():
+        _guardar_claves(ruta, modelos, vigentes)
+    etiquetas = {model._meta.label_lower: model._meta.label for model in modelos}
+    conteos += [(f"{etiquetas[etiqueta]} (bajas)", len(claves)) for etiqueta, claves in borrados.items()]
+    return archivo, conteos, False
@@ -0,0 +1,45 @@
+"""
+Sesiones HTTP compartidas para los clientes de servicios externos.
+
+Cada servicio (reCAPTCHA, Hunter.io, ...) usa una `requests.Session` por
+proceso con un pool de conexiones keep-alive acotado: las llamadas
+consecutivas reutilizan la conexión TCP/TLS en lugar de abrir una nueva.
+`requests.Session` es segura para usar desde varios hilos mientras no se
+modifique su configuración después de creada.
+"""
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+_sesiones = {}
+_lock = threading.Lock()
+
+
+def sesion(nombre, tamano_pool=10, reintentos=0):
+    """
+    Sesión compartida `nombre` (se crea en el primer uso con `tamano_pool`
+    conexiones por host). `reintentos` reintenta con backoff los métodos
+    idempotentes ante 429/5xx.
+    """
+    actual = _sesiones.get(nombre)
+    if actual is None:
+        with _lock:
+            actual = _sesiones.get(nombre)
+            if actual is None:
+                actual = requests.Session()
+                adaptador = HTTPAdapter(
+                    pool_connections=4,
+                    pool_maxsize=tamano_pool,
+                    max_retries=Retry(
+                        total=reintentos,
+                        backoff_factor=0.3,
+                        status_forcelist=(429, 500, 502, 503, 504),
+                        raise_on_status=False,
+                    ) if reintentos else 0,
+                )
+                actual.mount('https://', adaptador)
+                actual.mount('http://', adaptador)
+                _sesiones[nombre] = actual
+    return actual
@@ -0,0 +1,170 @@
+"""
+Cliente de verificación de correos de Hunter.io.
+
+- Sesión HTTP compartida con pool keep-alive (`apps.core.http`) y timeouts
+  (conexión, lectura) de `HUNTER_TIMEOUT`.
+- Caché persistente en `ValidacionEmail`, por correo normalizado, con TTL de
+  `HUNTER_CACHE_DIAS`: sobrevive reinicios y la comparten todos los workers.
+  Solo se guardan respuestas válidas del proveedor, nunca los errores.
+- `validar_lote` valida una lista de correos: lee la caché en una consulta y
+  consulta el resto en paralelo con un pool de hilos acotado.
+- Circuit breaker: tras `HUNTER_CIRCUITO_FALLOS` fallos seguidos (error,
+  timeout o respuesta más lenta que `HUNTER_UMBRAL_LENTO`) deja de llamar al
+  proveedor durante `HUNTER_CIRCUITO_ENFRIAMIENTO` segundos y responde
+  'error' al instante; el formulario de registro ya trata 'error' como "dejar
+  pasar y registrar en el log".
+
+Para pruebas sin red: `python manage.py fake_hunter` y `HUNTER_API_URL`
+apuntando a ese servidor.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+
+from .http import sesion
+from .models import ValidacionEmail
+
+logger = logging.getLogger(__name__)
+
+
+def _config(nombre, defecto):
+    return getattr(settings, nombre, defecto)
+
+
+def normalizar(email):
+    return (email or '').strip().lower()
+
+
+def _error(mensaje):
+    return {'status': 'error', 'score': 0.0, 'message': mensaje}
+
+
+class Circuito:
+    """Circuit breaker por proceso, seguro entre hilos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.fallos = 0
+        self.abierto_hasta = 0.0
+
+    def permitir(self):
+        with self._lock:
+            ahora = time.monotonic()
+            if ahora < self.abierto_hasta:
+                return False
+            if self.fallos >= _config('HUNTER_CIRCUITO_FALLOS', 5):
+                # Semiabierto: vencido el enfriamiento pasa una sola llamada de prueba y
+                # el resto sigue rechazado hasta que termine (`exito` cierra el circuito;
+                # con `fallo` el contador sigue por encima del límite y vuelve a abrirse)
+                self.abierto_hasta = ahora + _config('HUNTER_CIRCUITO_ENFRIAMIENTO', 60)
+            return True
+
+    def exito(self):
+        with self._lock:
+            self.fallos = 0
+            self.abierto_hasta = 0.0
+
+    def fallo(self):
+        with self._lock:
+            self.fallos += 1
+            if self.fallos >= _config('HUNTER_CIRCUITO_FALLOS', 5):
+                enfriamiento = _config('HUNTER_CIRCUITO_ENFRIAMIENTO', 60)
+                self.abierto_hasta = time.monotonic() + enfriamiento
+                logger.warning("Hunter.io: circuito abierto %s s tras %s fallos seguidos", enfriamiento, self.fallos)
+
+
+circuito = Circuito()
+
+
+def _consultar(email):
+    """Consulta al proveedor (sin caché). Retorna el dict de resultado."""
+    api_key = settings.HUNTER_API_KEY
+    if not api_key:
+        return _error('API key no configurada')
+    if not circuito.permitir():
+        return _error('Servicio de validación no disponible (circuito abierto)')
+
+    inicio = time.monotonic()
+    try:
+        response = sesion('hunter', _config('HUNTER_POOL_SIZE', 10)).get(
+            _config('HUNTER_API_URL', 'https://api.hunter.io/v2/email-verifier'),
+            params={'email': email, 'api_key': api_key},
+            timeout=_config('HUNTER_TIMEOUT', (3, 5)),
+        )
+        response.raise_for_status()
+        data = response.json().get('data') or {}
+    except requests.exceptions.Timeout:
+        circuito.fallo()
+        return _error('Timeout en la solicitud')
+    except requests.exceptions.RequestException as e:
+        circuito.fallo()
+        return _error(f'Error de conexión: {str(e)}')
+    except ValueError:
+        circuito.fallo()
+        return _error('Respuesta JSON inválida')
+
+    # Una respuesta correcta pero lenta también cuenta como fallo del proveedor
+    if time.monotonic() - inicio > _config('HUNTER_UMBRAL_LENTO', 3.0):
+        circuito.fallo()
+    else:
+        circuito.exito()
+    return {'status': data.get('status', 'invalid'), 'score': float(data.get('score') or 0.0)}
+
+
+def _leer_cache(emails):
+    limite = timezone.now() - timedelta(days=_config('HUNTER_CACHE_DIAS', 30))
+    return {
+        v.email: {'status': v.status, 'score': v.score}
+        for v in ValidacionEmail.objects.filter(email__in=emails, verificado_en__gte=limite)
+    }
+
+
+def _guardar(resultados):
+    ahora = timezone.now()
+    ValidacionEmail.objects.bulk_create(
+        [
+            ValidacionEmail(email=email, status=r['status'], score=r['score'], verificado_en=ahora)
+            for email, r in resultados.items() if r['status'] != 'error'
+        ],
+        update_conflicts=True,
+        unique_fields=['email'],
+        update_fields=['status', 'score', 'verificado_en'],
+    )
+
+
+def validar(email):
+    """Valida un correo: {'status': valid|risky|invalid|error, 'score': float[, 'message']}."""
+    if not normalizar(email):
+        # Los formularios pueden enviar el campo vacío; `validar_lote` lo descarta
+        return _error('Email vacío')
+    return validar_lote([email])[normalizar(email)]
+
+
+def validar_lote(emails, max_hilos=None):
+    """
+    Valida varios correos. Retorna un dict correo normalizado -> resultado.
+    Las consultas al proveedor corren en hasta `max_hilos` hilos
+    (`HUNTER_MAX_HILOS` por defecto); la base de datos solo se toca desde el
+    hilo que llama.
+    """
+    normalizados = list(dict.fromkeys(normalizar(e) for e in emails if normalizar(e)))
+    resultados = _leer_cache(normalizados)
+    faltan = [email for email in normalizados if email not in resultados]
+    if not faltan:
+        return resultados
+
+    hilos = min(max_hilos or _config('HUNTER_MAX_HILOS', 4), len(faltan))
+    if hilos <= 1:
+        nuevos = {email: _consultar(email) for email in faltan}
+    else:
+        with ThreadPoolExecutor(max_workers=hilos) as pool:
+            nuevos = dict(zip(faltan, pool.map(_consultar, faltan)))
+    _guardar(nuevos)
+    resultados.update(nuevos)
+    return resultados
@@ -0,0 +1,174 @@
+"""
+Cola de tareas diferidas respaldada por la base de datos.
+
+`encolar` inserta un `Job` en la transacción en curso: si la transacción se
+revierte la tarea desaparece con ella, y el worker solo la ve después del
+commit. `python manage.py run_worker` reclama tareas listas, las ejecuta y,
+si fallan, las reprograma con backoff exponencial (más un poco de azar) hasta
+agotar `max_intentos`; entonces quedan en 'fallido' con el último error.
+
+Las tareas se registran con el decorador `tarea` en el módulo `tasks.py` de
+cada app (se descubren al iniciar, ver `CoreConfig.ready`) y reciben el
+payload como argumentos con nombre, así que este debe ser serializable a JSON.
+
+Con `JOBS_SINCRONICO` (por defecto igual a DEBUG) la tarea se ejecuta en el
+mismo proceso al confirmar la transacción, sin necesidad de un worker.
+"""
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Backoff: 30 s, 1 min, 2 min, ... hasta 1 h entre intentos
+BACKOFF_BASE = 30
+BACKOFF_MAX = 3600
+# Tiempo que un worker retiene una tarea antes de que otro pueda retomarla
+BLOQUEO = timedelta(minutes=5)
+
+_TAREAS = {}
+
+
+def tarea(nombre):
+    """Registra la función decorada como tarea `nombre`."""
+    def decorador(funcion):
+        _TAREAS[nombre] = funcion
+        return funcion
+    return decorador
+
+
+def tareas_registradas():
+    return sorted(_TAREAS)
+
+
+def encolar(nombre, payload=None, demora=0, max_intentos=5, unico=False):
+    """
+    Encola la tarea `nombre` con `payload` (dict serializable a JSON). `demora`
+    son los segundos mínimos antes de ejecutarla. Con `unico` no se encola si
+    ya hay una tarea `nombre` pendiente o en proceso (se retorna esa).
+    """
+    if unico:
+        existente = Job.objects.filter(tarea=nombre, estado__in=('pendiente', 'en_proceso')).first()
+        if existente is not None:
+            return existente
+    job = Job.objects.create(
+        tarea=nombre,
+        payload=payload or {},
+        max_intentos=max_intentos,
+        ejecutar_desde=timezone.now() + timedelta(seconds=demora),
+    )
+    if getattr(settings, 'JOBS_SINCRONICO', False) and not demora:
+        transaction.on_commit(lambda: ejecutar_ahora(job.pk))
+    return job
+
+
+def reclamar(worker, limite=1):
+    """
+    Marca como 'en_proceso' hasta `limite` tareas listas (o retenidas por un
+    worker caído) y las retorna. Dos workers nunca reclaman la misma tarea:
+    PostgreSQL salta las filas bloqueadas (SKIP LOCKED) y SQLite serializa las
+    escrituras con transacciones IMMEDIATE.
+    """
+    ahora = timezone.now()
+    with transaction.atomic():
+        listas = Job.objects.filter(
+            Q(estado='pendiente', ejecutar_desde__lte=ahora)
+            | Q(estado='en_proceso', bloqueado_hasta__lt=ahora)
+        ).order_by('ejecutar_desde', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            listas = listas.select_for_update(skip_locked=True)
+        ids = list(listas.values_list('id', flat=True)[:limite])
+        if not ids:
+            return []
+        Job.objects.filter(id__in=ids).update(
+            estado='en_proceso',
+            intentos=F('intentos') + 1,
+            bloqueado_hasta=ahora + BLOQUEO,
+            worker=worker,
+            actualizado_en=ahora,
+        )
+    return list(Job.objects.filter(id__in=ids).order_by('ejecutar_desde', 'id'))
+
+
+def backoff(intentos):
+    """Segundos de espera antes del intento siguiente a `intentos`."""
+    espera = min(BACKOFF_BASE * 2 ** max(intentos - 1, 0), BACKOFF_MAX)
+    return espera + random.uniform(0, espera / 10)
+
+
+def ejecutar(job):
+    """Ejecuta una tarea ya reclamada y registra el resultado. Retorna True si terminó bien."""
+    # Solo actualiza si la tarea sigue siendo de este worker (el bloqueo pudo vencer)
+    propia = Job.objects.filter(pk=job.pk, worker=job.worker, estado='en_proceso')
+    if job.intentos > job.max_intentos:
+        # Retomada tras vencer el bloqueo más veces de las permitidas (el worker cae con ella)
+        propia.update(estado='fallido', bloqueado_hasta=None, actualizado_en=timezone.now(),
+                      ultimo_error=job.ultimo_error or 'Intentos agotados sin finalizar')
+        return False
+    funcion = _TAREAS.get(job.tarea)
+    try:
+        if funcion is None:
+            raise LookupError(f"Tarea no registrada: {job.tarea}")
+        funcion(**job.payload)
+    except Exception as exc:
+        ahora = timezone.now()
+        error = ''.join(traceback.format_exception_only(type(exc), exc)).strip()
+        if job.intentos >= job.max_intentos or funcion is None:
+            logger.error("Tarea %s #%s fallida tras %s intentos: %s", job.tarea, job.pk, job.intentos, error)
+            propia.update(estado='fallido', bloqueado_hasta=None, ultimo_error=error, actualizado_en=ahora)
+        else:
+            espera = backoff(job.intentos)
+            logger.warning("Tarea %s #%s falló (intento %s), reintento en %.0f s: %s",
+                           job.tarea, job.pk, job.intentos, espera, error)
+            propia.update(
+                estado='pendiente',
+                ejecutar_desde=ahora + timedelta(seconds=espera),
+                bloqueado_hasta=None,
+                ultimo_error=error,
+                actualizado_en=ahora,
+            )
+        return False
+
+    ahora = timezone.now()
+    propia.update(estado='completado', completado_en=ahora, bloqueado_hasta=None, actualizado_en=ahora)
+    return True
+
+
+def ejecutar_ahora(job_id, worker='sincronico'):
+    """Reclama y ejecuta una tarea concreta en este proceso (modo `JOBS_SINCRONICO`)."""
+    ahora = timezone.now()
+    tomada = Job.objects.filter(pk=job_id, estado='pendiente').update(
+        estado='en_proceso',
+        intentos=F('intentos') + 1,
+        bloqueado_hasta=ahora + BLOQUEO,
+        worker=worker,
+        actualizado_en=ahora,
+    )
+    if tomada:
+        ejecutar(Job.objects.get(pk=job_id))
+
+
+def liberar(reclamadas):
+    """Devuelve a la cola tareas reclamadas que no llegaron a ejecutarse."""
+    for job in reclamadas:
+        Job.objects.filter(pk=job.pk, worker=job.worker, estado='en_proceso').update(
+            estado='pendiente',
+            intentos=F('intentos') - 1,
+            bloqueado_hasta=None,
+            actualizado_en=timezone.now(),
+        )
+
+
+def purgar(dias=7):
+    """Elimina las tareas completadas hace más de `dias` días. Retorna la cantidad."""
+    limite = timezone.now() - timedelta(days=dias)
+    eliminadas, _ = Job.objects.filter(estado='completado', completado_en__lt=limite).delete()
+    return eliminadas
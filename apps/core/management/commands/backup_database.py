@@ -1,79 +1,88 @@
 from pathlib import Path
-import json
 import os
 
-from django.apps import apps
 from django.conf import settings
-from django.core import serializers
 from django.core.management.base import BaseCommand, CommandError
-from django.db import connection
 
+from apps.core import backup
 
-class Command(BaseCommand):
-    help = "Exporta los registros existentes de la base de datos a un fixture JSON."
 
-    excluded_models = {
-        "admin.logentry",
-        "auth.permission",
-        "contenttypes.contenttype",
-        "sessions.session",
-    }
+class Command(BaseCommand):
+    help = (
+        "Exporta los registros existentes de la base de datos a un fixture JSON, "
+        "en streaming (ver apps.core.backup)."
+    )
 
     def add_arguments(self, parser):
         parser.add_argument(
             "--output",
             default=os.getenv("BACKUP_FILE_PATH", str(Path("backups") / "db_backup.json")),
-            help="Ruta del archivo JSON de salida.",
+            help="Ruta del archivo de salida (con extensión .gz se comprime con gzip).",
         )
         parser.add_argument(
             "--fail-on-empty",
             action="store_true",
             help="Falla si no se encontraron registros exportables.",
         )
+        parser.add_argument(
+            "--formato",
+            choices=backup.FORMATOS,
+            default="json",
+            help="'json' (arreglo compatible con loaddata) o 'jsonl' (un registro por línea).",
+        )
+        parser.add_argument("--gzip", action="store_true", help="Comprime la salida (agrega .gz a la ruta).")
+        parser.add_argument("--lote", type=int, default=backup.LOTE, help="Registros leídos por consulta.")
+        parser.add_argument("--hilos", type=int, default=1, help="Modelos exportados en paralelo.")
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Agrega un delta con las filas modificadas desde el último respaldo (la primera vez genera la base).",
+        )
+        parser.add_argument(
+            "--completo",
+            action="store_true",
+            help="Con --incremental, genera una base nueva y descarta los deltas anteriores.",
+        )
+        parser.add_argument(
+            "--max-deltas",
+            type=int,
+            default=backup.MAX_DELTAS,
+            help="Con --incremental, deltas acumulados antes de generar una base nueva.",
+        )
 
     def handle(self, *args, **options):
         output_path = Path(options["output"])
+        if options["gzip"] and output_path.suffix != ".gz":
+            output_path = output_path.with_name(f"{output_path.name}.gz")
         fallback_path = settings.BASE_DIR / "backups" / output_path.name
         fail_on_empty = options["fail_on_empty"]
 
+        modelos, skipped_models = backup.modelos_exportables()
+        opciones = {
+            "formato": options["formato"],
+            "lote": options["lote"],
+            "hilos": options["hilos"],
+            "modelos": modelos,
+        }
+        if options["incremental"]:
+            exportar = lambda ruta: backup.exportar_incremental(
+                ruta, max_deltas=options["max_deltas"], completo=options["completo"], **opciones,
+            )
+        else:
+            exportar = lambda ruta: (ruta, backup.exportar(ruta, **opciones), True)
         try:
             output_path.parent.mkdir(parents=True, exist_ok=True)
+            written_path, exported_models, is_base = exportar(output_path)
         except (PermissionError, FileNotFoundError):
             output_path = fallback_path
             output_path.parent.mkdir(parents=True, exist_ok=True)
+            written_path, exported_models, is_base = exportar(output_path)
 
-        existing_tables = set(connection.introspection.table_names())
-        objects = []
-        exported_models = []
-        skipped_models = []
-
-        for model in sorted(apps.get_models(include_auto_created=False), key=lambda item: item._meta.label_lower):
-            if not model._meta.managed or model._meta.proxy:
-                continue
-
-            model_label = model._meta.label_lower
-            if model_label in self.excluded_models:
-                skipped_models.append(model._meta.label)
-                continue
-
-            if model._meta.db_table not in existing_tables:
-                skipped_models.append(model._meta.label)
-                continue
-
-            queryset = model.objects.all().order_by("pk")
-            if not queryset.exists():
-                continue
-
-            serialized = serializers.serialize(
-                "json",
-                queryset,
-                use_natural_foreign_keys=True,
-                use_natural_primary_keys=True,
-            )
-            objects.extend(json.loads(serialized))
-            exported_models.append(f"{model._meta.label} ({queryset.count()} registros)")
+        if not is_base and not exported_models:
+            self.stdout.write(self.style.SUCCESS(f"Sin cambios desde el último respaldo de {output_path}"))
+            return
 
-        if not objects:
+        if not exported_models:
             message = "No se encontraron registros exportables en la base de datos."
             if fail_on_empty:
                 raise CommandError(message)
@@ -81,21 +90,13 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING(message))
             return
 
-        try:
-            with output_path.open("w", encoding="utf-8") as file_handle:
-                json.dump(objects, file_handle, ensure_ascii=False, indent=2)
-        except (PermissionError, FileNotFoundError):
-            output_path = fallback_path
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            with output_path.open("w", encoding="utf-8") as file_handle:
-                json.dump(objects, file_handle, ensure_ascii=False, indent=2)
-
-        self.stdout.write(self.style.SUCCESS(f"Respaldo generado en {output_path}"))
+        tipo = "Respaldo" if is_base else "Respaldo incremental"
+        self.stdout.write(self.style.SUCCESS(f"{tipo} generado en {written_path}"))
         self.stdout.write(self.style.SUCCESS("Modelos exportados:"))
-        for item in exported_models:
-            self.stdout.write(f"- {item}")
+        for label, cantidad in exported_models:
+            self.stdout.write(f"- {label} ({cantidad} registros)")
 
         if skipped_models:
             self.stdout.write(self.style.WARNING("Modelos omitidos por no existir o por exclusión:"))
             for item in sorted(set(skipped_models)):
-                self.stdout.write(f"- {item}")
\ No newline at end of file
+                self.stdout.write(f"- {item}")
@@ -0,0 +1,163 @@
+import json
+import math
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+
+from apps.catalog import caching
+from apps.catalog.models import Producto
+from apps.core import seeding
+
+
+# Máximo de consultas SQL por request. Si un cambio las aumenta el benchmark
+# falla: subir un presupuesto debe ser una decisión explícita.
+PRESUPUESTOS = {
+    'catalogo': 2,
+    'catalogo_busqueda': 2,
+    'catalogo_categoria': 2,
+    'detalle_producto': 3,
+    'carrito_api': 4,
+    # Historial: constante sin importar cuántos pedidos o líneas tenga el usuario
+    # (las vistas autenticadas suman sesión, usuario y perfil)
+    'pedidos_core': 4,
+    'pedidos_api': 4,
+    'pedido_detalle_core': 6,
+    'pedido_detalle_api': 6,
+    'chatbot_genero': 0,
+    'chatbot_genero_sin_cache': 2,
+    'chatbot_categoria': 0,
+    'chatbot_best_sellers': 0,
+    'chatbot_best_sellers_sin_cache': 3,
+    'chat_api': 0,
+}
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[max(math.ceil(p / 100 * len(ordenados)) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide latencia (p50/p95) y consultas SQL por request de los endpoints principales "
+        "(catálogo, detalle, carrito, pedidos y chatbot) con el cliente de pruebas de Django. "
+        "Falla si algún endpoint supera su presupuesto de consultas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iteraciones", type=int, default=30, help="Requests medidos por endpoint.")
+        parser.add_argument("--sembrar", action="store_true", help="Siembra datos sintéticos antes de medir (ver seed_catalog).")
+        parser.add_argument("--productos", type=int, default=1000, help="Productos a sembrar con --sembrar.")
+        parser.add_argument("--solo", nargs="*", default=None, help="Mide solo los endpoints indicados.")
+        parser.add_argument("--json", dest="salida_json", default=None, help="Escribe los resultados en este archivo JSON.")
+        parser.add_argument("--no-fallar", action="store_true", help="Informa los excesos de consultas sin fallar.")
+
+    def handle(self, *args, **options):
+        if options["sembrar"]:
+            seeding.sembrar(productos=options["productos"], log=self.stdout.write)
+
+        usuario = (
+            User.objects.filter(username__startswith=seeding.PREFIJO_USUARIO)
+            .annotate(total_pedidos=Count('pedidos'))
+            .order_by('-total_pedidos', 'id')
+            .first()
+        )
+        producto = Producto.objects.filter(sku__startswith=seeding.PREFIJO, activo=True).order_by('id').first()
+        if usuario is None or producto is None:
+            raise CommandError("No hay datos sintéticos: ejecute 'manage.py seed_catalog' o use --sembrar.")
+
+        setup_test_environment()
+        try:
+            resultados = self._medir_todos(usuario, producto, options["iteraciones"], options["solo"])
+        finally:
+            teardown_test_environment()
+
+        self._reportar(resultados)
+        if options["salida_json"]:
+            with open(options["salida_json"], "w", encoding="utf-8") as archivo:
+                json.dump(resultados, archivo, indent=2, ensure_ascii=False)
+
+        excedidos = [r for r in resultados if r['consultas'] > r['presupuesto'] or r['errores']]
+        if excedidos and not options["no_fallar"]:
+            detalle = ', '.join(
+                f"{r['nombre']} ({r['consultas']}/{r['presupuesto']} consultas, {r['errores']} errores)"
+                for r in excedidos
+            )
+            raise CommandError(f"Regresión de rendimiento: {detalle}")
+
+    def escenarios(self, usuario, producto):
+        """(nombre, autenticado, método, url, cuerpo JSON, invalidar caché antes de cada request)."""
+        pedido_id = usuario.pedidos.order_by('id').values_list('id', flat=True).first()
+        return [
+            ('catalogo', False, 'get', '/catalogo/', None, False),
+            ('catalogo_busqueda', False, 'get', '/catalogo/?q=perfume+floral', None, False),
+            ('catalogo_categoria', False, 'get', '/catalogo/?categoria=bench-cat-1', None, False),
+            ('detalle_producto', False, 'get', f'/catalogo/producto/{producto.id}/', None, False),
+            ('carrito_api', True, 'get', '/api/carrito/', None, False),
+            ('pedidos_core', True, 'get', '/api/core/pedidos/', None, False),
+            ('pedidos_api', True, 'get', '/api/pedidos/', None, False),
+            ('pedido_detalle_core', True, 'get', f'/api/core/pedidos/{pedido_id}/', None, False),
+            ('pedido_detalle_api', True, 'get', f'/api/pedidos/{pedido_id}/', None, False),
+            ('chatbot_genero', False, 'get', '/catalogo/api/genero/mujer/', None, False),
+            ('chatbot_genero_sin_cache', False, 'get', '/catalogo/api/genero/mujer/', None, True),
+            ('chatbot_categoria', False, 'get', '/catalogo/api/categoria/bench-cat-1/', None, False),
+            ('chatbot_best_sellers', False, 'get', '/catalogo/api/best-sellers/', None, False),
+            ('chatbot_best_sellers_sin_cache', False, 'get', '/catalogo/api/best-sellers/', None, True),
+            ('chat_api', False, 'post', '/api/core/chat/', {'message': 'hola'}, False),
+        ]
+
+    def _medir_todos(self, usuario, producto, iteraciones, solo):
+        anonimo = Client(secure=True)
+        autenticado = Client(secure=True)
+        autenticado.force_login(usuario)
+
+        resultados = []
+        for nombre, con_usuario, metodo, url, cuerpo, sin_cache in self.escenarios(usuario, producto):
+            if solo and nombre not in solo:
+                continue
+            cliente = autenticado if con_usuario else anonimo
+            kwargs = {'data': json.dumps(cuerpo), 'content_type': 'application/json'} if cuerpo is not None else {}
+
+            def request():
+                if sin_cache:
+                    caching.invalidar(caching.GRUPO_CATALOGO, caching.GRUPO_VENTAS)
+                with CaptureQueriesContext(connection) as consultas:
+                    inicio = time.perf_counter()
+                    respuesta = getattr(cliente, metodo)(url, **kwargs)
+                    duracion = (time.perf_counter() - inicio) * 1000
+                return respuesta.status_code, duracion, len(consultas)
+
+            request()  # calentamiento: sesión, cachés y plan de consultas
+            tiempos, conteos, errores = [], [], 0
+            for _ in range(iteraciones):
+                status, duracion, total = request()
+                tiempos.append(duracion)
+                conteos.append(total)
+                if status >= 400:
+                    errores += 1
+
+            resultados.append({
+                'nombre': nombre,
+                'url': url,
+                'p50_ms': round(statistics.median(tiempos), 2),
+                'p95_ms': round(percentil(tiempos, 95), 2),
+                'consultas': max(conteos),
+                'presupuesto': PRESUPUESTOS.get(nombre, 0),
+                'errores': errores,
+            })
+        return resultados
+
+    def _reportar(self, resultados):
+        self.stdout.write(f"{'endpoint':32} {'p50 ms':>9} {'p95 ms':>9} {'consultas':>10} {'presupuesto':>12}")
+        for r in resultados:
+            linea = f"{r['nombre']:32} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['consultas']:>10} {r['presupuesto']:>12}"
+            if r['consultas'] > r['presupuesto'] or r['errores']:
+                self.stdout.write(self.style.ERROR(f"{linea}  <- {r['errores']} errores" if r['errores'] else f"{linea}  <- excede"))
+            else:
+                self.stdout.write(linea)
@@ -0,0 +1,118 @@
+import math
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from apps.catalog.models import Categoria, Producto
+from apps.core import seeding
+from apps.orders.models import Pago, Pedido
+
+
+# Índices trigram creados a mano en PostgreSQL (migración catalog 0003)
+INDICES_SQL = ['categorias_nombre_trgm_idx', 'categorias_slug_trgm_idx']
+
+
+def nombres_indices():
+    """Índices declarados en los modelos del catálogo y de pedidos."""
+    nombres = []
+    for modelo in (Categoria, Producto, Pedido, Pago):
+        nombres.extend(indice.name for indice in modelo._meta.indexes)
+    return nombres + INDICES_SQL
+
+
+def consultas(usuario_id):
+    """Consultas calientes del catálogo, el historial de pedidos y el admin."""
+    return [
+        ('catalogo_activos', Producto.objects.filter(activo=True).order_by('-id')[:24]),
+        ('catalogo_genero', Producto.objects.filter(activo=True, genero='mujer').order_by('-id')[:24]),
+        ('productos_recientes', Producto.objects.filter(activo=True).order_by('-creado_en')[:8]),
+        ('categoria_slug_iexact', Categoria.objects.filter(slug__iexact='BENCH-CAT-3')),
+        ('historial_pedidos', Pedido.objects.filter(usuario_id=usuario_id).order_by('-creado_en')[:20]),
+        ('admin_pedidos_estado', Pedido.objects.filter(estado='pendiente').order_by('-creado_en')[:100]),
+        ('admin_pagos_estado', Pago.objects.filter(estado='fallido').order_by('-creado_en')[:100]),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara planes de ejecución y tiempos de las consultas calientes con y sin "
+        "los índices del catálogo y de pedidos, sobre un conjunto de datos sintético."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--productos", type=int, default=100000, help="Productos sintéticos a sembrar.")
+        parser.add_argument("--usuarios", type=int, default=200, help="Usuarios sintéticos a sembrar.")
+        parser.add_argument("--pedidos", type=int, default=20000, help="Pedidos sintéticos a sembrar.")
+        parser.add_argument("--repeticiones", type=int, default=20, help="Ejecuciones por consulta para medir tiempos.")
+        parser.add_argument("--analyze", action="store_true", help="Usa EXPLAIN ANALYZE (solo PostgreSQL).")
+        parser.add_argument("--limpiar", action="store_true", help="Elimina los datos sintéticos y termina.")
+
+    def handle(self, *args, **options):
+        if options["limpiar"]:
+            self._limpiar()
+            return
+
+        self._sembrar(options["productos"], options["usuarios"], options["pedidos"])
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        usuario = User.objects.filter(username__startswith=seeding.PREFIJO_USUARIO).order_by('id').first()
+        usuario_id = usuario.id if usuario else 0
+        explain_opciones = {'analyze': True} if options["analyze"] and connection.vendor == 'postgresql' else {}
+
+        con_indices = self._medir(usuario_id, options["repeticiones"], explain_opciones, 'con_indices')
+        # Sin índices: se eliminan dentro de una transacción que se revierte
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                for nombre in nombres_indices():
+                    cursor.execute(f"DROP INDEX IF EXISTS {connection.ops.quote_name(nombre)}")
+            sin_indices = self._medir(usuario_id, options["repeticiones"], explain_opciones, 'sin_indices')
+            transaction.set_rollback(True)
+
+        for nombre, (plan_con, ms_con) in con_indices.items():
+            plan_sin, ms_sin = sin_indices[nombre]
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{nombre}: {ms_sin:.2f} ms -> {ms_con:.2f} ms (mediana)"))
+            self.stdout.write("  sin índices:")
+            self.stdout.write(self._indentar(plan_sin))
+            self.stdout.write("  con índices:")
+            self.stdout.write(self._indentar(plan_con))
+
+    def _explain(self, queryset, opciones, etiqueta):
+        # La etiqueta hace única la sentencia: SQLite reutiliza el plan de un
+        # EXPLAIN ya preparado aunque se hayan eliminado índices
+        sql, params = queryset.query.get_compiler(using=queryset.db).as_sql()
+        prefijo = connection.ops.explain_query_prefix(**opciones)
+        with connection.cursor() as cursor:
+            cursor.execute(f"{prefijo} /* {etiqueta} */ {sql}", params)
+            return '\n'.join(' '.join(str(valor) for valor in fila) for fila in cursor.fetchall())
+
+    def _medir(self, usuario_id, repeticiones, explain_opciones, etiqueta):
+        resultados = {}
+        for nombre, queryset in consultas(usuario_id):
+            plan = self._explain(queryset, explain_opciones, etiqueta)
+            tiempos = []
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                list(queryset.all())
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            resultados[nombre] = (plan, statistics.median(tiempos))
+        return resultados
+
+    def _indentar(self, texto):
+        return '\n'.join(f'    {linea}' for linea in texto.splitlines())
+
+    def _sembrar(self, total_productos, total_usuarios, total_pedidos):
+        seeding.sembrar(
+            productos=total_productos,
+            usuarios=total_usuarios,
+            pedidos_por_usuario=math.ceil(total_pedidos / max(total_usuarios, 1)),
+            items_por_carrito=0,
+            log=self.stdout.write,
+        )
+
+    def _limpiar(self):
+        seeding.limpiar()
+        self.stdout.write(self.style.SUCCESS("Datos sintéticos eliminados."))
@@ -0,0 +1,45 @@
+import time
+from urllib.parse import parse_qs, urlparse
+
+from apps.core.servidor_falso import ComandoServidorFalso, ManejadorFalso
+
+
+class HunterFalso(ManejadorFalso):
+    """
+    Responde como /v2/email-verifier de Hunter.io según el correo:
+    contiene 'invalid' -> invalid, 'risky' -> risky, 'lento' -> tarda
+    `demora` segundos, 'error' -> HTTP 500; cualquier otro -> valid.
+    `consultas` cuenta las verificaciones recibidas.
+    """
+    demora = 5.0
+    consultas = 0
+
+    def do_GET(self):
+        HunterFalso.consultas += 1
+        email = parse_qs(urlparse(self.path).query).get('email', [''])[0]
+        if 'error' in email:
+            return self._responder(500, {'errors': [{'details': 'fallo simulado'}]})
+        if 'lento' in email:
+            time.sleep(self.demora)
+        status = 'invalid' if 'invalid' in email else 'risky' if 'risky' in email else 'valid'
+        score = {'valid': 95, 'risky': 50, 'invalid': 10}[status]
+        self._responder(200, {'data': {'email': email, 'status': status, 'score': score}})
+
+
+class Command(ComandoServidorFalso):
+    help = (
+        "Levanta un servidor local que imita la API de verificación de Hunter.io "
+        "(para pruebas sin red: HUNTER_API_URL=http://127.0.0.1:<puerto>/v2/email-verifier)."
+    )
+    manejador = HunterFalso
+    nombre = 'Hunter falso'
+    puerto = 8765
+    ruta = '/v2/email-verifier'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--demora", type=float, default=5.0, help="Segundos que tardan los correos con 'lento'.")
+
+    def handle(self, *args, **options):
+        HunterFalso.demora = options["demora"]
+        super().handle(*args, **options)
@@ -0,0 +1,138 @@
+import hashlib
+import threading
+import uuid
+from urllib.parse import parse_qs, unquote, urlparse
+from xml.sax.saxutils import escape
+
+from apps.core.servidor_falso import ComandoServidorFalso, ManejadorFalso
+
+
+class S3Falso(ManejadorFalso):
+    """
+    Imita en memoria la parte de la API de S3 (direccionamiento por ruta) que
+    usa `apps.core.media_s3`: ListObjectsV2, Put/Head/GetObject y subidas
+    multipart, con los mismos ETag que S3. No valida firmas.
+    """
+    tipo = 'application/xml'
+    objetos = {}
+    partes = {}
+    lock = threading.Lock()
+
+    def _ruta(self):
+        url = urlparse(self.path)
+        bucket, _, clave = unquote(url.path).lstrip('/').partition('/')
+        return bucket, clave, {k: v[0] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+
+    def _cuerpo(self):
+        datos = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if 'aws-chunked' not in (self.headers.get('Content-Encoding') or ''):
+            return datos
+        # Cuerpo en trozos "<tamaño hex>[;firma]\r\n<datos>\r\n", terminado en 0 (y trailers)
+        contenido, pos = b'', 0
+        while True:
+            fin_linea = datos.index(b'\r\n', pos)
+            tamano = int(datos[pos:fin_linea].split(b';')[0], 16)
+            if not tamano:
+                return contenido
+            contenido += datos[fin_linea + 2:fin_linea + 2 + tamano]
+            pos = fin_linea + 2 + tamano + 2
+
+    def do_GET(self):
+        bucket, clave, query = self._ruta()
+        if not clave:
+            return self._listar(bucket, query)
+        objeto = self.objetos.get((bucket, clave))
+        if objeto is None:
+            return self._responder(404, self._error('NoSuchKey'))
+        self._responder(200, objeto['datos'], objeto['tipo'], {'ETag': f'"{objeto["etag"]}"'})
+
+    def do_HEAD(self):
+        bucket, clave, _ = self._ruta()
+        objeto = self.objetos.get((bucket, clave))
+        if objeto is None:
+            return self._responder(404, b'')
+        self._responder(200, b'', objeto['tipo'], {'ETag': f'"{objeto["etag"]}"'}, largo=len(objeto['datos']))
+
+    def do_PUT(self):
+        bucket, clave, query = self._ruta()
+        datos = self._cuerpo()
+        etag = hashlib.md5(datos).hexdigest()
+        if 'uploadId' in query:
+            with self.lock:
+                self.partes[query['uploadId']][int(query['partNumber'])] = datos
+        else:
+            with self.lock:
+                self.objetos[(bucket, clave)] = {
+                    'datos': datos, 'etag': etag, 'tipo': self.headers.get('Content-Type', 'binary/octet-stream'),
+                }
+        self._responder(200, b'', cabeceras={'ETag': f'"{etag}"'})
+
+    def do_POST(self):
+        bucket, clave, query = self._ruta()
+        self._cuerpo()
+        if 'uploads' in query:
+            subida = uuid.uuid4().hex
+            with self.lock:
+                self.partes[subida] = {'tipo': self.headers.get('Content-Type', 'binary/octet-stream')}
+            return self._responder(200, self._xml(
+                'InitiateMultipartUploadResult',
+                f'<Bucket>{escape(bucket)}</Bucket><Key>{escape(clave)}</Key><UploadId>{subida}</UploadId>',
+            ))
+        with self.lock:
+            partes = self.partes.pop(query['uploadId'])
+        tipo = partes.pop('tipo')
+        orden = [partes[numero] for numero in sorted(partes)]
+        etag = hashlib.md5(b''.join(hashlib.md5(parte).digest() for parte in orden)).hexdigest() + f'-{len(orden)}'
+        with self.lock:
+            self.objetos[(bucket, clave)] = {'datos': b''.join(orden), 'etag': etag, 'tipo': tipo}
+        self._responder(200, self._xml(
+            'CompleteMultipartUploadResult',
+            f'<Bucket>{escape(bucket)}</Bucket><Key>{escape(clave)}</Key><ETag>"{etag}"</ETag>',
+        ))
+
+    def do_DELETE(self):
+        bucket, clave, query = self._ruta()
+        with self.lock:
+            if 'uploadId' in query:
+                self.partes.pop(query['uploadId'], None)
+            else:
+                self.objetos.pop((bucket, clave), None)
+        self._responder(204, b'')
+
+    def _listar(self, bucket, query):
+        prefijo = query.get('prefix', '')
+        maximo = int(query.get('max-keys', 1000))
+        claves = sorted(c for b, c in self.objetos if b == bucket and c.startswith(prefijo))
+        desde = query.get('continuation-token') or query.get('start-after')
+        if desde:
+            claves = [c for c in claves if c > desde]
+        pagina, truncado = claves[:maximo], len(claves) > maximo
+        contenido = ''.join(
+            f'<Contents><Key>{escape(c)}</Key><Size>{len(self.objetos[(bucket, c)]["datos"])}</Size>'
+            f'<ETag>"{self.objetos[(bucket, c)]["etag"]}"</ETag><StorageClass>STANDARD</StorageClass></Contents>'
+            for c in pagina
+        )
+        contenido += f'<Name>{escape(bucket)}</Name><Prefix>{escape(prefijo)}</Prefix><KeyCount>{len(pagina)}</KeyCount>'
+        contenido += f'<MaxKeys>{maximo}</MaxKeys><IsTruncated>{"true" if truncado else "false"}</IsTruncated>'
+        if truncado:
+            contenido += f'<NextContinuationToken>{escape(pagina[-1])}</NextContinuationToken>'
+        self._responder(200, self._xml('ListBucketResult', contenido))
+
+    def _xml(self, raiz, contenido):
+        return (
+            f'<?xml version="1.0" encoding="UTF-8"?>'
+            f'<{raiz} xmlns="http://s3.amazonaws.com/doc/2006-03-01/">{contenido}</{raiz}>'
+        ).encode('utf-8')
+
+    def _error(self, codigo):
+        return f'<?xml version="1.0" encoding="UTF-8"?><Error><Code>{codigo}</Code></Error>'.encode('utf-8')
+
+
+class Command(ComandoServidorFalso):
+    help = (
+        "Levanta un servidor local que imita S3 en memoria "
+        "(para pruebas sin AWS: AWS_S3_ENDPOINT_URL=http://127.0.0.1:<puerto>)."
+    )
+    manejador = S3Falso
+    nombre = 'S3 falso'
+    puerto = 8767
@@ -1,17 +1,20 @@
 """
 Management command to migrate media files from local storage to AWS S3.
 Runs automatically on deployment when S3 credentials are configured.
+
+Files already in the bucket with the same content are skipped, so a deploy
+only uploads what changed (see apps.core.media_s3).
 """
 import os
-from pathlib import Path
-from django.core.management.base import BaseCommand
+
 from django.conf import settings
-from django.core.files.storage import default_storage
-from storages.backends.s3boto3 import S3Boto3Storage
+from django.core.management.base import BaseCommand
+
+from apps.core import media_s3
 
 
 class Command(BaseCommand):
-    help = 'Migrate media files from local directory to AWS S3'
+    help = 'Migrate media files from local directory to AWS S3 (only new or changed files)'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -19,6 +22,22 @@ class Command(BaseCommand):
             action='store_true',
             help='Show files that would be migrated without actually migrating them',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Number of files uploaded in parallel',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Upload every file, even if the bucket already has the same content',
+        )
+        parser.add_argument(
+            '--manifest',
+            default=None,
+            help='Path of the local manifest of uploaded files (default: MEDIA_S3_MANIFIESTO)',
+        )
 
     def handle(self, *args, **options):
         # Check if S3 is configured
@@ -30,6 +49,13 @@ class Command(BaseCommand):
             )
             return
 
+        bucket = getattr(settings, 'AWS_STORAGE_BUCKET_NAME', None) or os.getenv('AWS_STORAGE_BUCKET_NAME')
+        if not bucket:
+            self.stdout.write(
+                self.style.WARNING('⚠️  AWS_STORAGE_BUCKET_NAME not configured. Skipping S3 migration.')
+            )
+            return
+
         # Get local media path
         local_media_root = settings.MEDIA_ROOT
         
@@ -41,69 +67,47 @@ class Command(BaseCommand):
             )
             return
 
-        # Count files to migrate
-        files_to_migrate = []
-        for root, dirs, files in os.walk(local_media_root):
-            for file in files:
-                file_path = os.path.join(root, file)
-                # Calculate relative path for S3
-                rel_path = os.path.relpath(file_path, local_media_root)
-                files_to_migrate.append((file_path, rel_path))
-
-        if not files_to_migrate:
-            self.stdout.write(
-                self.style.SUCCESS('✅ No media files to migrate.')
-            )
-            return
-
-        self.stdout.write(
-            self.style.WARNING(
-                f'🔄 Found {len(files_to_migrate)} file(s) to migrate to S3...\n'
-            )
-        )
-
         if options['dry_run']:
             self.stdout.write(self.style.NOTICE('📋 DRY RUN - No files will be uploaded\n'))
 
-        # Migrate files
-        success_count = 0
-        error_count = 0
+        verbosity = options.get('verbosity', 1)
 
-        for local_path, s3_key in files_to_migrate:
-            try:
-                if options['dry_run']:
-                    self.stdout.write(f'  → {s3_key}')
-                else:
-                    # Upload to S3
-                    with open(local_path, 'rb') as f:
-                        default_storage.save(s3_key, f)
-                    
-                    self.stdout.write(
-                        self.style.SUCCESS(f'  ✓ {s3_key}')
-                    )
-                success_count += 1
+        def progress(key, result, detail):
+            if result == media_s3.ERROR:
+                self.stdout.write(self.style.ERROR(f'  ✗ {key}: {detail}'))
+            elif result == media_s3.SUBIDO and verbosity >= 1:
+                self.stdout.write(f'  → {key}' if options['dry_run'] else self.style.SUCCESS(f'  ✓ {key}'))
+            elif verbosity >= 2:
+                self.stdout.write(f'  = {key} (unchanged)')
 
-            except Exception as e:
-                error_count += 1
-                self.stdout.write(
-                    self.style.ERROR(f'  ✗ {s3_key}: {str(e)}')
-                )
+        totals = media_s3.sincronizar(
+            local_media_root,
+            bucket,
+            prefijo=getattr(settings, 'AWS_LOCATION', '') or '',
+            hilos=options['workers'],
+            forzar=options['force'],
+            simular=options['dry_run'],
+            manifiesto=options['manifest'],
+            progreso=progress,
+        )
 
         # Summary
         self.stdout.write('\n' + '='*60)
         if options['dry_run']:
             self.stdout.write(
                 self.style.NOTICE(
-                    f'📋 DRY RUN COMPLETE: {success_count} file(s) would be migrated'
+                    f'📋 DRY RUN COMPLETE: {totals[media_s3.SUBIDO]} file(s) would be migrated, '
+                    f'{totals[media_s3.OMITIDO]} already up to date'
                 )
             )
         else:
             self.stdout.write(
                 self.style.SUCCESS(
-                    f'✅ Migration complete: {success_count} file(s) migrated'
+                    f'✅ Migration complete: {totals[media_s3.SUBIDO]} file(s) migrated '
+                    f'({totals["bytes"] / (1024 * 1024):.1f} MB), {totals[media_s3.OMITIDO]} already up to date'
                 )
             )
-            if error_count > 0:
-                self.stdout.write(
-                    self.style.WARNING(f'⚠️  {error_count} file(s) failed')
-                )
+        if totals[media_s3.ERROR] > 0:
+            self.stdout.write(
+                self.style.WARNING(f'⚠️  {totals[media_s3.ERROR]} file(s) failed')
+            )
@@ -1,16 +1,21 @@
 from pathlib import Path
-import json
 import os
-import tempfile
 
 from django.apps import apps
 from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
 from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.core import backup
 
 
 class Command(BaseCommand):
-    help = "Restaura un fixture JSON si la base no tiene datos de negocio."
+    help = (
+        "Restaura un respaldo (fixture JSON o JSON Lines, opcionalmente .gz) si la base "
+        "no tiene datos de negocio, con inserciones en bloque (ver apps.core.backup)."
+    )
 
     check_models = (
         "catalog.Marca",
@@ -29,6 +34,13 @@ class Command(BaseCommand):
             action="store_true",
             help="Restaura aunque ya existan datos de negocio.",
         )
+        parser.add_argument(
+            "--apps",
+            nargs="+",
+            default=["catalog"],
+            help="Apps cuyos registros se restauran (por defecto solo el catálogo).",
+        )
+        parser.add_argument("--lote", type=int, default=1000, help="Registros insertados por sentencia.")
 
     def handle(self, *args, **options):
         fixture_path = Path(options["fixture"])
@@ -45,9 +57,51 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING("La base ya tiene datos de negocio. Se omite la restauración."))
             return
 
-        filtered_fixture_path = self._build_catalog_fixture_file(fixture_path)
-        call_command("loaddata", str(filtered_fixture_path), verbosity=options.get("verbosity", 1))
-        self.stdout.write(self.style.SUCCESS(f"Catálogo restaurado desde {fixture_path}"))
+        # Base y deltas del respaldo incremental (si los hay), en orden y en una transacción
+        conteos, bajas = {}, {}
+        with transaction.atomic():
+            for archivo in backup.cadena(fixture_path):
+                if not archivo.exists():
+                    raise CommandError(f"Falta el archivo de la cadena de respaldo: {archivo}")
+                restaurados = backup.restaurar(archivo, incluir=set(options["apps"]), lote=options["lote"], bajas=bajas)
+                for label, cantidad in restaurados:
+                    conteos[label] = conteos.get(label, 0) + cantidad
+        restaurados = list(conteos.items())
+        if not restaurados:
+            raise CommandError(f"El fixture no contiene registros de {', '.join(options['apps'])} para restaurar.")
+
+        self.rebuild_derived_data({label.lower() for label in [*conteos, *bajas]}, options.get("verbosity", 1))
+        self.stdout.write(self.style.SUCCESS(f"Datos restaurados desde {fixture_path}:"))
+        for label, cantidad in restaurados:
+            self.stdout.write(f"- {label} ({cantidad} registros)")
+        for label, cantidad in bajas.items():
+            if cantidad:
+                self.stdout.write(f"- {label} ({cantidad} bajas)")
+
+    def rebuild_derived_data(self, labels, verbosity):
+        """bulk_create no dispara señales: lo que estas mantienen se reconstruye en bloque."""
+        if any(label.startswith("catalog.") for label in labels):
+            from apps.catalog import caching, resolver
+
+            resolver.invalidar()
+            caching.invalidar(caching.GRUPO_CATALOGO)
+            call_command("rebuild_search_index", verbosity=verbosity, stdout=self.stdout)
+
+        if get_user_model()._meta.label_lower in labels:
+            from apps.users.models import UserProfile
+
+            sin_perfil = get_user_model().objects.filter(profile__isnull=True).values_list("id", flat=True)
+            UserProfile.objects.bulk_create(
+                [UserProfile(user_id=user_id) for user_id in sin_perfil.iterator()],
+                ignore_conflicts=True,
+            )
+
+        if labels & {"orders.detallepedido", "orders.pago"}:
+            call_command("reconcile_order_aggregates", verbosity=verbosity, stdout=self.stdout)
+
+        if labels & {"orders.pedido", "orders.detallepedido"}:
+            # Ventas diarias y ranking de más vendidos desde los pedidos restaurados
+            call_command("rebuild_best_sellers", desde_pedidos=True, verbosity=verbosity, stdout=self.stdout)
 
     def database_has_business_data(self):
         for model_label in self.check_models:
@@ -70,17 +124,3 @@ class Command(BaseCommand):
             self._tables_cache = set(connection.introspection.table_names())
 
         return self._tables_cache
-
-    def _build_catalog_fixture_file(self, fixture_path):
-        with fixture_path.open("r", encoding="utf-8") as fixture_file:
-            data = json.load(fixture_file)
-
-        catalog_data = [item for item in data if item.get("model", "").startswith("catalog.")]
-        if not catalog_data:
-            raise CommandError("El fixture no contiene registros de catálogo para restaurar.")
-
-        tmp_file = tempfile.NamedTemporaryFile(mode="w", suffix=".json", delete=False, encoding="utf-8")
-        with tmp_file:
-            json.dump(catalog_data, tmp_file, ensure_ascii=False, indent=2)
-
-        return Path(tmp_file.name)
\ No newline at end of file
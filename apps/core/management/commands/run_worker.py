@@ -0,0 +1,83 @@
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from apps.core import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Procesa la cola de tareas diferidas (correos transaccionales, etc.) con N hilos. "
+        "Las tareas fallidas se reintentan con backoff exponencial."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrencia", type=int, default=2, help="Hilos que procesan tareas en paralelo.")
+        parser.add_argument("--intervalo", type=float, default=2.0, help="Segundos de espera cuando la cola está vacía.")
+        parser.add_argument("--lote", type=int, default=10, help="Tareas que reclama cada hilo por consulta.")
+        parser.add_argument("--una-vez", action="store_true", help="Procesa las tareas listas y termina (útil en cron).")
+        parser.add_argument("--purgar-dias", type=int, default=7, help="Elimina las tareas completadas hace más de estos días.")
+
+    def handle(self, *args, **options):
+        self.parar = threading.Event()
+        if not options["una_vez"]:
+            for senal in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(senal, lambda *_: self.parar.set())
+
+        nombre = f"{socket.gethostname()}:{os.getpid()}"
+        self.stdout.write(
+            f"Worker {nombre}: {options['concurrencia']} hilos, tareas: {', '.join(jobs.tareas_registradas())}"
+        )
+        self.procesadas = {'ok': 0, 'error': 0}
+        self._lock = threading.Lock()
+        hilos = [
+            threading.Thread(
+                target=self._bucle,
+                args=(f"{nombre}:{i}", options["lote"], options["intervalo"], options["una_vez"]),
+                daemon=True,
+            )
+            for i in range(max(options["concurrencia"], 1))
+        ]
+        for hilo in hilos:
+            hilo.start()
+
+        ultima_purga = 0
+        while any(hilo.is_alive() for hilo in hilos):
+            if time.monotonic() - ultima_purga > 3600:
+                eliminadas = jobs.purgar(options["purgar_dias"])
+                if eliminadas:
+                    self.stdout.write(f"Purgadas {eliminadas} tareas completadas")
+                ultima_purga = time.monotonic()
+            for hilo in hilos:
+                hilo.join(timeout=1)
+        connection.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Worker detenido: {self.procesadas['ok']} tareas completadas, {self.procesadas['error']} con error."
+        ))
+
+    def _bucle(self, worker, lote, intervalo, una_vez):
+        try:
+            while not self.parar.is_set():
+                close_old_connections()
+                reclamadas = jobs.reclamar(worker, lote)
+                if not reclamadas:
+                    if una_vez:
+                        return
+                    self.parar.wait(intervalo)
+                    continue
+                for indice, job in enumerate(reclamadas):
+                    if self.parar.is_set():
+                        # Devolver a la cola lo reclamado que no llegó a ejecutarse
+                        jobs.liberar(reclamadas[indice:])
+                        break
+                    ok = jobs.ejecutar(job)
+                    with self._lock:
+                        self.procesadas['ok' if ok else 'error'] += 1
+        finally:
+            connection.close()
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from apps.core import seeding
+
+
+class Command(BaseCommand):
+    help = (
+        "Siembra un conjunto de datos sintético (marcas, categorías anidadas, productos, "
+        "usuarios con carrito y pedidos) para benchmarks y pruebas de carga."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--productos", type=int, default=1000, help="Cantidad total de productos sintéticos.")
+        parser.add_argument("--marcas", type=int, default=20, help="Cantidad de marcas.")
+        parser.add_argument("--categorias", type=int, default=8, help="Cantidad de categorías raíz.")
+        parser.add_argument("--subcategorias", type=int, default=3, help="Subcategorías por cada categoría raíz.")
+        parser.add_argument("--usuarios", type=int, default=50, help="Cantidad de usuarios con carrito.")
+        parser.add_argument("--pedidos-por-usuario", type=int, default=5, help="Pedidos por usuario.")
+        parser.add_argument("--items-por-carrito", type=int, default=3, help="Productos en el carrito de cada usuario.")
+        parser.add_argument("--semilla", type=int, default=42, help="Semilla del generador pseudoaleatorio.")
+        parser.add_argument("--limpiar", action="store_true", help="Elimina los datos sintéticos y termina.")
+
+    def handle(self, *args, **options):
+        if options["limpiar"]:
+            seeding.limpiar()
+            self.stdout.write(self.style.SUCCESS("Datos sintéticos eliminados."))
+            return
+
+        totales = seeding.sembrar(
+            productos=options["productos"],
+            marcas=options["marcas"],
+            categorias=options["categorias"],
+            subcategorias=options["subcategorias"],
+            usuarios=options["usuarios"],
+            pedidos_por_usuario=options["pedidos_por_usuario"],
+            items_por_carrito=options["items_por_carrito"],
+            semilla=options["semilla"],
+            log=self.stdout.write,
+        )
+        resumen = ', '.join(f'{clave}={valor}' for clave, valor in totales.items())
+        self.stdout.write(self.style.SUCCESS(f"Datos sintéticos listos: {resumen}"))
@@ -0,0 +1,220 @@
+"""
+Sincronización de `MEDIA_ROOT` con el bucket S3 de media.
+
+- Un solo listado del bucket (1000 objetos por llamada) da el tamaño y el
+  ETag de lo que ya está subido; un archivo local cuyo ETag coincide no se
+  vuelve a subir. El ETag se calcula localmente igual que S3: MD5 del archivo
+  o, para los subidos en partes, MD5 de los MD5 de cada parte más `-N`.
+- Manifiesto local (`MEDIA_S3_MANIFIESTO`) con ETag, tamaño y mtime de cada
+  archivo: si el tamaño y el mtime no cambiaron no hace falta ni leerlo.
+- Archivo de reanudación (`<manifiesto>.parcial`): cada archivo terminado se
+  agrega en el momento, así una corrida interrumpida retoma donde quedó sin
+  recalcular ni resubir. Al terminar se integra al manifiesto.
+- Subidas en paralelo con un pool de hilos acotado y transferencia multipart
+  de boto3 para los archivos grandes. Las claves se escriben tal cual (sin el
+  sufijo aleatorio que agrega el storage con `AWS_S3_FILE_OVERWRITE = False`).
+
+Para pruebas sin AWS: `python manage.py fake_s3` y `AWS_S3_ENDPOINT_URL`
+apuntando a ese servidor.
+"""
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+UMBRAL_MULTIPART = 8 * MB
+TAMANO_PARTE = 8 * MB
+LECTURA = 1 * MB
+
+# Resultados por archivo
+SUBIDO = 'subido'
+OMITIDO = 'omitido'
+ERROR = 'error'
+
+
+def _config(nombre, defecto=None):
+    # Las credenciales de AWS solo están en settings en producción; fuera de ella, del entorno
+    return getattr(settings, nombre, None) or os.getenv(nombre) or defecto
+
+
+def cliente(max_conexiones=10):
+    import boto3
+    from botocore.config import Config
+
+    return boto3.client(
+        's3',
+        aws_access_key_id=_config('AWS_ACCESS_KEY_ID'),
+        aws_secret_access_key=_config('AWS_SECRET_ACCESS_KEY'),
+        region_name=_config('AWS_S3_REGION_NAME', 'us-east-1'),
+        endpoint_url=_config('AWS_S3_ENDPOINT_URL'),
+        config=Config(
+            max_pool_connections=max_conexiones,
+            retries={'max_attempts': 5, 'mode': 'standard'},
+            s3={'addressing_style': _config('AWS_S3_ADDRESSING_STYLE', 'path')},
+        ),
+    )
+
+
+def etag_local(ruta, umbral=UMBRAL_MULTIPART, tamano_parte=TAMANO_PARTE):
+    """ETag que S3 asigna a `ruta` si se sube con estos parámetros de multipart."""
+    if os.path.getsize(ruta) < umbral:
+        md5 = hashlib.md5()
+        with open(ruta, 'rb') as archivo:
+            for bloque in iter(lambda: archivo.read(LECTURA), b''):
+                md5.update(bloque)
+        return md5.hexdigest()
+
+    digests = []
+    with open(ruta, 'rb') as archivo:
+        while True:
+            parte = hashlib.md5()
+            leidos = 0
+            while leidos < tamano_parte:
+                bloque = archivo.read(min(LECTURA, tamano_parte - leidos))
+                if not bloque:
+                    break
+                parte.update(bloque)
+                leidos += len(bloque)
+            if not leidos:
+                break
+            digests.append(parte.digest())
+    return f"{hashlib.md5(b''.join(digests)).hexdigest()}-{len(digests)}"
+
+
+def objetos_remotos(s3, bucket, prefijo=''):
+    """Retorna {clave: (tamaño, etag)} de los objetos del bucket bajo `prefijo`."""
+    objetos = {}
+    for pagina in s3.get_paginator('list_objects_v2').paginate(Bucket=bucket, Prefix=prefijo):
+        for objeto in pagina.get('Contents', []):
+            objetos[objeto['Key']] = (objeto['Size'], objeto['ETag'].strip('"'))
+    return objetos
+
+
+class Manifiesto:
+    """ETag, tamaño y mtime de cada archivo ya sincronizado, con diario de reanudación."""
+
+    def __init__(self, ruta):
+        self.ruta = Path(ruta)
+        self.diario = self.ruta.with_name(f"{self.ruta.name}.parcial")
+        self._lock = threading.Lock()
+        self.entradas = {}
+        if self.ruta.exists():
+            with self.ruta.open('r', encoding='utf-8') as entrada:
+                self.entradas = json.load(entrada)
+        if self.diario.exists():
+            # Corrida anterior interrumpida: lo que llegó a terminar sigue valiendo
+            with self.diario.open('r', encoding='utf-8') as entrada:
+                for linea in entrada:
+                    try:
+                        clave, datos = json.loads(linea)
+                    except ValueError:
+                        continue  # última línea cortada
+                    self.entradas[clave] = datos
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        self._salida = self.diario.open('a', encoding='utf-8')
+
+    def vigente(self, clave, stat):
+        """ETag registrado para `clave` si el archivo no cambió de tamaño ni de mtime."""
+        datos = self.entradas.get(clave)
+        if datos and datos['tamano'] == stat.st_size and datos['mtime'] == stat.st_mtime_ns:
+            return datos['etag']
+        return None
+
+    def registrar(self, clave, etag, stat):
+        datos = {'etag': etag, 'tamano': stat.st_size, 'mtime': stat.st_mtime_ns}
+        with self._lock:
+            self.entradas[clave] = datos
+            self._salida.write(json.dumps([clave, datos]) + '\n')
+            self._salida.flush()
+
+    def guardar(self):
+        """Escribe el manifiesto completo y descarta el diario."""
+        self._salida.close()
+        temporal = self.ruta.with_name(f".{self.ruta.name}")
+        with temporal.open('w', encoding='utf-8') as salida:
+            json.dump(self.entradas, salida, ensure_ascii=False, sort_keys=True)
+        os.replace(temporal, self.ruta)
+        self.diario.unlink(missing_ok=True)
+
+
+def archivos_locales(raiz):
+    """Itera (ruta relativa con '/', ruta absoluta) de los archivos bajo `raiz`."""
+    for directorio, _, archivos in os.walk(raiz):
+        for nombre in archivos:
+            ruta = os.path.join(directorio, nombre)
+            yield Path(os.path.relpath(ruta, raiz)).as_posix(), ruta
+
+
+def sincronizar(raiz, bucket, prefijo='', hilos=8, forzar=False, simular=False,
+                manifiesto=None, progreso=None):
+    """
+    Sube a `bucket` los archivos de `raiz` que no estén ya con el mismo
+    contenido. `progreso(clave, resultado, detalle)` se llama por archivo
+    desde los hilos. Retorna un dict resultado -> cantidad, más 'bytes'.
+    """
+    from boto3.s3.transfer import TransferConfig
+
+    s3 = cliente(max_conexiones=hilos * 4)
+    transferencia = TransferConfig(
+        multipart_threshold=UMBRAL_MULTIPART,
+        multipart_chunksize=TAMANO_PARTE,
+        max_concurrency=4,
+    )
+    prefijo = prefijo.strip('/') + '/' if prefijo.strip('/') else ''
+    remotos = {} if forzar else objetos_remotos(s3, bucket, prefijo)
+    registro = Manifiesto(
+        manifiesto or _config('MEDIA_S3_MANIFIESTO', settings.BASE_DIR / 'backups' / 'media_s3.json')
+    )
+    totales = {SUBIDO: 0, OMITIDO: 0, ERROR: 0, 'bytes': 0}
+    lock = threading.Lock()
+
+    def procesar(item):
+        relativa, ruta = item
+        clave = prefijo + relativa
+        try:
+            stat = os.stat(ruta)
+            registrado = None if forzar else registro.vigente(clave, stat)
+            etag = None
+            remoto = remotos.get(clave)
+            if remoto and remoto[0] == stat.st_size:
+                if registrado == remoto[1]:
+                    resultado, detalle = OMITIDO, ''
+                    return
+                etag = etag_local(ruta)
+                if etag == remoto[1]:
+                    registro.registrar(clave, etag, stat)
+                    resultado, detalle = OMITIDO, ''
+                    return
+            if simular:
+                resultado, detalle = SUBIDO, 'simulado'
+                return
+            tipo = mimetypes.guess_type(relativa)[0] or 'application/octet-stream'
+            s3.upload_file(ruta, bucket, clave, ExtraArgs={'ContentType': tipo}, Config=transferencia)
+            registro.registrar(clave, etag or etag_local(ruta), stat)
+            resultado, detalle = SUBIDO, ''
+            with lock:
+                totales['bytes'] += stat.st_size
+        except Exception as exc:
+            logger.error("Error subiendo %s a S3: %s", clave, exc)
+            resultado, detalle = ERROR, str(exc)
+        finally:
+            with lock:
+                totales[resultado] += 1
+            if progreso:
+                progreso(clave, resultado, detalle)
+
+    try:
+        with ThreadPoolExecutor(max_workers=hilos) as pool:
+            list(pool.map(procesar, archivos_locales(raiz)))
+    finally:
+        registro.guardar()
+    return totales
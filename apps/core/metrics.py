@@ -0,0 +1,121 @@
+"""
+Métricas por vista: consultas SQL, tiempo en base de datos, tiempo total y
+tamaño de respuesta (ver `apps.core.middleware.InstrumentacionMiddleware`).
+
+Cada proceso guarda las últimas `METRICAS_VENTANA` mediciones de cada vista
+en memoria y cada `METRICAS_PUBLICAR` segundos publica esa ventana en la
+cache, así el resumen (percentiles móviles) combina todos los workers de
+gunicorn sin tocar la cache en cada request.
+
+Eso requiere una cache compartida entre procesos (`CACHE_BACKEND` redis, como
+en render.yaml, o file). Con locmem cada worker solo ve su propia ventana y
+`procesos` en el resumen queda en 1.
+"""
+import os
+import socket
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+from django.conf import settings
+from django.core.cache import cache
+
+VENTANA = 500
+PUBLICAR = 30
+# Una ventana publicada deja de contar si su proceso no la renueva en este tiempo
+VIGENCIA = 10 * 60
+PERCENTILES = (50, 90, 99)
+
+CLAVE_PROCESOS = 'metricas:procesos'
+CAMPOS = ('total_ms', 'db_ms', 'consultas', 'bytes')
+
+_lock = threading.Lock()
+_muestras = defaultdict(lambda: deque(maxlen=getattr(settings, 'METRICAS_VENTANA', VENTANA)))
+_publicado = [0.0]
+_proceso = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class Medicion:
+    """
+    Envoltorio de `connection.execute_wrapper` que cuenta las consultas de un
+    request, su tiempo y cuántas veces se repite cada sentencia.
+    """
+
+    def __init__(self):
+        self.consultas = 0
+        self.db = 0.0
+        self.sentencias = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - inicio
+            self.consultas += 1
+            self.sentencias[sql] += 1
+
+    def repetidas(self, limite=5):
+        """Sentencias ejecutadas más de una vez (candidatas a N+1), de más a menos."""
+        return [(sql, n) for sql, n in self.sentencias.most_common(limite) if n > 1]
+
+
+def registrar(vista, total_ms, db_ms, consultas, tamano):
+    """Agrega una medición a la ventana de `vista` y publica si corresponde."""
+    with _lock:
+        _muestras[vista].append((round(total_ms, 2), round(db_ms, 2), consultas, tamano))
+        ahora = time.monotonic()
+        if ahora - _publicado[0] < getattr(settings, 'METRICAS_PUBLICAR', PUBLICAR):
+            return
+        _publicado[0] = ahora
+        ventana = {nombre: list(muestras) for nombre, muestras in _muestras.items()}
+    publicar(ventana)
+
+
+def publicar(ventana=None):
+    """Deja en la cache la ventana de este proceso y lo anota en el índice de procesos."""
+    if ventana is None:
+        with _lock:
+            ventana = {nombre: list(muestras) for nombre, muestras in _muestras.items()}
+    try:
+        cache.set(f'metricas:{_proceso}', ventana, VIGENCIA)
+        procesos = cache.get(CLAVE_PROCESOS) or {}
+        limite = time.time() - VIGENCIA
+        procesos = {clave: marca for clave, marca in procesos.items() if marca > limite}
+        procesos[_proceso] = time.time()
+        cache.set(CLAVE_PROCESOS, procesos, VIGENCIA)
+    except Exception:
+        # Las métricas nunca deben romper un request
+        pass
+
+
+def _percentil(ordenados, p):
+    # Método del rango más cercano
+    indice = max(0, min(len(ordenados) - 1, -(-p * len(ordenados) // 100) - 1))
+    return ordenados[indice]
+
+
+def resumen():
+    """
+    Percentiles de cada campo por vista sobre las ventanas de todos los
+    procesos, de la vista más lenta (p90) a la más rápida.
+    """
+    publicar()
+    procesos = cache.get(CLAVE_PROCESOS) or {}
+    ventanas = cache.get_many([f'metricas:{clave}' for clave in procesos]).values()
+
+    por_vista = defaultdict(list)
+    for ventana in ventanas:
+        for vista, muestras in ventana.items():
+            por_vista[vista].extend(muestras)
+
+    vistas = []
+    for vista, muestras in por_vista.items():
+        datos = {'vista': vista, 'muestras': len(muestras)}
+        for posicion, campo in enumerate(CAMPOS):
+            ordenados = sorted(muestra[posicion] for muestra in muestras)
+            datos[campo] = {f'p{p}': _percentil(ordenados, p) for p in PERCENTILES}
+            datos[campo]['max'] = ordenados[-1]
+        vistas.append(datos)
+    vistas.sort(key=lambda datos: datos['total_ms']['p90'], reverse=True)
+    return {'procesos': len(ventanas), 'vistas': vistas}
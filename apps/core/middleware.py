@@ -0,0 +1,75 @@
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentacionMiddleware:
+    """
+    Mide una fracción (`METRICAS_MUESTREO`, de 0 a 1) de los requests: cantidad
+    de consultas SQL, tiempo en base de datos, tiempo total y tamaño de la
+    respuesta. Registra la medición por vista (ver `apps.core.metrics`) y deja
+    un warning con las sentencias más repetidas para los requests más lentos
+    que `METRICAS_LENTO_MS`.
+
+    El header `Server-Timing` expone tiempos internos, así que solo va a
+    usuarios staff o a todos con `METRICAS_SERVER_TIMING` (por defecto, DEBUG).
+
+    Los requests no muestreados solo pagan una comparación.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.muestreo = float(getattr(settings, 'METRICAS_MUESTREO', 0))
+        self.lento_ms = float(getattr(settings, 'METRICAS_LENTO_MS', 500))
+        self.server_timing = getattr(settings, 'METRICAS_SERVER_TIMING', settings.DEBUG)
+
+    def __call__(self, request):
+        if self.muestreo <= 0 or (self.muestreo < 1 and random.random() >= self.muestreo):
+            return self.get_response(request)
+
+        medicion = metrics.Medicion()
+        inicio = time.perf_counter()
+        with ExitStack() as pila:
+            for conexion in connections.all():
+                pila.enter_context(conexion.execute_wrapper(medicion))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - inicio) * 1000
+        db_ms = medicion.db * 1000
+
+        if self.server_timing or getattr(getattr(request, 'user', None), 'is_staff', False):
+            response['Server-Timing'] = ', '.join(filter(None, [
+                response.get('Server-Timing'),
+                f'db;dur={db_ms:.1f};desc="{medicion.consultas} consultas"',
+                f'total;dur={total_ms:.1f}',
+            ]))
+
+        vista = self._vista(request)
+        if response.streaming:
+            tamano = int(response.get('Content-Length') or 0)
+        else:
+            tamano = len(response.content)
+        metrics.registrar(vista, total_ms, db_ms, medicion.consultas, tamano)
+
+        if total_ms >= self.lento_ms:
+            repetidas = '\n'.join(f"  {n}x {sql[:300]}" for sql, n in medicion.repetidas())
+            logger.warning(
+                "Request lento: %s %s (%s) %.0f ms, %s consultas en %.0f ms, %s bytes%s",
+                request.method, request.path, vista, total_ms, medicion.consultas, db_ms, tamano,
+                f"\nSentencias repetidas:\n{repetidas}" if repetidas else '',
+            )
+        return response
+
+    @staticmethod
+    def _vista(request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return f"{request.method} (sin ruta)"
+        return f"{request.method} {match.view_name}"
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-18 20:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ValidacionEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.CharField(max_length=254, unique=True)),
+                ('status', models.CharField(max_length=20)),
+                ('score', models.FloatField(default=0.0)),
+                ('verificado_en', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Validación de email',
+                'verbose_name_plural': 'Validaciones de email',
+                'db_table': 'validaciones_email',
+            },
+        ),
+    ]
@@ -0,0 +1,60 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    Tarea diferida de la cola en base de datos (ver `apps.core.jobs`). La
+    ejecuta el comando `run_worker`; si falla se reprograma con backoff
+    exponencial hasta agotar `max_intentos`.
+    """
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('en_proceso', 'En proceso'),
+        ('completado', 'Completado'),
+        ('fallido', 'Fallido'),
+    ]
+
+    tarea = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente')
+    intentos = models.PositiveSmallIntegerField(default=0)
+    max_intentos = models.PositiveSmallIntegerField(default=5)
+    ejecutar_desde = models.DateTimeField(default=timezone.now)
+    # Mientras un worker la procesa; vencido este plazo otro worker puede retomarla
+    bloqueado_hasta = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    ultimo_error = models.TextField(blank=True)
+    creado_en = models.DateTimeField(auto_now_add=True)
+    actualizado_en = models.DateTimeField(auto_now=True)
+    completado_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'jobs'
+        verbose_name = 'Tarea en cola'
+        verbose_name_plural = 'Tareas en cola'
+        indexes = [
+            models.Index(fields=['estado', 'ejecutar_desde'], name='job_estado_ejecutar_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tarea} #{self.pk} - {self.estado}"
+
+
+class ValidacionEmail(models.Model):
+    """
+    Resultado de Hunter.io por correo normalizado (caché persistente con TTL,
+    ver `apps.core.hunter`). Sobrevive reinicios y se comparte entre workers.
+    """
+    email = models.CharField(max_length=254, unique=True)
+    status = models.CharField(max_length=20)
+    score = models.FloatField(default=0.0)
+    verificado_en = models.DateTimeField()
+
+    class Meta:
+        db_table = 'validaciones_email'
+        verbose_name = 'Validación de email'
+        verbose_name_plural = 'Validaciones de email'
+
+    def __str__(self):
+        return f"{self.email}: {self.status}"
@@ -0,0 +1,94 @@
+"""
+Cliente compartido para verificar tokens de reCAPTCHA.
+
+Todas las verificaciones del proceso reutilizan una misma `requests.Session`
+con un pool de conexiones keep-alive acotado (`RECAPTCHA_POOL_SIZE`), de modo
+que una ráfaga de logins no paga un handshake TCP/TLS por request. Los
+timeouts (conexión, lectura) se configuran con `RECAPTCHA_TIMEOUT`.
+
+Los tokens rechazados se guardan unos segundos en la caché
+(`RECAPTCHA_CACHE_TTL`): reintentar con el mismo token inválido no vuelve a
+salir a la red. Los aceptados no se cachean: Google acepta cada token una
+sola vez y un resultado OK reutilizable permitiría repetir el mismo captcha
+resuelto en varios intentos de login o registro. Los errores de conexión
+tampoco se cachean.
+
+Con `RECAPTCHA_BACKEND = 'stub'` no se contacta a Google: todo token es
+válido salvo `TOKEN_INVALIDO_STUB` (para pruebas y desarrollo sin red).
+"""
+import hashlib
+import logging
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+from .http import sesion
+
+logger = logging.getLogger(__name__)
+
+URL_VERIFICACION = 'https://www.google.com/recaptcha/api/siteverify'
+TOKEN_INVALIDO_STUB = 'invalido'
+
+# Resultados de `verificar`
+OK = 'ok'
+SIN_CONFIGURAR = 'sin_configurar'
+SIN_TOKEN = 'sin_token'
+INVALIDO = 'invalido'
+ERROR_CONEXION = 'error_conexion'
+
+
+class GoogleBackend:
+    def verificar_token(self, token, secreto):
+        respuesta = sesion('recaptcha', getattr(settings, 'RECAPTCHA_POOL_SIZE', 10)).post(
+            URL_VERIFICACION,
+            data={'secret': secreto, 'response': token},
+            timeout=getattr(settings, 'RECAPTCHA_TIMEOUT', (3, 5)),
+        )
+        respuesta.raise_for_status()
+        return bool(respuesta.json().get('success'))
+
+
+class StubBackend:
+    def verificar_token(self, token, secreto):
+        return token != TOKEN_INVALIDO_STUB
+
+
+BACKENDS = {'google': GoogleBackend, 'stub': StubBackend}
+
+
+def backend():
+    return BACKENDS[getattr(settings, 'RECAPTCHA_BACKEND', 'google')]()
+
+
+def _clave(token):
+    return f"recaptcha:{hashlib.sha256(token.encode('utf-8')).hexdigest()}"
+
+
+def verificar(token):
+    """
+    Verifica `token` (el campo `g-recaptcha-response`). Retorna OK,
+    SIN_CONFIGURAR, SIN_TOKEN, INVALIDO o ERROR_CONEXION; cada vista traduce
+    el resultado a su mensaje.
+    """
+    secreto = getattr(settings, 'RECAPTCHA_PRIVATE_KEY', None)
+    if not secreto:
+        logger.error("RECAPTCHA_PRIVATE_KEY no configurada en settings.")
+        return SIN_CONFIGURAR
+    if not token:
+        return SIN_TOKEN
+
+    clave = _clave(token)
+    cacheado = cache.get(clave)
+    if cacheado is not None:
+        return cacheado
+
+    try:
+        resultado = OK if backend().verificar_token(token, secreto) else INVALIDO
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.error(f"Error de conexión con Google reCAPTCHA: {str(e)}")
+        return ERROR_CONEXION
+
+    if resultado == INVALIDO:
+        cache.set(clave, resultado, getattr(settings, 'RECAPTCHA_CACHE_TTL', 30))
+    return resultado
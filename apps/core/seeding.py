@@ -0,0 +1,231 @@
+"""
+Datos sintéticos para benchmarks y pruebas de carga.
+
+`sembrar` crea (o completa, si ya existe una parte) marcas, categorías
+anidadas, productos con categorías secundarias y usuarios con carrito y
+pedidos. Todo se inserta con `bulk_create` y un generador pseudoaleatorio con
+semilla fija, de modo que dos ejecuciones con los mismos parámetros producen
+el mismo conjunto. Los registros se marcan con `PREFIJO` (SKU, slug, número
+de pedido) o `PREFIJO_USUARIO` (username) para poder borrarlos con `limpiar`.
+"""
+import random
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from apps.catalog import caching, resolver, search
+from apps.catalog.models import Categoria, Marca, Producto
+from apps.orders import ranking
+from apps.orders.models import Carrito, DetallePedido, ItemCarrito, Pago, Pedido
+
+PREFIJO = 'BENCH-'
+PREFIJO_USUARIO = 'bench_'
+LOTE = 2000
+
+NOTAS = ['cítrico', 'floral', 'amaderado', 'oriental', 'fresco', 'frutal', 'especiado', 'acuático']
+
+
+def _slug(*partes):
+    return '-'.join([PREFIJO.lower().rstrip('-'), *[str(p) for p in partes]])
+
+
+def _sembrar_marcas(cantidad):
+    nombres = [f'{PREFIJO}Marca {i}' for i in range(cantidad)]
+    existentes = set(Marca.objects.filter(nombre__in=nombres).values_list('nombre', flat=True))
+    Marca.objects.bulk_create([Marca(nombre=nombre) for nombre in nombres if nombre not in existentes])
+    return list(Marca.objects.filter(nombre__in=nombres).order_by('id'))
+
+
+def _sembrar_categorias(raices, hijas):
+    """Categorías raíz `bench-cat-i` con subcategorías `bench-cat-i-j`."""
+    slugs = [_slug('cat', i) for i in range(raices)]
+    existentes = set(Categoria.objects.filter(slug__in=slugs).values_list('slug', flat=True))
+    Categoria.objects.bulk_create([
+        Categoria(nombre=f'{PREFIJO}Categoría {i}', slug=slug)
+        for i, slug in enumerate(slugs) if slug not in existentes
+    ])
+    padres = {c.slug: c for c in Categoria.objects.filter(slug__in=slugs)}
+
+    slugs_hijas = {_slug('cat', i, j): (i, j) for i in range(raices) for j in range(hijas)}
+    existentes = set(Categoria.objects.filter(slug__in=list(slugs_hijas)).values_list('slug', flat=True))
+    Categoria.objects.bulk_create([
+        Categoria(nombre=f'{PREFIJO}Categoría {i}.{j}', slug=slug, padre=padres[_slug('cat', i)])
+        for slug, (i, j) in slugs_hijas.items() if slug not in existentes
+    ])
+    return list(Categoria.objects.filter(slug__in=slugs + list(slugs_hijas)).order_by('id'))
+
+
+def _sembrar_productos(cantidad, marcas, categorias, azar):
+    existentes = Producto.objects.filter(sku__startswith=PREFIJO).count()
+    faltan = max(cantidad - existentes, 0)
+    if not faltan:
+        return []
+    generos = [codigo for codigo, _ in Producto.GENERO_CHOICES]
+    nuevos = []
+    for i in range(existentes, existentes + faltan):
+        precio = Decimal(azar.randint(300, 4000))
+        nuevos.append(Producto(
+            sku=f'{PREFIJO}{i}',
+            nombre=f'Perfume sintético {i}',
+            genero=generos[i % len(generos)],
+            descripcion=f'Fragancia de notas {azar.choice(NOTAS)} y {azar.choice(NOTAS)}.',
+            precio=precio,
+            precio_oferta=(precio * Decimal('0.85')).quantize(Decimal('0.01')) if i % 7 == 0 else None,
+            volumen_ml=azar.choice([30, 50, 100]),
+            stock=azar.randint(0, 200),
+            # ~10% inactivos, como en el catálogo real
+            activo=i % 10 != 0,
+            marca=marcas[i % len(marcas)],
+            categoria=categorias[i % len(categorias)],
+        ))
+    creados = Producto.objects.bulk_create(nuevos, batch_size=LOTE)
+    if not all(producto.pk for producto in creados):
+        creados = list(Producto.objects.filter(sku__in=[p.sku for p in nuevos]))
+
+    # Categorías secundarias: dos por producto, distintas de la principal
+    Through = Producto.categorias_secundarias.through
+    relaciones = []
+    for producto in creados:
+        for categoria in azar.sample(categorias, min(2, len(categorias))):
+            if categoria.id != producto.categoria_id:
+                relaciones.append(Through(producto_id=producto.id, categoria_id=categoria.id))
+    Through.objects.bulk_create(relaciones, batch_size=LOTE, ignore_conflicts=True)
+    return creados
+
+
+def _sembrar_usuarios(cantidad):
+    existentes = User.objects.filter(username__startswith=PREFIJO_USUARIO).count()
+    if existentes < cantidad:
+        User.objects.bulk_create(
+            [
+                User(username=f'{PREFIJO_USUARIO}{i}', email=f'{PREFIJO_USUARIO}{i}@example.com', password='!')
+                for i in range(existentes, cantidad)
+            ],
+            batch_size=LOTE,
+        )
+    return list(User.objects.filter(username__startswith=PREFIJO_USUARIO).order_by('id').values_list('id', flat=True))
+
+
+def _sembrar_carritos(usuarios, items_por_carrito, productos, azar):
+    con_carrito = set(Carrito.objects.filter(usuario_id__in=usuarios).values_list('usuario_id', flat=True))
+    Carrito.objects.bulk_create([Carrito(usuario_id=u) for u in usuarios if u not in con_carrito], batch_size=LOTE)
+    if not items_por_carrito or not productos:
+        return
+    con_items = set(ItemCarrito.objects.filter(carrito__usuario_id__in=usuarios).values_list('carrito_id', flat=True))
+    items = []
+    for carrito_id in Carrito.objects.filter(usuario_id__in=usuarios).exclude(id__in=con_items).values_list('id', flat=True):
+        for producto_id in azar.sample(productos, min(items_por_carrito, len(productos))):
+            items.append(ItemCarrito(carrito_id=carrito_id, producto_id=producto_id, cantidad=azar.randint(1, 3)))
+    ItemCarrito.objects.bulk_create(items, batch_size=LOTE)
+
+
+def _sembrar_pedidos(usuarios, pedidos_por_usuario, productos, azar):
+    existentes = Pedido.objects.filter(numero_pedido__startswith=PREFIJO).count()
+    faltan = max(len(usuarios) * pedidos_por_usuario - existentes, 0)
+    if not faltan or not productos:
+        return 0
+    estados = [codigo for codigo, _ in Pedido.ESTADO_CHOICES]
+    estados_pago = [codigo for codigo, _ in Pago.ESTADO_CHOICES]
+    ahora = timezone.now()
+    creados = 0
+    for inicio in range(existentes, existentes + faltan, LOTE):
+        fin = min(inicio + LOTE, existentes + faltan)
+        pedidos = []
+        lineas = []
+        for i in range(inicio, fin):
+            detalle = [
+                (producto_id, azar.randint(1, 3), Decimal(azar.randint(300, 4000)))
+                for producto_id in azar.sample(productos, min(azar.randint(1, 4), len(productos)))
+            ]
+            lineas.append(detalle)
+            pedidos.append(Pedido(
+                usuario_id=usuarios[i % len(usuarios)],
+                numero_pedido=f'{PREFIJO}{i}',
+                estado=estados[i % len(estados)],
+                total=sum((precio * cantidad for _, cantidad, precio in detalle), Decimal('0')),
+                direccion_envio='Dirección sintética 123',
+                telefono='0000000000',
+                # Agregados desnormalizados (bulk_create no dispara señales)
+                cantidad_lineas=len(detalle),
+                cantidad_unidades=sum(cantidad for _, cantidad, _ in detalle),
+                estado_pago=estados_pago[i % len(estados_pago)],
+                pago_actualizado_en=ahora,
+            ))
+        pedidos = Pedido.objects.bulk_create(pedidos)
+        if not all(pedido.pk for pedido in pedidos):
+            por_numero = Pedido.objects.in_bulk([p.numero_pedido for p in pedidos], field_name='numero_pedido')
+            pedidos = [por_numero[p.numero_pedido] for p in pedidos]
+        DetallePedido.objects.bulk_create(
+            [
+                DetallePedido(pedido=pedido, producto_id=producto_id, cantidad=cantidad,
+                              precio_unitario=precio, subtotal=precio * cantidad)
+                for pedido, detalle in zip(pedidos, lineas)
+                for producto_id, cantidad, precio in detalle
+            ],
+            batch_size=LOTE,
+        )
+        Pago.objects.bulk_create(
+            [
+                Pago(pedido=pedido, monto=pedido.total, estado=estados_pago[i % len(estados_pago)], metodo_pago='tarjeta')
+                for i, pedido in enumerate(pedidos, start=inicio)
+            ],
+            batch_size=LOTE,
+        )
+        creados += len(pedidos)
+    return creados
+
+
+def sembrar(productos=1000, marcas=20, categorias=8, subcategorias=3, usuarios=50,
+            pedidos_por_usuario=5, items_por_carrito=3, semilla=42, log=None):
+    """
+    Siembra (o completa hasta) los totales pedidos. Retorna un dict con los
+    totales sintéticos resultantes. `log` es un callable opcional para informar
+    el avance.
+    """
+    log = log or (lambda mensaje: None)
+    azar = random.Random(semilla)
+
+    with transaction.atomic():
+        lista_marcas = _sembrar_marcas(marcas)
+        lista_categorias = _sembrar_categorias(categorias, subcategorias)
+        log(f"Marcas: {len(lista_marcas)}, categorías: {len(lista_categorias)}")
+
+        nuevos = _sembrar_productos(productos, lista_marcas, lista_categorias, azar)
+        log(f"Productos nuevos: {len(nuevos)}")
+        activos = list(Producto.objects.filter(sku__startswith=PREFIJO, activo=True).values_list('id', flat=True))
+
+        lista_usuarios = _sembrar_usuarios(usuarios)
+        _sembrar_carritos(lista_usuarios, items_por_carrito, activos, azar)
+        pedidos = _sembrar_pedidos(lista_usuarios, pedidos_por_usuario, activos, azar)
+        log(f"Usuarios: {len(lista_usuarios)}, pedidos nuevos: {pedidos}")
+
+    # bulk_create no dispara señales: índices derivados y cachés a mano
+    if nuevos:
+        search.indexar_productos(ids=[p.id for p in nuevos])
+    if pedidos:
+        ranking.reconstruir(desde_pedidos=True)
+    resolver.invalidar()
+    caching.invalidar(caching.GRUPO_CATALOGO, caching.GRUPO_VENTAS)
+
+    return {
+        'marcas': len(lista_marcas),
+        'categorias': len(lista_categorias),
+        'productos': Producto.objects.filter(sku__startswith=PREFIJO).count(),
+        'usuarios': len(lista_usuarios),
+        'pedidos': Pedido.objects.filter(numero_pedido__startswith=PREFIJO).count(),
+    }
+
+
+def limpiar():
+    """Elimina todos los registros sintéticos."""
+    with transaction.atomic():
+        Pedido.objects.filter(numero_pedido__startswith=PREFIJO).delete()
+        User.objects.filter(username__startswith=PREFIJO_USUARIO).delete()
+        Producto.objects.filter(sku__startswith=PREFIJO).delete()
+        Categoria.objects.filter(slug__startswith=_slug('')).delete()
+        Marca.objects.filter(nombre__startswith=PREFIJO).delete()
+    ranking.reconstruir(desde_pedidos=True)
+    resolver.invalidar()
+    caching.invalidar(caching.GRUPO_CATALOGO, caching.GRUPO_VENTAS)
@@ -0,0 +1,56 @@
+"""
+Base común de los servidores sustitutos locales para pruebas sin red
+(`fake_hunter`, `fake_mercadopago`, `fake_s3`): el manejador HTTP con la
+respuesta y el log silenciado, y el comando que lo levanta en `--puerto`.
+"""
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+class ManejadorFalso(BaseHTTPRequestHandler):
+    """Manejador HTTP/1.1 (keep-alive) que responde JSON salvo que se indique otro tipo."""
+    protocol_version = 'HTTP/1.1'
+    tipo = 'application/json'
+
+    def _responder(self, codigo, cuerpo, tipo=None, cabeceras=None, largo=None):
+        """Envía `cuerpo` (bytes, o un objeto que se serializa a JSON) con `codigo`."""
+        if not isinstance(cuerpo, bytes):
+            cuerpo = json.dumps(cuerpo).encode('utf-8')
+        self.send_response(codigo)
+        self.send_header('Content-Type', tipo or self.tipo)
+        self.send_header('Content-Length', str(len(cuerpo) if largo is None else largo))
+        for nombre, valor in (cabeceras or {}).items():
+            self.send_header(nombre, valor)
+        self.end_headers()
+        if cuerpo:
+            self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+class ComandoServidorFalso(BaseCommand):
+    """
+    Comando que sirve `manejador` en 127.0.0.1 hasta Ctrl+C. Cada servidor
+    tiene su propio `puerto` por defecto, así pueden correr a la vez.
+    """
+    manejador = None
+    nombre = ''
+    puerto = None
+    # Ruta que se agrega a la URL anunciada (la que va en la variable de entorno)
+    ruta = ''
+
+    def add_arguments(self, parser):
+        parser.add_argument("--puerto", type=int, default=self.puerto, help="Puerto de escucha.")
+
+    def handle(self, *args, **options):
+        servidor = ThreadingHTTPServer(('127.0.0.1', options["puerto"]), self.manejador)
+        self.stdout.write(f"{self.nombre} en http://127.0.0.1:{options['puerto']}{self.ruta} (Ctrl+C para salir)")
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            servidor.server_close()
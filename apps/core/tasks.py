@@ -0,0 +1,36 @@
+"""Tareas diferidas de uso general (ver `apps.core.jobs`)."""
+from django.conf import settings
+from django.core.mail import send_mail
+
+from .jobs import encolar, tarea
+
+
+@tarea('enviar_email')
+def enviar_email(asunto, mensaje, destinatarios, remitente=None, html=None):
+    send_mail(
+        asunto,
+        mensaje,
+        remitente or settings.DEFAULT_FROM_EMAIL,
+        destinatarios,
+        fail_silently=False,
+        html_message=html,
+    )
+
+
+def encolar_email(asunto, mensaje, destinatarios, remitente=None, html=None, max_intentos=5):
+    """
+    Encola un correo transaccional. Se envía cuando confirma la transacción en
+    curso, fuera del request: una demora del servidor SMTP no bloquea al worker
+    web ni mantiene abierta la transacción.
+    """
+    return encolar(
+        'enviar_email',
+        {
+            'asunto': asunto,
+            'mensaje': mensaje,
+            'destinatarios': list(destinatarios),
+            'remitente': remitente,
+            'html': html,
+        },
+        max_intentos=max_intentos,
+    )
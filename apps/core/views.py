@@ -1,5 +1,10 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
 
+from apps.orders import payments
+from . import metrics
+
 def contacto_view(request):
     """Vista para mostrar el formulario de contacto."""
     if request.method == 'POST':
@@ -23,3 +28,12 @@ def devoluciones_view(request):
 def cookies_view(request):
     """Vista de Política de Cookies."""
     return render(request, 'legal/cookies.html')
+
+
+@staff_member_required
+def metricas_view(request):
+    """
+    Percentiles de consultas, tiempos y tamaño por vista, más la latencia de
+    los proveedores de pago medida en el proceso que atiende (solo staff).
+    """
+    return JsonResponse({**metrics.resumen(), 'proveedores_pago': payments.metricas()})
@@ -3,6 +3,7 @@ from django.utils.html import format_html
 from django.urls import path
 from django.http import HttpResponse
 from django.template.loader import render_to_string
+from django.utils import timezone
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.units import inch
@@ -10,7 +11,8 @@ from reportlab.lib import colors
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet
 import io
-from .models import Pedido, DetallePedido, Pago, Carrito
+from .models import Pedido, DetallePedido, Pago, Carrito, WebhookEvent
+from . import ranking
 
 class DetallePedidoInline(admin.TabularInline):
     model = DetallePedido
@@ -19,10 +21,11 @@ class DetallePedidoInline(admin.TabularInline):
 
 @admin.register(Pedido)
 class PedidoAdmin(admin.ModelAdmin):
-    list_display = ('numero_pedido', 'usuario', 'estado', 'total', 'fecha_creacion', 'acciones')
-    list_filter = ('estado', 'creado_en')
+    # Líneas, unidades y pago son agregados de la propia fila: el changelist no hace joins extra
+    list_display = ('numero_pedido', 'usuario', 'estado', 'cantidad_lineas', 'cantidad_unidades', 'estado_pago', 'total', 'fecha_creacion', 'acciones')
+    list_filter = ('estado', 'estado_pago', 'creado_en')
     search_fields = ('numero_pedido', 'usuario__username', 'usuario__email')
-    readonly_fields = ('fecha_creacion',)
+    readonly_fields = ('fecha_creacion', 'cantidad_lineas', 'cantidad_unidades', 'estado_pago', 'pago_actualizado_en')
     inlines = [DetallePedidoInline]
     actions = ['marcar_enviado', 'marcar_entregado']
 
@@ -37,12 +40,19 @@ class PedidoAdmin(admin.ModelAdmin):
         )
     acciones.short_description = "Acciones"
 
+    def _marcar(self, queryset, estado):
+        # update() no dispara señales: los pedidos que salen de 'cancelado' vuelven al ranking.
+        # Tampoco toca auto_now, y sin actualizado_en el cambio no entra en el respaldo incremental
+        reactivados = list(queryset.filter(estado='cancelado').values_list('id', flat=True))
+        queryset.update(estado=estado, actualizado_en=timezone.now())
+        ranking.ajustar_por_estado_al_confirmar(reactivados=reactivados)
+
     def marcar_enviado(self, request, queryset):
-        queryset.update(estado='enviado')
+        self._marcar(queryset, 'enviado')
     marcar_enviado.short_description = "Marcar como Enviado"
 
     def marcar_entregado(self, request, queryset):
-        queryset.update(estado='entregado')
+        self._marcar(queryset, 'entregado')
     marcar_entregado.short_description = "Marcar como Entregado"
 
     def get_urls(self):
@@ -103,3 +113,10 @@ class PagoAdmin(admin.ModelAdmin):
     list_display = ('stripe_payment_intent_id', 'pedido', 'metodo_pago', 'monto', 'estado', 'creado_en')
     list_filter = ('metodo_pago', 'estado')
     search_fields = ('stripe_payment_intent_id', 'pedido__numero_pedido')
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ('evento_id', 'proveedor', 'tipo', 'estado', 'intentos', 'recibido_en', 'procesado_en')
+    list_filter = ('proveedor', 'estado', 'tipo')
+    search_fields = ('evento_id',)
+    readonly_fields = ('recibido_en', 'procesado_en')
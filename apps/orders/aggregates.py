@@ -0,0 +1,75 @@
+"""
+Agregados desnormalizados de `Pedido`.
+
+`cantidad_lineas`, `cantidad_unidades`, `estado_pago` y `pago_actualizado_en`
+se copian en la fila del pedido para que el changelist del admin y el
+historial de pedidos lean una sola tabla. Cada recálculo es un único `UPDATE`
+con subconsultas, dentro de la misma transacción que modificó el detalle o
+el pago (ver `apps.orders.signals`). `reconciliar` los recalcula en bloque.
+
+Los `UPDATE` no tocan los campos auto_now: los agregados se recalculan al
+restaurar un respaldo, pero las líneas se respaldan por la fecha de cambio de
+su pedido, así que `recalcular_lineas` también la actualiza.
+"""
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import DetallePedido, Pago, Pedido
+
+
+def _agregado_detalles(agregado):
+    detalles = (
+        DetallePedido.objects.filter(pedido=OuterRef('pk'))
+        .order_by()
+        .values('pedido')
+        .annotate(valor=agregado)
+        .values('valor')[:1]
+    )
+    return Coalesce(Subquery(detalles, output_field=IntegerField()), Value(0))
+
+
+def recalcular_lineas(pedido_ids, tocar=True):
+    """
+    Recalcula líneas y unidades de los pedidos indicados. Con `tocar` los
+    marca además como modificados (sus líneas cambiaron).
+    """
+    cambios = {'actualizado_en': timezone.now()} if tocar else {}
+    return Pedido.objects.filter(id__in=list(pedido_ids)).update(
+        cantidad_lineas=_agregado_detalles(Count('id')),
+        cantidad_unidades=_agregado_detalles(Sum('cantidad')),
+        **cambios,
+    )
+
+
+def recalcular_pagos(pedido_ids):
+    """Copia estado y fecha de actualización del pago de los pedidos indicados."""
+    pago = Pago.objects.filter(pedido=OuterRef('pk'))
+    return Pedido.objects.filter(id__in=list(pedido_ids)).update(
+        estado_pago=Subquery(pago.values('estado')[:1]),
+        pago_actualizado_en=Subquery(pago.values('actualizado_en')[:1]),
+    )
+
+
+def sincronizar_pago(pago):
+    """Copia el estado de `pago` a su pedido (sin subconsultas)."""
+    Pedido.objects.filter(id=pago.pedido_id).update(
+        estado_pago=pago.estado,
+        pago_actualizado_en=pago.actualizado_en,
+    )
+
+
+def reconciliar(batch_size=1000):
+    """Recalcula todos los agregados por lotes de ids. Retorna la cantidad de pedidos."""
+    total = 0
+    ultimo_id = 0
+    while True:
+        ids = list(
+            Pedido.objects.filter(id__gt=ultimo_id).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return total
+        recalcular_lineas(ids, tocar=False)
+        recalcular_pagos(ids)
+        total += len(ids)
+        ultimo_id = ids[-1]
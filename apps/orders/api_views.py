@@ -8,11 +8,14 @@ from rest_framework.permissions import IsAuthenticated
 import json
 import logging
 
-from .models import Carrito, ItemCarrito, Pedido, DetallePedido, Pago
-from .serializers import PedidoSerializer, CrearPagoSerializer
+from .models import Carrito, ItemCarrito, DetallePedido, Pago
+from .cart import CartSnapshot
+from .serializers import PedidoSerializer, PedidoResumenSerializer, CrearPagoSerializer, CheckoutSerializer
+from .history import pedidos_resumen, pedidos_detalle
+from .pagination import PedidoCursorPagination
+from .checkout import confirmar_pedido, CheckoutError, StockInsuficienteError
 from apps.catalog.models import Producto
-from .payments import StripePaymentManager
-from .payments_mp import MercadoPagoManager # Importación agregada
+from .payments import StripePaymentManager, MercadoPagoManager
 
 logger = logging.getLogger(__name__)
 
@@ -48,55 +51,15 @@ def obtener_carrito(request):
     """
     if request.user.is_authenticated:
         try:
-            carrito, _ = Carrito.objects.get_or_create(usuario=request.user)
-            items = []
-            for item in carrito.items.all():
-                items.append({
-                    'id': item.id,
-                    'producto_id': item.producto.id,
-                    'nombre': item.producto.nombre,
-                    'precio': float(item.producto.precio),
-                    'cantidad': item.cantidad,
-                    'subtotal': float(item.subtotal),
-                    'imagen': item.producto.imagen.url if item.producto.imagen else None
-                })
-            
-            return JsonResponse({
-                'exito': True,
-                'items': items,
-                'total': float(carrito.total),
-                'cantidad_items': carrito.cantidad_items,
-            })
+            # Items + productos en una sola consulta; totales desde las filas cargadas
+            return JsonResponse(CartSnapshot.de_usuario(request.user).como_dict())
         except Exception as e:
             return JsonResponse({'exito': False, 'error': str(e)})
     else:
-        # Carrito de sesión
-        carrito_sesion = obtener_carrito_sesion(request)
-        items = []
-        total = 0
-        
-        for producto_id, cantidad in carrito_sesion.items():
-            try:
-                producto = Producto.objects.get(id=int(producto_id))
-                subtotal = float(producto.precio) * cantidad
-                items.append({
-                    'producto_id': producto.id,
-                    'nombre': producto.nombre,
-                    'precio': float(producto.precio),
-                    'cantidad': cantidad,
-                    'subtotal': subtotal,
-                    'imagen': producto.imagen.url if producto.imagen else None
-                })
-                total += subtotal
-            except Producto.DoesNotExist:
-                continue
-        
-        return JsonResponse({
-            'exito': True,
-            'items': items,
-            'total': total,
-            'cantidad_items': len(items),
-        })
+        # Carrito de sesión: todos los productos en una sola consulta
+        payload = CartSnapshot.de_sesion(obtener_carrito_sesion(request)).como_dict()
+        payload['cantidad_items'] = len(payload['items'])
+        return JsonResponse(payload)
 
 def agregar_carrito(request):
     """
@@ -196,16 +159,49 @@ class PedidoViewSet(viewsets.ModelViewSet):
     """
     serializer_class = PedidoSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = PedidoCursorPagination
     
     def get_queryset(self):
-        """Los usuarios solo ven sus propios pedidos."""
-        return Pedido.objects.filter(usuario=self.request.user)
+        """Los usuarios solo ven sus propios pedidos (consultas acotadas, ver `history`)."""
+        if self.action == 'list':
+            return pedidos_resumen(self.request.user)
+        return pedidos_detalle(self.request.user)
+
+    def get_serializer_class(self):
+        """Resumen en el listado; representación completa en el detalle."""
+        if self.action == 'list':
+            return PedidoResumenSerializer
+        return PedidoSerializer
     
     def perform_create(self, serializer):
         """Asociar el pedido al usuario actual."""
         serializer.save(usuario=self.request.user)
 
-from .payments_mp import MercadoPagoManager
+    @action(detail=False, methods=['post'])
+    def checkout(self, request):
+        """
+        Convierte el carrito del usuario en un pedido (reserva de stock atómica).
+        Body: { direccion_envio, telefono, notas? }
+        """
+        serializer = CheckoutSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            pedido = confirmar_pedido(usuario=request.user, **serializer.validated_data)
+        except StockInsuficienteError as e:
+            return Response(
+                {
+                    'error': str(e),
+                    # Unidades que faltan por producto: solicitado - disponible
+                    'faltantes': {
+                        str(producto_id): solicitado - disponible
+                        for producto_id, (solicitado, disponible) in e.faltantes.items()
+                    },
+                },
+                status=status.HTTP_409_CONFLICT,
+            )
+        except CheckoutError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(PedidoSerializer(pedido).data, status=status.HTTP_201_CREATED)
 
 class CrearPagoView(viewsets.ViewSet):
     """
@@ -225,7 +221,8 @@ class CrearPagoView(viewsets.ViewSet):
             resultado = StripePaymentManager.crear_payment_intent(
                 pedido_id=serializer.validated_data['pedido_id'],
                 email=serializer.validated_data['email'],
-                nombre=serializer.validated_data['nombre']
+                nombre=serializer.validated_data['nombre'],
+                usuario=request.user,
             )
             return Response(resultado, status=status.HTTP_200_OK)
         except Exception as e:
@@ -234,34 +231,19 @@ class CrearPagoView(viewsets.ViewSet):
     @action(detail=False, methods=['post'], url_path='mercadopago')
     def crear_preferencia_mp(self, request):
         """
-        Crear preferencia de Mercado Pago.
-        Body: { items: [{title, quantity, unit_price}], back_urls: {success, ...} }
+        Crear preferencia de Mercado Pago a partir del carrito del usuario.
         """
         try:
-            # Obtener datos del carrito del usuario
-            carrito = Carrito.objects.get(usuario=request.user)
-            items = []
-            for item in carrito.items.all():
-                items.append({
-                    "title": item.producto.nombre,
-                    "quantity": item.cantidad,
-                    "unit_price": float(item.producto.precio),
-                    "currency_id": "MXN"
-                })
-            
             back_urls = {
                 "success": request.build_absolute_uri('/perfil/#pedidos'),
                 "failure": request.build_absolute_uri('/auth/carrito/'),
                 "pending": request.build_absolute_uri('/auth/carrito/')
             }
             
-            preference = MercadoPagoManager.crear_preferencia(
-                items=items,
-                usuario_email=request.user.email,
-                back_urls=back_urls
-            )
+            # Carrito en una consulta; misma preferencia mientras el carrito no cambie
+            preferencia = MercadoPagoManager.preferencia_para_carrito(request.user, back_urls)
             
-            return Response({'preference_id': preference['id'], 'init_point': preference['init_point']})
+            return Response(preferencia)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -6,3 +6,5 @@ class OrdersConfig(AppConfig):
 
     def ready(self):
         import apps.orders.signals  # Registrar señales al iniciar la app
+        from apps.orders import payments
+        payments.configurar()  # Un cliente por proveedor de pagos para todo el proceso
@@ -0,0 +1,161 @@
+"""
+Lectura del carrito en una sola consulta.
+
+`CartSnapshot` carga los items del carrito junto con sus productos
+(`select_related`) y calcula total y cantidad de unidades a partir de las
+filas ya cargadas, sin volver a consultar la base de datos.
+
+Los carritos anónimos viven en `request.session['carrito']` con el formato
+`{'producto_id': cantidad}`; sus productos se resuelven con un único
+`in_bulk` y se fusionan al carrito persistente con un upsert en bloque.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.catalog import imagenes
+from apps.catalog.models import Producto
+from .models import ItemCarrito
+
+
+def _parsear_sesion(carrito_sesion):
+    """Convierte `{'id': cantidad}` de la sesión a `{int: int}`, ignorando basura."""
+    lineas = {}
+    for producto_id, cantidad in (carrito_sesion or {}).items():
+        try:
+            producto_id, cantidad = int(producto_id), int(cantidad)
+        except (TypeError, ValueError):
+            continue
+        if cantidad > 0:
+            lineas[producto_id] = lineas.get(producto_id, 0) + cantidad
+    return lineas
+
+
+class CartLine:
+    """Línea del carrito: producto, cantidad y subtotal."""
+    __slots__ = ('id', 'producto', 'cantidad')
+
+    def __init__(self, producto, cantidad, id=None):
+        self.id = id
+        self.producto = producto
+        self.cantidad = cantidad
+
+    @property
+    def precio(self):
+        return self.producto.precio
+
+    @property
+    def subtotal(self):
+        return self.producto.precio * self.cantidad
+
+    def como_dict(self):
+        data = {
+            'producto_id': self.producto.id,
+            'nombre': self.producto.nombre,
+            'precio': float(self.precio),
+            'cantidad': self.cantidad,
+            'subtotal': float(self.subtotal),
+            'imagen': self.producto.imagen.url if self.producto.imagen else None,
+            'imagen_miniatura': imagenes.url(self.producto),
+        }
+        if self.id is not None:
+            data = {'id': self.id, **data}
+        return data
+
+
+class CartSnapshot:
+    """Foto inmutable del contenido de un carrito."""
+
+    def __init__(self, lineas):
+        self.lineas = list(lineas)
+        self.total = sum((linea.subtotal for linea in self.lineas), Decimal('0'))
+        self.cantidad_items = sum(linea.cantidad for linea in self.lineas)
+
+    @classmethod
+    def de_usuario(cls, user):
+        """Carrito persistente de `user` (items + productos en una consulta)."""
+        items = (
+            ItemCarrito.objects.filter(carrito__usuario=user)
+            .select_related('producto')
+            .order_by('id')
+        )
+        return cls(CartLine(item.producto, item.cantidad, id=item.id) for item in items)
+
+    @classmethod
+    def de_carrito(cls, carrito):
+        """Igual que `de_usuario`, partiendo de una instancia de `Carrito`."""
+        items = carrito.items.select_related('producto').order_by('id')
+        return cls(CartLine(item.producto, item.cantidad, id=item.id) for item in items)
+
+    @classmethod
+    def de_sesion(cls, carrito_sesion):
+        """Carrito anónimo de sesión: todos los productos en un solo `in_bulk`."""
+        lineas = _parsear_sesion(carrito_sesion)
+        productos = Producto.objects.in_bulk(list(lineas))
+        return cls(
+            CartLine(productos[producto_id], cantidad)
+            for producto_id, cantidad in lineas.items()
+            if producto_id in productos
+        )
+
+    @property
+    def items(self):
+        return self.lineas
+
+    def __iter__(self):
+        return iter(self.lineas)
+
+    def __len__(self):
+        return len(self.lineas)
+
+    def como_dict(self):
+        """Payload JSON usado por las APIs de carrito."""
+        return {
+            'exito': True,
+            'items': [linea.como_dict() for linea in self.lineas],
+            'total': float(self.total),
+            'cantidad_items': self.cantidad_items,
+        }
+
+
+def fusionar_carrito_sesion(carrito, carrito_sesion):
+    """
+    Suma las líneas del carrito de sesión al carrito persistente `carrito`.
+
+    Valida los productos en una consulta, lee las cantidades existentes en otra y escribe todo con un único `bulk_create(update_conflicts=True)`
+    dentro de una transacción. Retorna la cantidad de líneas fusionadas.
+    """
+    lineas = _parsear_sesion(carrito_sesion)
+    if not lineas:
+        return 0
+
+    with transaction.atomic():
+        ids_validos = Producto.objects.filter(id__in=list(lineas)).values_list('id', flat=True)
+        lineas = {producto_id: lineas[producto_id] for producto_id in ids_validos}
+        if not lineas:
+            return 0
+
+        existentes = dict(
+            ItemCarrito.objects.select_for_update()
+            .filter(carrito=carrito, producto_id__in=list(lineas))
+            .values_list('producto_id', 'cantidad')
+        )
+        ahora = timezone.now()
+        items = [
+            ItemCarrito(
+                carrito=carrito,
+                producto_id=producto_id,
+                cantidad=existentes.get(producto_id, 0) + cantidad,
+                creado_en=ahora,
+                actualizado_en=ahora,
+            )
+            for producto_id, cantidad in lineas.items()
+        ]
+        ItemCarrito.objects.bulk_create(
+            items,
+            update_conflicts=True,
+            unique_fields=['carrito', 'producto'],
+            update_fields=['cantidad', 'actualizado_en'],
+        )
+    return len(items)
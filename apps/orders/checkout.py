@@ -0,0 +1,142 @@
+"""
+Checkout: convierte el `Carrito` de un usuario en un `Pedido`.
+
+Todo ocurre en una sola transacción:
+
+1. Se bloquea la fila del carrito (evita dos checkouts simultáneos del mismo carrito).
+2. Se bloquean las filas de `Producto` involucradas en orden ascendente de id
+   (`select_for_update`). El orden determinista evita interbloqueos entre
+   checkouts concurrentes que comparten SKUs.
+3. Se valida el stock y se descuenta con un único `UPDATE` usando `F()`.
+4. Se crea el `Pedido` y sus `DetallePedido` con `bulk_create`, congelando el
+   precio unitario (`precio_oferta` si existe, si no `precio`).
+5. Se vacía el carrito.
+
+Tras confirmar la transacción se suman las unidades al ranking de más vendidos.
+"""
+import uuid
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from apps.catalog.models import Producto
+from .models import Carrito, ItemCarrito, Pedido, DetallePedido
+from .ranking import registrar_ventas_al_confirmar
+
+
+class CheckoutError(Exception):
+    """Error de negocio al confirmar un pedido."""
+
+
+class CarritoVacioError(CheckoutError):
+    pass
+
+
+class StockInsuficienteError(CheckoutError):
+    """Uno o más productos no tienen stock suficiente."""
+
+    def __init__(self, faltantes):
+        # faltantes: {producto_id: (solicitado, disponible)}
+        self.faltantes = faltantes
+        detalle = ', '.join(
+            f'{producto_id} (solicitado {solicitado}, disponible {disponible})'
+            for producto_id, (solicitado, disponible) in faltantes.items()
+        )
+        super().__init__(f'Stock insuficiente para los productos: {detalle}')
+
+
+def generar_numero_pedido():
+    return f"PED-{timezone.now():%Y%m%d}-{uuid.uuid4().hex[:10].upper()}"
+
+
+def precio_vigente(producto):
+    """Precio que se cobra: la oferta si está presente, si no el precio normal."""
+    return producto.precio_oferta if producto.precio_oferta else producto.precio
+
+
+def confirmar_pedido(usuario, direccion_envio, telefono, notas=None):
+    """
+    Crea un `Pedido` a partir del carrito persistente de `usuario`.
+
+    Returns:
+        Pedido: el pedido creado, con sus detalles ya guardados.
+
+    Raises:
+        CarritoVacioError: si el carrito no existe o no tiene items.
+        StockInsuficienteError: si algún producto no alcanza; no se modifica nada.
+    """
+    with transaction.atomic():
+        carrito = Carrito.objects.select_for_update().filter(usuario=usuario).first()
+        if carrito is None:
+            raise CarritoVacioError('El carrito está vacío.')
+
+        cantidades = {}
+        for producto_id, cantidad in ItemCarrito.objects.filter(carrito=carrito).values_list('producto_id', 'cantidad'):
+            if cantidad > 0:
+                cantidades[producto_id] = cantidades.get(producto_id, 0) + cantidad
+        if not cantidades:
+            raise CarritoVacioError('El carrito está vacío.')
+
+        # Bloqueo en orden determinista (id ascendente)
+        productos = list(
+            Producto.objects.select_for_update()
+            .filter(id__in=sorted(cantidades), activo=True)
+            .order_by('id')
+        )
+        por_id = {producto.id: producto for producto in productos}
+
+        faltantes = {}
+        for producto_id, cantidad in cantidades.items():
+            producto = por_id.get(producto_id)
+            disponible = producto.stock if producto else 0
+            if disponible < cantidad:
+                faltantes[producto_id] = (cantidad, disponible)
+        if faltantes:
+            raise StockInsuficienteError(faltantes)
+
+        # Descuento de stock en una sola sentencia
+        Producto.objects.filter(id__in=list(cantidades)).update(
+            stock=Case(
+                *[When(id=producto_id, then=F('stock') - Value(cantidad)) for producto_id, cantidad in cantidades.items()],
+                default=F('stock'),
+                output_field=IntegerField(),
+            ),
+            actualizado_en=timezone.now(),
+        )
+
+        detalles = []
+        total = Decimal('0')
+        for producto in productos:
+            cantidad = cantidades[producto.id]
+            precio_unitario = precio_vigente(producto)
+            subtotal = precio_unitario * cantidad
+            total += subtotal
+            detalles.append(DetallePedido(
+                producto=producto,
+                cantidad=cantidad,
+                precio_unitario=precio_unitario,
+                subtotal=subtotal,
+            ))
+
+        pedido = Pedido.objects.create(
+            usuario=usuario,
+            numero_pedido=generar_numero_pedido(),
+            total=total,
+            direccion_envio=direccion_envio,
+            telefono=telefono,
+            notas=notas,
+            # bulk_create no dispara señales: los agregados se cargan aquí
+            cantidad_lineas=len(detalles),
+            cantidad_unidades=sum(detalle.cantidad for detalle in detalles),
+        )
+        for detalle in detalles:
+            detalle.pedido = pedido
+        DetallePedido.objects.bulk_create(detalles)
+        # bulk_create no dispara post_save: el ranking se actualiza al confirmar
+        registrar_ventas_al_confirmar((detalle.producto_id, detalle.cantidad) for detalle in detalles)
+
+        ItemCarrito.objects.filter(carrito=carrito).delete()
+
+    return pedido
@@ -0,0 +1,32 @@
+"""
+Historial de pedidos con una cantidad de consultas fija.
+
+El listado usa la representación resumida, que solo lee la tabla de pedidos:
+líneas, unidades y estado del pago son agregados desnormalizados en `Pedido`
+(ver `apps.orders.aggregates`).
+El detalle trae las líneas con su producto, marca y categoría en una consulta
+y las categorías secundarias en otra, sin importar cuántos pedidos o líneas haya.
+"""
+from django.db.models import Prefetch
+
+from .models import DetallePedido, Pedido
+
+
+def pedidos_resumen(usuario):
+    """Pedidos de `usuario` para el listado (una sola tabla)."""
+    return Pedido.objects.filter(usuario=usuario)
+
+
+def pedidos_detalle(usuario):
+    """Pedidos de `usuario` con todo lo que anidan los serializers de detalle."""
+    detalles = DetallePedido.objects.select_related(
+        'producto__marca', 'producto__categoria'
+    ).order_by('id')
+    return (
+        Pedido.objects.filter(usuario=usuario)
+        .select_related('usuario', 'pago')
+        .prefetch_related(
+            Prefetch('detalles', queryset=detalles),
+            'detalles__producto__categorias_secundarias',
+        )
+    )
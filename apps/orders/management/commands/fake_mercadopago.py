@@ -0,0 +1,53 @@
+import json
+import re
+import uuid
+
+from apps.core.servidor_falso import ComandoServidorFalso, ManejadorFalso
+
+
+class MercadoPagoFalso(ManejadorFalso):
+    """
+    Imita los endpoints de Mercado Pago que usa la tienda:
+    POST /checkout/preferences (crea una preferencia) y GET /v1/payments/<id>
+    (pago aprobado, o rechazado si el id termina en 'rechazado').
+    `preferencias` cuenta las preferencias creadas.
+    """
+    preferencias = 0
+
+    def do_POST(self):
+        if not self.path.startswith('/checkout/preferences'):
+            return self._responder(404, {'message': 'not_found'})
+        cuerpo = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+        if not cuerpo.get('items'):
+            return self._responder(400, {'message': 'items requeridos'})
+        if cuerpo.get('auto_return') and not (cuerpo.get('back_urls') or {}).get('success'):
+            return self._responder(400, {'message': 'auto_return invalid. back_url.success must be defined'})
+        MercadoPagoFalso.preferencias += 1
+        preferencia_id = f'pref-{uuid.uuid4().hex[:12]}'
+        self._responder(201, {
+            'id': preferencia_id,
+            'items': cuerpo['items'],
+            'init_point': f'http://{self.headers.get("Host")}/checkout?pref_id={preferencia_id}',
+        })
+
+    def do_GET(self):
+        coincidencia = re.match(r'^/v1/payments/([^/?]+)', self.path)
+        if not coincidencia:
+            return self._responder(404, {'message': 'not_found'})
+        pago_id = coincidencia.group(1)
+        self._responder(200, {
+            'id': pago_id,
+            'status': 'rejected' if pago_id.endswith('rechazado') else 'approved',
+            'transaction_amount': 100.0,
+            'currency_id': 'MXN',
+        })
+
+
+class Command(ComandoServidorFalso):
+    help = (
+        "Levanta un servidor local que imita la API de Mercado Pago (preferencias y pagos) "
+        "para pruebas sin red: MERCADOPAGO_API_BASE=http://127.0.0.1:<puerto>."
+    )
+    manejador = MercadoPagoFalso
+    nombre = 'Mercado Pago falso'
+    puerto = 8766
@@ -0,0 +1,120 @@
+"""
+Prueba de carga del checkout: N usuarios confirman pedidos en paralelo contra
+el mismo SKU con stock limitado y se verifica que no haya sobreventa ni
+interbloqueos. Pensada para correr contra PostgreSQL (en SQLite los bloqueos
+de fila no existen y las escrituras se serializan a nivel de archivo).
+"""
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, OperationalError
+
+from apps.catalog.models import Producto
+from apps.orders.checkout import confirmar_pedido, StockInsuficienteError
+from apps.orders.models import Carrito, ItemCarrito
+
+
+class Command(BaseCommand):
+    help = "Prueba de carga del checkout concurrente contra un mismo SKU (verifica que no haya sobreventa)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--usuarios", type=int, default=200, help="Checkouts concurrentes.")
+        parser.add_argument("--hilos", type=int, default=32, help="Hilos de trabajo.")
+        parser.add_argument("--stock", type=int, default=50, help="Stock inicial del SKU disputado.")
+        parser.add_argument("--cantidad", type=int, default=1, help="Unidades por pedido.")
+        parser.add_argument("--keep", action="store_true", help="No borrar los datos sintéticos al terminar.")
+        parser.add_argument("--force", action="store_true", help="Permite correr con DEBUG=False.")
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options["force"]:
+            raise CommandError("Esta prueba crea y borra datos; usa --force para correrla con DEBUG=False.")
+
+        etiqueta = f"loadtest-{uuid.uuid4().hex[:8]}"
+        cantidad = options["cantidad"]
+        stock_inicial = options["stock"]
+
+        # Dos SKUs: el disputado y uno secundario que cada carrito agrega en orden
+        # distinto, para ejercitar el bloqueo en orden determinista.
+        disputado = Producto.objects.create(sku=f"{etiqueta}-A", nombre=f"{etiqueta} A", precio=Decimal("100.00"), precio_oferta=Decimal("80.00"), stock=stock_inicial)
+        secundario = Producto.objects.create(sku=f"{etiqueta}-B", nombre=f"{etiqueta} B", precio=Decimal("10.00"), stock=options["usuarios"] * cantidad)
+
+        usuarios = []
+        for i in range(options["usuarios"]):
+            usuario = User.objects.create_user(username=f"{etiqueta}-{i}", password=None)
+            carrito = Carrito.objects.create(usuario=usuario)
+            orden = (secundario, disputado) if i % 2 else (disputado, secundario)
+            for producto in orden:
+                ItemCarrito.objects.create(carrito=carrito, producto=producto, cantidad=cantidad)
+            usuarios.append(usuario)
+
+        resultados = {"ok": 0, "sin_stock": 0, "errores": []}
+        lock = threading.Lock()
+        pendientes = list(usuarios)
+        barrera = threading.Barrier(options["hilos"])
+        latencias = []
+
+        def trabajador():
+            try:
+                barrera.wait()
+                while True:
+                    with lock:
+                        if not pendientes:
+                            return
+                        usuario = pendientes.pop()
+                    inicio = time.perf_counter()
+                    try:
+                        confirmar_pedido(usuario, direccion_envio="Calle 1", telefono="5555555555")
+                        clave = "ok"
+                    except StockInsuficienteError:
+                        clave = "sin_stock"
+                    except OperationalError as e:
+                        clave = None
+                        with lock:
+                            resultados["errores"].append(str(e))
+                    with lock:
+                        latencias.append(time.perf_counter() - inicio)
+                        if clave:
+                            resultados[clave] += 1
+            finally:
+                connections.close_all()
+
+        hilos = [threading.Thread(target=trabajador) for _ in range(options["hilos"])]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        duracion = time.perf_counter() - inicio
+
+        disputado.refresh_from_db()
+        vendidos = resultados["ok"] * cantidad
+        esperados = min(options["usuarios"], stock_inicial // cantidad)
+        latencias.sort()
+        p95 = latencias[int(len(latencias) * 0.95) - 1] if latencias else 0
+
+        self.stdout.write(f"Checkouts: {options['usuarios']} en {duracion:.2f}s ({options['hilos']} hilos), p95 {p95 * 1000:.1f} ms")
+        self.stdout.write(f"Confirmados: {resultados['ok']} | Sin stock: {resultados['sin_stock']} | Errores: {len(resultados['errores'])}")
+        self.stdout.write(f"Stock final del SKU disputado: {disputado.stock} (inicial {stock_inicial})")
+
+        fallas = []
+        if disputado.stock < 0:
+            fallas.append("stock negativo (sobreventa)")
+        if disputado.stock != stock_inicial - vendidos:
+            fallas.append("el stock no coincide con los pedidos confirmados")
+        if resultados["ok"] != esperados:
+            fallas.append(f"se esperaban {esperados} pedidos confirmados")
+        if resultados["errores"]:
+            fallas.append(f"errores de base de datos (p. ej. interbloqueos): {resultados['errores'][0]}")
+
+        if not options["keep"]:
+            User.objects.filter(username__startswith=etiqueta).delete()
+            Producto.objects.filter(sku__startswith=etiqueta).delete()
+
+        if fallas:
+            raise CommandError("; ".join(fallas))
+        self.stdout.write(self.style.SUCCESS("Sin sobreventa ni interbloqueos."))
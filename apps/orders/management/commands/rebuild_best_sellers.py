@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from apps.orders.ranking import reconstruir
+
+
+class Command(BaseCommand):
+    help = "Recalcula el ranking de productos más vendidos (ventanas de 7, 30 y 90 días)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--desde-pedidos",
+            action="store_true",
+            help="Recalcula también las ventas diarias a partir de todos los detalles de pedido.",
+        )
+
+    def handle(self, *args, **options):
+        total = reconstruir(desde_pedidos=options["desde_pedidos"])
+        self.stdout.write(self.style.SUCCESS(f"Ranking de más vendidos recalculado: {total} filas."))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from apps.orders.aggregates import reconciliar
+
+
+class Command(BaseCommand):
+    help = "Recalcula en bloque los agregados desnormalizados de los pedidos (líneas, unidades y pago)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Cantidad de pedidos actualizados por sentencia.",
+        )
+
+    def handle(self, *args, **options):
+        total = reconciliar(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Agregados recalculados para {total} pedidos."))
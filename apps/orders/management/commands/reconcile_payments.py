@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from apps.orders.reconciliation import reconciliar_stripe
+
+
+class Command(BaseCommand):
+    help = (
+        "Actualiza los pagos pendientes con el estado de sus PaymentIntents de Stripe, "
+        "listándolos en lote (la tarea 'reconciliar_pagos' lo hace periódicamente)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dias", type=int, default=None, help="Antigüedad máxima de los pagos a reconciliar.")
+
+    def handle(self, *args, **options):
+        totales = reconciliar_stripe(dias=options["dias"])
+        resumen = ', '.join(f'{clave}={valor}' for clave, valor in totales.items())
+        self.stdout.write(self.style.SUCCESS(f"Pagos reconciliados: {resumen}"))
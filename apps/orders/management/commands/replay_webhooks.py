@@ -0,0 +1,51 @@
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.orders import webhooks
+from apps.orders.models import WebhookEvent
+
+
+class Command(BaseCommand):
+    help = (
+        "Reprocesa en bloque eventos de webhook guardados (por defecto los 'fallido' y "
+        "'sin_pago'). Los manejadores son idempotentes: reaplicar un evento no duplica escrituras."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--estado", nargs="*", default=['fallido', 'sin_pago'],
+                            help="Estados a reprocesar (p. ej. recibido procesado).")
+        parser.add_argument("--todos", action="store_true", help="Reprocesa los eventos en cualquier estado.")
+        parser.add_argument("--tipo", default=None, help="Solo eventos de este tipo (payment_intent.succeeded, ...).")
+        parser.add_argument("--desde", default=None, help="Solo eventos recibidos desde esta fecha (AAAA-MM-DD).")
+        parser.add_argument("--ids", nargs="*", default=None, help="Ids de evento del proveedor (evt_...).")
+        parser.add_argument("--lote", type=int, default=webhooks.LOTE, help="Eventos procesados por lote.")
+
+    def handle(self, *args, **options):
+        eventos = WebhookEvent.objects.all()
+        if not options["todos"]:
+            eventos = eventos.filter(estado__in=options["estado"])
+        if options["tipo"]:
+            eventos = eventos.filter(tipo=options["tipo"])
+        if options["ids"]:
+            eventos = eventos.filter(evento_id__in=options["ids"])
+        if options["desde"]:
+            try:
+                fecha = datetime.strptime(options["desde"], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("--desde debe tener formato AAAA-MM-DD")
+            eventos = eventos.filter(recibido_en__gte=timezone.make_aware(datetime.combine(fecha, time.min)))
+
+        totales = {}
+        ultimo_id = 0
+        while True:
+            lote = list(eventos.filter(id__gt=ultimo_id).order_by('id')[:options["lote"]])
+            if not lote:
+                break
+            for estado, cantidad in webhooks.procesar_lote(lote).items():
+                totales[estado] = totales.get(estado, 0) + cantidad
+            ultimo_id = lote[-1].id
+
+        resumen = ', '.join(f'{estado}={cantidad}' for estado, cantidad in totales.items() if cantidad) or 'sin eventos'
+        self.stdout.write(self.style.SUCCESS(f"Eventos reprocesados: {resumen}"))
@@ -0,0 +1,48 @@
+# Generated by Django 6.0.2 on 2026-10-18 19:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0002_productobusqueda'),
+        ('orders', '0002_alter_pago_options_rename_fecha_pago_pago_creado_en_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RankingVentas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ventana', models.PositiveSmallIntegerField()),
+                ('alcance', models.CharField(max_length=40)),
+                ('unidades', models.PositiveIntegerField(default=0)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rankings_ventas', to='catalog.producto')),
+            ],
+            options={
+                'verbose_name': 'Ranking de ventas',
+                'verbose_name_plural': 'Rankings de ventas',
+                'db_table': 'ranking_ventas',
+                'indexes': [models.Index(fields=['ventana', 'alcance', '-unidades'], name='ranking_ventas_top_idx')],
+                'constraints': [models.UniqueConstraint(fields=('ventana', 'alcance', 'producto'), name='ranking_ventas_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VentaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('unidades', models.PositiveIntegerField(default=0)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ventas_diarias', to='catalog.producto')),
+            ],
+            options={
+                'verbose_name': 'Venta diaria',
+                'verbose_name_plural': 'Ventas diarias',
+                'db_table': 'ventas_diarias',
+                'indexes': [models.Index(fields=['fecha'], name='venta_diaria_fecha_idx')],
+                'constraints': [models.UniqueConstraint(fields=('producto', 'fecha'), name='venta_diaria_producto_fecha_uniq')],
+            },
+        ),
+    ]
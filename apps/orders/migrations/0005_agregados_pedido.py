@@ -0,0 +1,57 @@
+# Generated by Django 6.0.2 on 2026-10-18 20:40
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def poblar_agregados(apps, schema_editor):
+    Pedido = apps.get_model('orders', 'Pedido')
+    DetallePedido = apps.get_model('orders', 'DetallePedido')
+    Pago = apps.get_model('orders', 'Pago')
+
+    def agregado(expresion):
+        detalles = (
+            DetallePedido.objects.filter(pedido=OuterRef('pk')).order_by()
+            .values('pedido').annotate(valor=expresion).values('valor')[:1]
+        )
+        return Coalesce(Subquery(detalles, output_field=IntegerField()), Value(0))
+
+    pago = Pago.objects.filter(pedido=OuterRef('pk'))
+    Pedido.objects.update(
+        cantidad_lineas=agregado(Count('id')),
+        cantidad_unidades=agregado(Sum('cantidad')),
+        estado_pago=Subquery(pago.values('estado')[:1]),
+        pago_actualizado_en=Subquery(pago.values('actualizado_en')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_indices_pedidos_pagos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedido',
+            name='cantidad_lineas',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='cantidad_unidades',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='estado_pago',
+            field=models.CharField(blank=True, help_text='Estado del pago asociado (copia de Pago.estado).', max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='pago_actualizado_en',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(poblar_agregados, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 6.0.2 on 2026-10-18 20:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_agregados_pedido'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('proveedor', models.CharField(default='stripe', max_length=20)),
+                ('evento_id', models.CharField(max_length=255)),
+                ('tipo', models.CharField(max_length=100)),
+                ('payload', models.JSONField()),
+                ('estado', models.CharField(choices=[('recibido', 'Recibido'), ('procesado', 'Procesado'), ('ignorado', 'Ignorado'), ('sin_pago', 'Sin pago asociado'), ('fallido', 'Fallido')], default='recibido', max_length=20)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('creado_proveedor', models.DateTimeField(blank=True, null=True)),
+                ('recibido_en', models.DateTimeField(auto_now_add=True)),
+                ('procesado_en', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Evento de webhook',
+                'verbose_name_plural': 'Eventos de webhook',
+                'db_table': 'webhook_events',
+                'ordering': ['-recibido_en'],
+                'indexes': [models.Index(fields=['estado', 'recibido_en'], name='webhook_estado_recibido_idx')],
+                'constraints': [models.UniqueConstraint(fields=('proveedor', 'evento_id'), name='webhook_evento_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-18 20:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_webhook_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pago',
+            name='estado_proveedor',
+            field=models.CharField(blank=True, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='pago',
+            name='verificado_en',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
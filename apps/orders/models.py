@@ -1,4 +1,7 @@
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import F, Sum
 from django.contrib.auth.models import User
 from apps.catalog.models import Producto
 from django.utils.text import slugify
@@ -28,6 +31,12 @@ class Pedido(models.Model):
     direccion_envio = models.TextField()
     telefono = models.CharField(max_length=20)
     notas = models.TextField(blank=True, null=True)
+    # Agregados desnormalizados: los mantienen las señales de `apps.orders.aggregates`
+    # y se recalculan con `python manage.py reconcile_order_aggregates`
+    cantidad_lineas = models.PositiveIntegerField(default=0)
+    cantidad_unidades = models.PositiveIntegerField(default=0)
+    estado_pago = models.CharField(max_length=20, blank=True, null=True, help_text='Estado del pago asociado (copia de Pago.estado).')
+    pago_actualizado_en = models.DateTimeField(blank=True, null=True)
     creado_en = models.DateTimeField(auto_now_add=True)
     actualizado_en = models.DateTimeField(auto_now=True)
     
@@ -36,6 +45,12 @@ class Pedido(models.Model):
         verbose_name = 'Pedido'
         verbose_name_plural = 'Pedidos'
         ordering = ['-creado_en']
+        indexes = [
+            # Historial de pedidos de un usuario
+            models.Index(fields=['usuario', '-creado_en'], name='pedido_usuario_creado_idx'),
+            # Filtro por estado del admin con su orden por defecto
+            models.Index(fields=['estado', '-creado_en'], name='pedido_estado_creado_idx'),
+        ]
     
     def __str__(self):
         return f"Pedido {self.numero_pedido}"
@@ -77,13 +92,23 @@ class Carrito(models.Model):
     
     @property
     def total(self):
-        """Calcula el total del carrito."""
-        return sum(item.subtotal for item in self.items.all())
+        """Calcula el total del carrito (un solo agregado en la BD)."""
+        return self._totales()['total']
     
     @property
     def cantidad_items(self):
-        """Cantidad total de items en el carrito."""
-        return sum(item.cantidad for item in self.items.all())
+        """Cantidad total de items en el carrito (un solo agregado en la BD)."""
+        return self._totales()['cantidad_items']
+
+    def _totales(self):
+        totales = self.items.aggregate(
+            total=Sum(F('producto__precio') * F('cantidad'), output_field=models.DecimalField(max_digits=12, decimal_places=2)),
+            cantidad_items=Sum('cantidad'),
+        )
+        return {
+            'total': totales['total'] or Decimal('0'),
+            'cantidad_items': totales['cantidad_items'] or 0,
+        }
 
 
 class ItemCarrito(models.Model):
@@ -128,6 +153,10 @@ class Pago(models.Model, ImageUploadMixin):
     metodo_pago = models.CharField(max_length=50, null=True, blank=True)
     id_transaccion = models.CharField(max_length=255, unique=True, null=True, blank=True)
     razon_fallo = models.TextField(blank=True, null=True)
+    # Último estado visto en el proveedor y cuándo se confirmó (webhook,
+    # reconciliación o consulta directa); ver `apps.orders.reconciliation`
+    estado_proveedor = models.CharField(max_length=40, blank=True)
+    verificado_en = models.DateTimeField(null=True, blank=True)
     creado_en = models.DateTimeField(auto_now_add=True)
     actualizado_en = models.DateTimeField(auto_now=True)
 
@@ -136,6 +165,98 @@ class Pago(models.Model, ImageUploadMixin):
         verbose_name = 'Pago'
         verbose_name_plural = 'Pagos'
         ordering = ['-creado_en']
+        indexes = [
+            models.Index(fields=['estado', '-creado_en'], name='pago_estado_creado_idx'),
+        ]
 
     def __str__(self):
         return f"Pago {self.stripe_payment_intent_id} - {self.estado}"
+
+
+class VentaDiaria(models.Model):
+    """Unidades vendidas por producto y día (base para los rankings por ventana)."""
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='ventas_diarias')
+    fecha = models.DateField()
+    unidades = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'ventas_diarias'
+        verbose_name = 'Venta diaria'
+        verbose_name_plural = 'Ventas diarias'
+        constraints = [
+            models.UniqueConstraint(fields=['producto', 'fecha'], name='venta_diaria_producto_fecha_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['fecha'], name='venta_diaria_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.producto_id} {self.fecha}: {self.unidades}"
+
+
+class RankingVentas(models.Model):
+    """
+    Ranking materializado de más vendidos. `alcance` es 'global',
+    'genero:<genero>' o 'categoria:<id>'; `ventana` es la cantidad de días.
+    Se incrementa con cada venta y se recalcula con `rebuild_best_sellers`.
+    """
+    ventana = models.PositiveSmallIntegerField()
+    alcance = models.CharField(max_length=40)
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='rankings_ventas')
+    unidades = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'ranking_ventas'
+        verbose_name = 'Ranking de ventas'
+        verbose_name_plural = 'Rankings de ventas'
+        constraints = [
+            models.UniqueConstraint(fields=['ventana', 'alcance', 'producto'], name='ranking_ventas_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['ventana', 'alcance', '-unidades'], name='ranking_ventas_top_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.alcance} {self.ventana}d - {self.producto_id}: {self.unidades}"
+
+
+class WebhookEvent(models.Model):
+    """
+    Evento de webhook recibido de un proveedor de pagos. La clave
+    (proveedor, evento_id) hace idempotente la recepción: los reintentos del
+    proveedor no vuelven a procesarse. Ver `apps.orders.webhooks`.
+    """
+    ESTADO_CHOICES = [
+        ('recibido', 'Recibido'),
+        ('procesado', 'Procesado'),
+        ('ignorado', 'Ignorado'),
+        ('sin_pago', 'Sin pago asociado'),
+        ('fallido', 'Fallido'),
+    ]
+
+    proveedor = models.CharField(max_length=20, default='stripe')
+    evento_id = models.CharField(max_length=255)
+    tipo = models.CharField(max_length=100)
+    payload = models.JSONField()
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='recibido')
+    intentos = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    # Fecha del evento según el proveedor: fija el orden de aplicación
+    creado_proveedor = models.DateTimeField(null=True, blank=True)
+    recibido_en = models.DateTimeField(auto_now_add=True)
+    procesado_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'webhook_events'
+        verbose_name = 'Evento de webhook'
+        verbose_name_plural = 'Eventos de webhook'
+        ordering = ['-recibido_en']
+        constraints = [
+            models.UniqueConstraint(fields=['proveedor', 'evento_id'], name='webhook_evento_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['estado', 'recibido_en'], name='webhook_estado_recibido_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.proveedor} {self.evento_id} ({self.tipo}) - {self.estado}"
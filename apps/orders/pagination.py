@@ -0,0 +1,9 @@
+from rest_framework.pagination import CursorPagination
+
+
+class PedidoCursorPagination(CursorPagination):
+    """Historial de pedidos por cursor, del más reciente al más antiguo."""
+    ordering = ('-creado_en', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -1,8 +1,11 @@
 """
-Módulo de Pagos con Stripe para Django.
+Motor de pagos: interfaz común de proveedores con adaptadores para Stripe y
+Mercado Pago.
 
-Este módulo maneja la integración con Stripe para procesar pagos.
-Incluye funciones para crear PaymentIntents y validar webhooks.
+Cada proveedor crea su cliente una sola vez al iniciar la app (`configurar`,
+llamado desde `OrdersConfig.ready`) y todas sus llamadas remotas pasan por
+`medir`, que acumula latencia y errores por proveedor y operación
+(`metricas()`). Los webhooks de Stripe se procesan en `apps.orders.webhooks`.
 
 INSTRUCCIONES DE CONFIGURACIÓN INICIAL:
 =====================================
@@ -36,33 +39,352 @@ INSTRUCCIONES DE CONFIGURACIÓN INICIAL:
    - Ejecuta: stripe listen --forward-to localhost:8000/api/pago/webhook/
    - Copiar el signing secret a .env
 """
+import hashlib
+import json
+import logging
+import statistics
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager
 
+import mercadopago
 import stripe
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ImproperlyConfigured
-from django.utils import timezone
+from mercadopago.http import HttpClient
+
+from apps.core.http import sesion
+from apps.core.jobs import encolar
+from .cart import CartSnapshot
+from .checkout import precio_vigente
 from .models import Pago, Pedido
-import logging
 
 # Configurar logging para pagos
 logger = logging.getLogger(__name__)
 
-def _configurar_stripe():
-    """Configura la API key de Stripe solo cuando sea necesario."""
-    key = getattr(settings, 'STRIPE_SECRET_KEY', None)
-    if not key:
-        logger.warning("STRIPE_SECRET_KEY no configurada. Las operaciones de pago fallarán.")
-        raise ImproperlyConfigured(
-            "STRIPE_SECRET_KEY no configurada. Configura la variable de entorno en Render."
-        )
-    stripe.api_key = key
-    return True
+# Llamadas más lentas que esto (ms) se registran como advertencia
+UMBRAL_LENTO_MS = 2000
+MUESTRAS = 500
+
+
+# ============================================================
+# MÉTRICAS DE LLAMADAS A PROVEEDORES
+# ============================================================
+
+_metricas = {}
+_lock_metricas = threading.Lock()
+
+
+@contextmanager
+def medir(proveedor, operacion):
+    """Mide una llamada remota y la acumula en las métricas del proceso."""
+    inicio = time.perf_counter()
+    error = False
+    try:
+        yield
+    except Exception:
+        error = True
+        raise
+    finally:
+        ms = (time.perf_counter() - inicio) * 1000
+        with _lock_metricas:
+            datos = _metricas.setdefault((proveedor, operacion), {
+                'llamadas': 0, 'errores': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                'recientes': deque(maxlen=MUESTRAS),
+            })
+            datos['llamadas'] += 1
+            datos['errores'] += error
+            datos['total_ms'] += ms
+            datos['max_ms'] = max(datos['max_ms'], ms)
+            datos['recientes'].append(ms)
+        nivel = logging.WARNING if ms > UMBRAL_LENTO_MS else logging.DEBUG
+        logger.log(nivel, f"{proveedor}.{operacion}: {ms:.0f} ms{' (error)' if error else ''}")
+
+
+def metricas():
+    """Resumen por 'proveedor.operacion': llamadas, errores, promedio, p50, p95 y máximo en ms."""
+    resumen = {}
+    with _lock_metricas:
+        for (proveedor, operacion), datos in _metricas.items():
+            recientes = sorted(datos['recientes'])
+            resumen[f'{proveedor}.{operacion}'] = {
+                'llamadas': datos['llamadas'],
+                'errores': datos['errores'],
+                'promedio_ms': round(datos['total_ms'] / datos['llamadas'], 2),
+                'p50_ms': round(statistics.median(recientes), 2),
+                'p95_ms': round(recientes[max(int(len(recientes) * 0.95) - 1, 0)], 2),
+                'max_ms': round(datos['max_ms'], 2),
+            }
+    return resumen
+
+
+# ============================================================
+# INTERFAZ DE PROVEEDORES
+# ============================================================
+
+class ProveedorPago(ABC):
+    """Interfaz de un proveedor de pagos (un adaptador incompleto no se puede instanciar)."""
+    nombre = None
+
+    @abstractmethod
+    def configurado(self):
+        """Si hay credenciales para llamar al proveedor."""
+
+    @abstractmethod
+    def crear_pago(self, pedido, email, nombre, **opciones):
+        """Inicia el cobro de `pedido`. Retorna un dict para el front-end."""
+
+    @abstractmethod
+    def consultar_pago(self, referencia):
+        """Estado remoto del pago `referencia` (id del proveedor)."""
+
+    def requerir(self):
+        if not self.configurado():
+            raise ImproperlyConfigured(f"El proveedor de pagos '{self.nombre}' no está configurado.")
+
+
+class StripeProveedor(ProveedorPago):
+    nombre = 'stripe'
+
+    def __init__(self, api_key, base_api=None, max_reintentos=2):
+        self.client = None
+        if api_key:
+            # `base_api` apunta el cliente a un servidor sustituto (pruebas locales)
+            self.client = stripe.StripeClient(
+                api_key,
+                max_network_retries=max_reintentos,
+                base_addresses={'api': base_api} if base_api else None,
+            )
+
+    def configurado(self):
+        return self.client is not None
+
+    def crear_pago(self, pedido, email, nombre, **opciones):
+        self.requerir()
+        # Convertir el monto a centavos (Stripe usa centavos)
+        monto_centavos = int(pedido.total * 100)
+        with medir(self.nombre, 'crear_payment_intent'):
+            payment_intent = self.client.v1.payment_intents.create(params={
+                'amount': monto_centavos,
+                'currency': 'usd',
+                'metadata': {
+                    'pedido_id': str(pedido.id),
+                    'numero_pedido': pedido.numero_pedido,
+                    'usuario_id': str(pedido.usuario_id),
+                },
+                'receipt_email': email,
+                'statement_descriptor': f"Pedido {pedido.numero_pedido}",
+            })
+
+        # Crear o actualizar registro de pago (el pedido se cargó con su pago)
+        pago = getattr(pedido, 'pago', None)
+        if pago is None:
+            Pago.objects.create(
+                pedido=pedido,
+                stripe_payment_intent_id=payment_intent.id,
+                monto=pedido.total,
+                estado='procesando',
+            )
+        else:
+            pago.stripe_payment_intent_id = payment_intent.id
+            pago.monto = pedido.total
+            pago.estado = 'procesando'
+            pago.save(update_fields=['stripe_payment_intent_id', 'monto', 'estado', 'actualizado_en'])
+
+        # La reconciliación periódica confirma el estado aunque no llegue el webhook
+        encolar('reconciliar_pagos', demora=getattr(settings, 'PAGOS_RECONCILIACION_INTERVALO', 60), unico=True)
+
+        logger.info(f"PaymentIntent creado: {payment_intent.id} para pedido {pedido.id}")
+        return {
+            'client_secret': payment_intent.client_secret,
+            'payment_intent_id': payment_intent.id,
+            'monto': float(pedido.total),
+            'numero_pedido': pedido.numero_pedido,
+        }
+
+    def obtener_payment_intent(self, referencia):
+        self.requerir()
+        with medir(self.nombre, 'consultar_payment_intent'):
+            return self.client.v1.payment_intents.retrieve(referencia)
+
+    def listar_payment_intents(self, desde, por_pagina=100):
+        """Itera los PaymentIntents creados desde `desde` (datetime), del más nuevo al más viejo."""
+        self.requerir()
+        params = {'created': {'gte': int(desde.timestamp())}, 'limit': por_pagina}
+        while True:
+            with medir(self.nombre, 'listar_payment_intents'):
+                pagina = self.client.v1.payment_intents.list(params=params)
+            yield from pagina.data
+            if not pagina.has_more or not pagina.data:
+                return
+            params['starting_after'] = pagina.data[-1].id
+
+    def consultar_pago(self, referencia):
+        payment_intent = self.obtener_payment_intent(referencia)
+        return {
+            'status': payment_intent.status,
+            'monto': payment_intent.amount / 100,  # Convertir de centavos
+            'moneda': payment_intent.currency.upper(),
+        }
+
+
+URL_API_MERCADOPAGO = 'https://api.mercadopago.com'
+
+
+class ClienteHttpMercadoPago(HttpClient):
+    """
+    Transporte del SDK de Mercado Pago sobre una sesión compartida con pool
+    keep-alive (el cliente por defecto del SDK abre una sesión por llamada).
+    `base_api` redirige las llamadas a un servidor sustituto (pruebas).
+    """
+
+    def __init__(self, base_api=None, tamano_pool=10):
+        self.base_api = base_api.rstrip('/') if base_api else None
+        self.tamano_pool = tamano_pool
+
+    def request(self, method, url, maxretries=None, retry_on=None, backoff_factor=None, **kwargs):
+        if self.base_api and url.startswith(URL_API_MERCADOPAGO):
+            url = self.base_api + url[len(URL_API_MERCADOPAGO):]
+        api_result = sesion('mercadopago', self.tamano_pool, reintentos=2).request(method, url, **kwargs)
+        response = {"status": api_result.status_code, "response": None}
+        if api_result.status_code != 204 and api_result.content:
+            try:
+                response["response"] = api_result.json()
+            except ValueError:
+                logger.error(f"Mercado Pago respondió sin JSON válido ({api_result.status_code}): {url}")
+        return response
+
+
+class MercadoPagoProveedor(ProveedorPago):
+    nombre = 'mercadopago'
+
+    def __init__(self, access_token, base_api=None, tamano_pool=10):
+        self.sdk = None
+        if access_token:
+            self.sdk = mercadopago.SDK(access_token, http_client=ClienteHttpMercadoPago(base_api, tamano_pool))
+
+    def configurado(self):
+        return self.sdk is not None
+
+    def crear_preferencia(self, items, usuario_email, back_urls=None):
+        """
+        Crea una preferencia de pago.
+
+        Args:
+            items: Lista de diccionarios con keys 'title', 'quantity', 'unit_price'
+            usuario_email: Email del pagador
+            back_urls: Diccionario con URLs de retorno (opcional)
+        """
+        self.requerir()
+        preference_data = {
+            "items": items,
+            "payer": {
+                "email": usuario_email
+            },
+        }
+        if back_urls:
+            preference_data["back_urls"] = back_urls
+            # Mercado Pago rechaza auto_return sin URL de retorno para el pago aprobado
+            if back_urls.get("success"):
+                preference_data["auto_return"] = "approved"
+        with medir(self.nombre, 'crear_preferencia'):
+            preference_response = self.sdk.preference().create(preference_data)
+        if preference_response["status"] not in (200, 201):
+            raise Exception(f"Mercado Pago rechazó la preferencia ({preference_response['status']}): {preference_response['response']}")
+        return preference_response["response"]
+
+    def preferencia_para_carrito(self, usuario, back_urls):
+        """
+        Preferencia para el carrito de `usuario` (items y productos en una
+        consulta, al precio vigente: la oferta si existe). Mientras el carrito
+        no cambie se reutiliza la preferencia ya creada en lugar de crear otra
+        en Mercado Pago en cada clic.
+        """
+        lineas = CartSnapshot.de_usuario(usuario).lineas
+        if not lineas:
+            raise ValueError("El carrito está vacío.")
+        items = [
+            {
+                "id": str(linea.producto.id),
+                "title": linea.producto.nombre,
+                "quantity": linea.cantidad,
+                "unit_price": float(precio_vigente(linea.producto)),
+                "currency_id": "MXN",
+            }
+            for linea in lineas
+        ]
+        contenido = json.dumps([usuario.id, usuario.email, items, back_urls], sort_keys=True)
+        clave = f"mp:preferencia:{hashlib.sha256(contenido.encode('utf-8')).hexdigest()}"
+        preferencia = cache.get(clave)
+        if preferencia is None:
+            respuesta = self.crear_preferencia(items, usuario.email, back_urls)
+            preferencia = {'preference_id': respuesta['id'], 'init_point': respuesta['init_point']}
+            cache.set(clave, preferencia, getattr(settings, 'MERCADOPAGO_PREFERENCIA_TTL', 1800))
+        return preferencia
+
+    def crear_pago(self, pedido, email, nombre, back_urls=None, **opciones):
+        items = [
+            {
+                "title": detalle.producto.nombre,
+                "quantity": detalle.cantidad,
+                "unit_price": float(detalle.precio_unitario),
+                "currency_id": "MXN",
+            }
+            for detalle in pedido.detalles.select_related('producto')
+        ]
+        preference = self.crear_preferencia(items, email, back_urls)
+        return {'preference_id': preference['id'], 'init_point': preference['init_point']}
+
+    def consultar_pago(self, referencia):
+        self.requerir()
+        with medir(self.nombre, 'consultar_pago'):
+            respuesta = self.sdk.payment().get(referencia)
+        pago = respuesta["response"]
+        return {
+            'status': pago.get('status'),
+            'monto': pago.get('transaction_amount'),
+            'moneda': (pago.get('currency_id') or '').upper(),
+        }
+
+
+_proveedores = {}
+
+
+def configurar():
+    """Crea los clientes de todos los proveedores a partir de settings (sin llamadas de red)."""
+    _proveedores['stripe'] = StripeProveedor(
+        getattr(settings, 'STRIPE_SECRET_KEY', None),
+        base_api=getattr(settings, 'STRIPE_API_BASE', None),
+    )
+    _proveedores['mercadopago'] = MercadoPagoProveedor(
+        getattr(settings, 'MERCADOPAGO_ACCESS_TOKEN', None),
+        base_api=getattr(settings, 'MERCADOPAGO_API_BASE', None),
+        tamano_pool=getattr(settings, 'MERCADOPAGO_POOL_SIZE', 10),
+    )
+    for nombre, instancia in _proveedores.items():
+        if not instancia.configurado():
+            logger.info(f"Proveedor de pagos '{nombre}' sin credenciales: sus operaciones fallarán.")
+
+
+def proveedor(nombre):
+    """Adaptador configurado de `nombre` ('stripe' o 'mercadopago')."""
+    if not _proveedores:
+        configurar()
+    return _proveedores[nombre]
+
+
+# ============================================================
+# FACHADAS USADAS POR LAS VISTAS
+# ============================================================
 
 class StripePaymentManager:
     """Gestor de pagos con Stripe."""
-    
+
     @staticmethod
-    def crear_payment_intent(pedido_id, email, nombre):
+    def crear_payment_intent(pedido_id, email, nombre, usuario=None):
         """
         Crea un PaymentIntent en Stripe para un pedido.
         
@@ -70,6 +392,7 @@ class StripePaymentManager:
             pedido_id (int): ID del pedido
             email (str): Email del cliente
             nombre (str): Nombre del cliente
+            usuario (User): Si se indica, el pedido debe pertenecerle
             
         Returns:
             dict: Información del PaymentIntent con client_secret
@@ -78,45 +401,11 @@ class StripePaymentManager:
             Exception: Si hay error al crear el PaymentIntent
         """
         try:
-            _configurar_stripe()
-            
-            pedido = Pedido.objects.get(id=pedido_id)
-            
-            # Convertir el monto a centavos (Stripe usa centavos)
-            monto_centavos = int(pedido.total * 100)
-            
-            # Crear PaymentIntent
-            payment_intent = stripe.PaymentIntent.create(
-                amount=monto_centavos,
-                currency='usd',
-                metadata={
-                    'pedido_id': str(pedido_id),
-                    'numero_pedido': pedido.numero_pedido,
-                    'usuario_id': str(pedido.usuario.id),
-                },
-                receipt_email=email,
-                statement_descriptor=f"Pedido {pedido.numero_pedido}"
-            )
-            
-            # Crear o actualizar registro de pago
-            pago, _ = Pago.objects.update_or_create(
-                pedido=pedido,
-                defaults={
-                    'stripe_payment_intent_id': payment_intent.id,
-                    'monto': pedido.total,
-                    'estado': 'procesando',
-                }
-            )
-            
-            logger.info(f"PaymentIntent creado: {payment_intent.id} para pedido {pedido_id}")
-            
-            return {
-                'client_secret': payment_intent.client_secret,
-                'payment_intent_id': payment_intent.id,
-                'monto': float(pedido.total),
-                'numero_pedido': pedido.numero_pedido,
-            }
-            
+            pedidos = Pedido.objects.select_related('pago')
+            if usuario is not None:
+                pedidos = pedidos.filter(usuario=usuario)
+            pedido = pedidos.get(id=pedido_id)
+            return proveedor('stripe').crear_pago(pedido, email, nombre)
         except Pedido.DoesNotExist:
             logger.error(f"Pedido no encontrado: {pedido_id}")
             raise Exception(f"Pedido con ID {pedido_id} no encontrado")
@@ -126,108 +415,15 @@ class StripePaymentManager:
         except Exception as e:
             logger.error(f"Error inesperado: {str(e)}")
             raise Exception(f"Error inesperado: {str(e)}")
-    
+
+
+class MercadoPagoManager:
+    """Clase para gestionar pagos con Mercado Pago."""
+
     @staticmethod
-    def procesar_webhook(event):
-        """
-        Procesa eventos de webhook de Stripe.
-        
-        Eventos soportados:
-        - payment_intent.succeeded: Pago completado exitosamente
-        - payment_intent.payment_failed: Pago fallido
-        
-        Args:
-            event (dict): Evento de webhook de Stripe
-            
-        Returns:
-            bool: True si se procesó correctamente
-        """
-        try:
-            _configurar_stripe()
-            
-            event_type = event['type']
-            payment_intent = event['data']['object']
-            
-            # Obtener el ID del PaymentIntent
-            pi_id = payment_intent['id']
-            
-            # Buscar el pago en la BD
-            pago = Pago.objects.filter(stripe_payment_intent_id=pi_id).first()
-            
-            if not pago:
-                logger.warning(f"Pago no encontrado para PaymentIntent: {pi_id}")
-                return False
-            
-            # Procesar pago exitoso
-            if event_type == 'payment_intent.succeeded':
-                # Actualizar estado del pago
-                pago.estado = 'exitoso'
-                pago.id_transaccion = pi_id
-                pago.metodo_pago = payment_intent.get('payment_method_details', {}).get('type', 'desconocido')
-                pago.actualizado_en = timezone.now()
-                pago.save()
-                
-                # Actualizar estado del pedido a "procesando"
-                pedido = pago.pedido
-                pedido.estado = 'procesando'
-                pedido.actualizado_en = timezone.now()
-                pedido.save()
-                
-                logger.info(f"Pago exitoso: {pi_id} - Pedido {pedido.numero_pedido}")
-                return True
-            
-            # Procesar pago fallido
-            elif event_type == 'payment_intent.payment_failed':
-                razon = payment_intent.get('charges', {}).get('data', [{}])[0].get('failure_message', 'Razón desconocida')
-                
-                # Actualizar estado del pago
-                pago.estado = 'fallido'
-                pago.razon_fallo = razon
-                pago.actualizado_en = timezone.now()
-                pago.save()
-                
-                # Actualizar estado del pedido a "cancelado"
-                pedido = pago.pedido
-                pedido.estado = 'cancelado'
-                pedido.actualizado_en = timezone.now()
-                pedido.save()
-                
-                logger.warning(f"Pago fallido: {pi_id} - Razón: {razon}")
-                return True
-            
-            else:
-                logger.debug(f"Evento no procesado: {event_type}")
-                return False
-                
-        except Exception as e:
-            logger.error(f"Error procesando webhook: {str(e)}")
-            return False
-    
+    def crear_preferencia(items, usuario_email, back_urls):
+        return proveedor('mercadopago').crear_preferencia(items, usuario_email, back_urls)
+
     @staticmethod
-    def verificar_estado_pago(payment_intent_id):
-        """
-        Verifica el estado actual de un PaymentIntent en Stripe.
-        
-        Args:
-            payment_intent_id (str): ID del PaymentIntent
-            
-        Returns:
-            dict: Estado del pago
-        """
-        try:
-            _configurar_stripe()
-            
-            payment_intent = stripe.PaymentIntent.retrieve(payment_intent_id)
-            
-            pago = Pago.objects.filter(stripe_payment_intent_id=payment_intent_id).first()
-            
-            return {
-                'status': payment_intent.status,
-                'monto': payment_intent.amount / 100,  # Convertir de centavos
-                'moneda': payment_intent.currency.upper(),
-                'estado_local': pago.estado if pago else 'no_registrado',
-            }
-            
-        except stripe.error.StripeError as e:
-            logger.error(f"Error verificando estado: {str(e)}")
-            raise Exception(f"Error verificando estado: {str(e)}")
+    def preferencia_para_carrito(usuario, back_urls):
+        return proveedor('mercadopago').preferencia_para_carrito(usuario, back_urls)
@@ -0,0 +1,299 @@
+"""
+Ranking materializado de productos más vendidos.
+
+Cada venta (`DetallePedido`) suma sus unidades en `VentaDiaria` y en
+`RankingVentas` para cada ventana (7/30/90 días) y alcance (global, género y
+cada categoría del producto) con un único upsert por tabla. Leer el top-N es
+entonces una consulta indexada por (ventana, alcance, -unidades).
+
+Las líneas borradas y los pedidos cancelados se descuentan (y se vuelven a
+sumar si el pedido sale de 'cancelado') en las ventanas que incluyen el día
+del pedido.
+
+Las ventanas son móviles: las ventas que salen de la ventana se descuentan al
+recalcular, cosa que hace a diario la tarea 'reconstruir_ranking' (se
+programa sola con la primera venta) o `python manage.py rebuild_best_sellers`.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from apps.catalog.models import Producto
+from apps.catalog.caching import GRUPO_VENTAS, invalidar as invalidar_cache
+from apps.catalog.resolver import resolver_categoria
+from apps.core.jobs import encolar
+from .models import DetallePedido, VentaDiaria, RankingVentas
+
+logger = logging.getLogger(__name__)
+
+VENTANAS = (7, 30, 90)
+VENTANA_DEFECTO = 30
+# La reconstrucción diaria corre unos minutos después de la medianoche local
+HORA_RECONSTRUCCION = time(0, 5)
+
+
+def alcance_global():
+    return 'global'
+
+
+def alcance_genero(genero):
+    return f'genero:{genero}'
+
+
+def alcance_categoria(categoria_id):
+    return f'categoria:{categoria_id}'
+
+
+def alcance_desde_parametros(genero=None, categoria=None, ventana=None):
+    """
+    Traduce parámetros de query (`?genero=`, `?categoria=`, `?ventana=`) a
+    (ventana, alcance). La categoría acepta id, slug o nombre.
+    """
+    try:
+        ventana = int(ventana) if ventana else VENTANA_DEFECTO
+    except (TypeError, ValueError):
+        ventana = VENTANA_DEFECTO
+    if ventana not in VENTANAS:
+        ventana = VENTANA_DEFECTO
+
+    if categoria:
+        categoria_id = int(categoria) if str(categoria).isdigit() else resolver_categoria(categoria)
+        if categoria_id:
+            return ventana, alcance_categoria(categoria_id)
+    if genero and genero.lower() in dict(Producto.GENERO_CHOICES):
+        return ventana, alcance_genero(genero.lower())
+    return ventana, alcance_global()
+
+
+def _alcances_por_producto(producto_ids):
+    """{producto_id: [alcances]} según género, categoría principal y secundarias."""
+    alcances = {}
+    for producto_id, genero, categoria_id in Producto.objects.filter(id__in=producto_ids).values_list('id', 'genero', 'categoria_id'):
+        alcances[producto_id] = [alcance_global(), alcance_genero(genero)]
+        if categoria_id:
+            alcances[producto_id].append(alcance_categoria(categoria_id))
+    secundarias = Producto.categorias_secundarias.through.objects.filter(producto_id__in=producto_ids)
+    for producto_id, categoria_id in secundarias.values_list('producto_id', 'categoria_id'):
+        alcance = alcance_categoria(categoria_id)
+        if producto_id in alcances and alcance not in alcances[producto_id]:
+            alcances[producto_id].append(alcance)
+    return alcances
+
+
+def _upsert_sumando(modelo, columnas_clave, filas):
+    """
+    INSERT ... ON CONFLICT (clave) DO UPDATE SET unidades = unidades + excluded.unidades.
+    La sintaxis es la misma en PostgreSQL y SQLite (>= 3.24).
+    """
+    if not filas:
+        return
+    tabla = connection.ops.quote_name(modelo._meta.db_table)
+    columnas = [*columnas_clave, 'unidades']
+    marcadores = ', '.join(['(' + ', '.join(['%s'] * len(columnas)) + ')'] * len(filas))
+    sql = (
+        f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES {marcadores} "
+        f"ON CONFLICT ({', '.join(columnas_clave)}) "
+        f"DO UPDATE SET unidades = {tabla}.unidades + excluded.unidades"
+    )
+    parametros = [valor for fila in filas for valor in fila]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, parametros)
+
+
+def _aplicar(lineas, fecha, signo):
+    unidades = {}
+    for producto_id, cantidad in lineas:
+        if producto_id and cantidad and cantidad > 0:
+            unidades[producto_id] = unidades.get(producto_id, 0) + cantidad
+    if not unidades:
+        return
+
+    hoy = timezone.localdate()
+    fecha = fecha or hoy
+    # Solo las ventanas que todavía incluyen el día de la venta
+    ventanas = [ventana for ventana in VENTANAS if (hoy - fecha).days < ventana]
+    alcances = _alcances_por_producto(list(unidades))
+    if signo < 0:
+        _restar(unidades, alcances, fecha, ventanas)
+        return
+    filas_diarias = [(producto_id, fecha, cantidad) for producto_id, cantidad in unidades.items() if producto_id in alcances]
+    filas_ranking = [
+        (ventana, alcance, producto_id, unidades[producto_id])
+        for producto_id, lista in alcances.items()
+        for alcance in lista
+        for ventana in ventanas
+    ]
+    with transaction.atomic():
+        _upsert_sumando(VentaDiaria, ['producto_id', 'fecha'], filas_diarias)
+        _upsert_sumando(RankingVentas, ['ventana', 'alcance', 'producto_id'], filas_ranking)
+
+
+def _restar(unidades, alcances, fecha, ventanas):
+    # Un UPDATE por producto (sin bajar de 0) y se borran las filas que quedan vacías
+    with transaction.atomic():
+        for producto_id, lista in alcances.items():
+            restar = Greatest(F('unidades') - unidades[producto_id], 0)
+            VentaDiaria.objects.filter(producto_id=producto_id, fecha=fecha).update(unidades=restar)
+            if ventanas:
+                RankingVentas.objects.filter(
+                    producto_id=producto_id, ventana__in=ventanas, alcance__in=lista,
+                ).update(unidades=restar)
+        VentaDiaria.objects.filter(producto_id__in=alcances, unidades=0).delete()
+        RankingVentas.objects.filter(producto_id__in=alcances, unidades=0).delete()
+
+
+def registrar_ventas(lineas, fecha=None):
+    """
+    Suma ventas al ranking. `lineas` es un iterable de (producto_id, cantidad)
+    vendidas el día `fecha` (por defecto hoy).
+    """
+    _aplicar(lineas, fecha, 1)
+
+
+def descontar_ventas(lineas, fecha=None):
+    """Resta del ranking ventas del día `fecha` (líneas borradas o pedidos cancelados)."""
+    _aplicar(lineas, fecha, -1)
+
+
+def _lineas_por_fecha(pedido_ids):
+    por_fecha = defaultdict(list)
+    detalles = DetallePedido.objects.filter(pedido_id__in=pedido_ids).values_list('producto_id', 'cantidad', 'pedido__creado_en')
+    for producto_id, cantidad, creado_en in detalles:
+        por_fecha[timezone.localdate(creado_en)].append((producto_id, cantidad))
+    return por_fecha
+
+
+def ajustar_por_estado(cancelados=(), reactivados=()):
+    """
+    Descuenta las ventas de los pedidos `cancelados` y vuelve a sumar las de
+    los `reactivados` (salieron de 'cancelado'), cada una en su día.
+    """
+    if cancelados:
+        for fecha, lineas in _lineas_por_fecha(cancelados).items():
+            descontar_ventas(lineas, fecha)
+    if reactivados:
+        for fecha, lineas in _lineas_por_fecha(reactivados).items():
+            registrar_ventas(lineas, fecha)
+
+
+def _al_confirmar(funcion, *args):
+    # Un error en el ranking nunca debe tumbar la operación que lo origina
+    def _ejecutar():
+        try:
+            funcion(*args)
+        except Exception as e:
+            logger.error(f"Error actualizando ranking de ventas: {str(e)}")
+
+    transaction.on_commit(_ejecutar)
+
+
+def registrar_ventas_al_confirmar(lineas, fecha=None):
+    """
+    Registra las ventas cuando la transacción actual confirme y se asegura de
+    que la reconstrucción diaria esté programada.
+    """
+    _al_confirmar(registrar_ventas, list(lineas), fecha)
+    _al_confirmar(programar_reconstruccion)
+
+
+def descontar_ventas_al_confirmar(lineas, fecha=None):
+    _al_confirmar(descontar_ventas, list(lineas), fecha)
+
+
+def ajustar_por_estado_al_confirmar(cancelados=(), reactivados=()):
+    if cancelados or reactivados:
+        _al_confirmar(ajustar_por_estado, list(cancelados), list(reactivados))
+
+
+def segundos_hasta_reconstruccion(ahora=None):
+    """Segundos hasta la próxima `HORA_RECONSTRUCCION` local."""
+    ahora = timezone.localtime(ahora)
+    proxima = datetime.combine(ahora.date(), HORA_RECONSTRUCCION, tzinfo=ahora.tzinfo)
+    if proxima <= ahora:
+        proxima = datetime.combine(ahora.date() + timedelta(days=1), HORA_RECONSTRUCCION, tzinfo=ahora.tzinfo)
+    return max((proxima - ahora).total_seconds(), 0)
+
+
+def programar_reconstruccion():
+    """Encola la reconstrucción diaria si no hay una pendiente (ver `tasks.reconstruir_ranking`)."""
+    return encolar('reconstruir_ranking', demora=segundos_hasta_reconstruccion(), unico=True)
+
+
+def reconstruir(hoy=None, desde_pedidos=False):
+    """
+    Recalcula `RankingVentas` a partir de `VentaDiaria` (descarta lo que salió
+    de cada ventana). Con `desde_pedidos=True` recalcula antes `VentaDiaria`
+    desde todos los `DetallePedido`. Retorna la cantidad de filas del ranking.
+    """
+    hoy = hoy or timezone.localdate()
+    with transaction.atomic():
+        if desde_pedidos:
+            VentaDiaria.objects.all().delete()
+            diarias = {}
+            detalles = (
+                DetallePedido.objects.filter(producto__isnull=False)
+                .exclude(pedido__estado='cancelado')
+                .values_list('producto_id', 'cantidad', 'pedido__creado_en')
+            )
+            for producto_id, cantidad, creado_en in detalles.iterator(chunk_size=2000):
+                clave = (producto_id, timezone.localdate(creado_en))
+                diarias[clave] = diarias.get(clave, 0) + max(cantidad, 0)
+            VentaDiaria.objects.bulk_create(
+                [VentaDiaria(producto_id=p, fecha=f, unidades=u) for (p, f), u in diarias.items()],
+                batch_size=1000,
+            )
+
+        RankingVentas.objects.all().delete()
+        filas = []
+        for ventana in VENTANAS:
+            desde = hoy - timedelta(days=ventana - 1)
+            totales = (
+                VentaDiaria.objects.filter(fecha__gte=desde)
+                .values('producto_id')
+                .annotate(total=Sum('unidades'))
+            )
+            totales = {fila['producto_id']: fila['total'] for fila in totales if fila['total']}
+            alcances = _alcances_por_producto(list(totales))
+            for producto_id, lista in alcances.items():
+                for alcance in lista:
+                    filas.append(RankingVentas(ventana=ventana, alcance=alcance, producto_id=producto_id, unidades=totales[producto_id]))
+        RankingVentas.objects.bulk_create(filas, batch_size=1000)
+    transaction.on_commit(lambda: invalidar_cache(GRUPO_VENTAS))
+    return len(filas)
+
+
+def top_productos(limite=8, ventana=VENTANA_DEFECTO, alcance=None, queryset=None):
+    """
+    Los `limite` productos activos más vendidos en la ventana y alcance dados.
+    Si el ranking no alcanza (p. ej. sin ventas aún) se completa con los
+    productos más recientes del mismo alcance.
+    """
+    alcance = alcance or alcance_global()
+    if ventana not in VENTANAS:
+        ventana = VENTANA_DEFECTO
+    queryset = queryset if queryset is not None else Producto.objects.all()
+    queryset = queryset.filter(activo=True)
+
+    ids = list(
+        RankingVentas.objects.filter(ventana=ventana, alcance=alcance)
+        .order_by('-unidades', 'producto_id')
+        .values_list('producto_id', flat=True)[:limite * 2]
+    )
+    por_id = queryset.in_bulk(ids) if ids else {}
+    productos = [por_id[producto_id] for producto_id in ids if producto_id in por_id][:limite]
+
+    if len(productos) < limite:
+        relleno = queryset.exclude(id__in=[p.id for p in productos])
+        if alcance.startswith('genero:'):
+            relleno = relleno.filter(genero=alcance.split(':', 1)[1])
+        elif alcance.startswith('categoria:'):
+            categoria_id = alcance.split(':', 1)[1]
+            relleno = relleno.filter(categoria_id=categoria_id) | relleno.filter(categorias_secundarias=categoria_id)
+            relleno = relleno.distinct()
+        productos += list(relleno.order_by('-creado_en', '-id')[:limite - len(productos)])
+    return productos
@@ -0,0 +1,137 @@
+"""
+Reconciliación de pagos de Stripe y consulta de estado desde la base local.
+
+`reconciliar_stripe` lista en lote los PaymentIntents recientes (una llamada
+por página de 100, no una por pago) y aplica a los pagos pendientes los
+mismos manejadores que los webhooks, con escrituras en bloque. La ejecuta la
+tarea 'reconciliar_pagos', que se encola al crear un PaymentIntent y se
+reprograma sola mientras queden pagos pendientes: las llamadas salientes
+crecen con los pagos pendientes, no con los clientes que consultan.
+
+`estado_pago` responde el polling del front-end desde `Pago`, con la fecha
+de la última confirmación (`verificado_en`). Solo si el dato es más viejo que
+`PAGOS_FRESCURA` consulta a Stripe, y como mucho una vez por ventana y pago
+aunque lo consulten varios clientes a la vez.
+"""
+import logging
+from datetime import timedelta
+
+import stripe
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Pago
+from .payments import proveedor
+from .webhooks import aplicar_payment_intent, guardar_cambios
+
+logger = logging.getLogger(__name__)
+
+ESTADOS_PENDIENTES = ('pendiente', 'procesando')
+# Estado de Stripe equivalente para pagos sin `estado_proveedor` registrado
+ESTADO_STRIPE = {
+    'pendiente': 'requires_payment_method',
+    'procesando': 'processing',
+    'exitoso': 'succeeded',
+    'fallido': 'requires_payment_method',
+    'cancelado': 'canceled',
+}
+# Margen para PaymentIntents creados en Stripe un poco antes que su Pago local
+MARGEN = timedelta(minutes=5)
+
+
+def pagos_pendientes(dias=None):
+    dias = dias if dias is not None else getattr(settings, 'PAGOS_RECONCILIACION_DIAS', 3)
+    return Pago.objects.select_related('pedido').filter(
+        estado__in=ESTADOS_PENDIENTES,
+        stripe_payment_intent_id__isnull=False,
+        creado_en__gte=timezone.now() - timedelta(days=dias),
+    )
+
+
+def reconciliar_stripe(dias=None):
+    """
+    Actualiza los pagos pendientes de los últimos `dias` días con el estado
+    de sus PaymentIntents. Retorna un dict con los totales.
+    """
+    pendientes = {pago.stripe_payment_intent_id: pago for pago in pagos_pendientes(dias)}
+    if not pendientes:
+        return {'pendientes': 0, 'vistos': 0, 'actualizados': 0}
+
+    desde = min(pago.creado_en for pago in pendientes.values()) - MARGEN
+    vistos = set()
+    pagos_modificados, pedidos_modificados = {}, {}
+    for objeto in proveedor('stripe').listar_payment_intents(desde):
+        pago = pendientes.get(objeto.id)
+        if pago is None:
+            continue
+        vistos.add(objeto.id)
+        # Los manejadores reciben el PaymentIntent como dict, igual que en los webhooks
+        payment_intent = objeto.to_dict()
+        cambia_pago, cambia_pedido = aplicar_payment_intent(pago, payment_intent)
+        if cambia_pago:
+            pagos_modificados[pago.id] = pago
+        if cambia_pedido:
+            pedidos_modificados[pago.pedido_id] = pago.pedido
+        if len(vistos) == len(pendientes):
+            break  # no hace falta seguir paginando
+
+    ahora = timezone.now()
+    with transaction.atomic():
+        guardar_cambios(pagos_modificados.values(), pedidos_modificados.values(), ahora)
+        sin_cambios = [pendientes[pi].id for pi in vistos if pendientes[pi].id not in pagos_modificados]
+        if sin_cambios:
+            Pago.objects.filter(id__in=sin_cambios).update(verificado_en=ahora, actualizado_en=ahora)
+
+    return {'pendientes': len(pendientes), 'vistos': len(vistos), 'actualizados': len(pagos_modificados)}
+
+
+def _consultar_stripe(pago):
+    """Trae el PaymentIntent de `pago` y aplica su estado. Retorna True si se pudo consultar."""
+    try:
+        payment_intent = proveedor('stripe').obtener_payment_intent(pago.stripe_payment_intent_id).to_dict()
+    except (stripe.error.StripeError, ImproperlyConfigured) as e:
+        # Sin Stripe (caído o sin credenciales) se responde con el estado local
+        logger.error(f"Error verificando estado: {str(e)}")
+        return False
+
+    ahora = timezone.now()
+    cambia_pago, cambia_pedido = aplicar_payment_intent(pago, payment_intent)
+    with transaction.atomic():
+        if cambia_pago:
+            guardar_cambios([pago], [pago.pedido] if cambia_pedido else [], ahora)
+        else:
+            pago.verificado_en = pago.actualizado_en = ahora
+            Pago.objects.filter(id=pago.id).update(verificado_en=ahora, actualizado_en=ahora)
+    return True
+
+
+def estado_pago(payment_intent_id):
+    """
+    Estado de un pago para el polling del front-end. Retorna None si el
+    PaymentIntent no corresponde a un pago de la tienda.
+    """
+    pago = Pago.objects.select_related('pedido').filter(stripe_payment_intent_id=payment_intent_id).first()
+    if pago is None:
+        return None
+
+    frescura = getattr(settings, 'PAGOS_FRESCURA', 15)
+    ahora = timezone.now()
+    fuente = 'local'
+    vencido = pago.verificado_en is None or ahora - pago.verificado_en > timedelta(seconds=frescura)
+    # Solo el primer cliente de la ventana sale a Stripe; el resto lee el estado local
+    if (pago.estado in ESTADOS_PENDIENTES and vencido
+            and cache.add(f'pagos:verificando:{payment_intent_id}', 1, frescura)):
+        if _consultar_stripe(pago):
+            fuente = 'stripe'
+
+    return {
+        'status': pago.estado_proveedor or ESTADO_STRIPE.get(pago.estado, ''),
+        'monto': float(pago.monto),
+        'moneda': pago.moneda,
+        'estado_local': pago.estado,
+        'verificado_en': pago.verificado_en.isoformat() if pago.verificado_en else None,
+        'fuente': fuente,
+    }
@@ -17,6 +17,13 @@ class PagoSerializer(serializers.ModelSerializer):
         model = Pago
         fields = '__all__'
 
+class PedidoResumenSerializer(serializers.ModelSerializer):
+    """Representación liviana para listados (ver `apps.orders.history.pedidos_resumen`)."""
+
+    class Meta:
+        model = Pedido
+        fields = ['id', 'numero_pedido', 'estado', 'total', 'cantidad_lineas', 'cantidad_unidades', 'estado_pago', 'pago_actualizado_en', 'creado_en']
+
 class PedidoSerializer(serializers.ModelSerializer):
     detalles = DetallePedidoSerializer(many=True, read_only=True)
     pago = PagoSerializer(read_only=True)
@@ -24,9 +31,17 @@ class PedidoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Pedido
         fields = '__all__'
-        read_only_fields = ['usuario', 'numero_pedido', 'total', 'estado', 'creado_en']
+        read_only_fields = [
+            'usuario', 'numero_pedido', 'total', 'estado', 'creado_en',
+            'cantidad_lineas', 'cantidad_unidades', 'estado_pago', 'pago_actualizado_en',
+        ]
 
 class CrearPagoSerializer(serializers.Serializer):
     pedido_id = serializers.IntegerField()
     email = serializers.EmailField()
     nombre = serializers.CharField(max_length=200)
+
+class CheckoutSerializer(serializers.Serializer):
+    direccion_envio = serializers.CharField()
+    telefono = serializers.CharField(max_length=20)
+    notas = serializers.CharField(required=False, allow_blank=True, allow_null=True)
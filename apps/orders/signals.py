@@ -1,10 +1,63 @@
-from django.db.models.signals import post_migrate
+from django.db.models.signals import post_migrate, post_save, post_delete, pre_delete, pre_save
 from django.dispatch import receiver
 from django.apps import apps
+from django.utils import timezone
+
+from .models import DetallePedido, Pago, Pedido
+from . import aggregates, ranking
 
 @receiver(post_migrate)
 def prevent_duplicate_model_registration(sender, **kwargs):
     # Evitar el registro duplicado del modelo Pago
     app_config = apps.get_app_config('orders')
     if 'pago' in app_config.models:
-        print("Modelo 'Pago' ya registrado, evitando duplicados.")
\ No newline at end of file
+        print("Modelo 'Pago' ya registrado, evitando duplicados.")
+
+@receiver(post_save, sender=DetallePedido)
+def registrar_venta(sender, instance, created, raw=False, **kwargs):
+    # Las líneas creadas con bulk_create (checkout) se registran explícitamente
+    if created and not raw:
+        ranking.registrar_ventas_al_confirmar([(instance.producto_id, instance.cantidad)])
+
+@receiver(pre_delete, sender=DetallePedido)
+def descontar_venta(sender, instance, **kwargs):
+    # Antes del borrado: en cascada el pedido todavía existe y da la fecha de la venta
+    pedido = Pedido.objects.filter(pk=instance.pedido_id).values_list('creado_en', 'estado').first()
+    if pedido and pedido[1] != 'cancelado':
+        ranking.descontar_ventas_al_confirmar(
+            [(instance.producto_id, instance.cantidad)], timezone.localdate(pedido[0]),
+        )
+
+@receiver(pre_save, sender=Pedido)
+def recordar_estado_pedido(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        instance._estado_anterior = None
+        return
+    instance._estado_anterior = Pedido.objects.filter(pk=instance.pk).values_list('estado', flat=True).first()
+
+@receiver(post_save, sender=Pedido)
+def ajustar_ranking_por_estado(sender, instance, raw=False, **kwargs):
+    # Cancelar un pedido descuenta sus ventas del ranking; reactivarlo las vuelve a sumar
+    anterior = getattr(instance, '_estado_anterior', None)
+    if raw or anterior is None or (anterior == 'cancelado') == (instance.estado == 'cancelado'):
+        return
+    if instance.estado == 'cancelado':
+        ranking.ajustar_por_estado_al_confirmar(cancelados=[instance.pk])
+    else:
+        ranking.ajustar_por_estado_al_confirmar(reactivados=[instance.pk])
+
+@receiver(post_save, sender=DetallePedido)
+@receiver(post_delete, sender=DetallePedido)
+def actualizar_agregados_lineas(sender, instance, raw=False, **kwargs):
+    # Las cargas de fixtures se reconcilian en bloque (restore_database)
+    if not raw:
+        aggregates.recalcular_lineas([instance.pedido_id])
+
+@receiver(post_save, sender=Pago)
+def actualizar_agregados_pago(sender, instance, raw=False, **kwargs):
+    if not raw:
+        aggregates.sincronizar_pago(instance)
+
+@receiver(post_delete, sender=Pago)
+def limpiar_agregados_pago(sender, instance, **kwargs):
+    aggregates.recalcular_pagos([instance.pedido_id])
@@ -0,0 +1,35 @@
+"""Tareas diferidas de pedidos y pagos (ver `apps.core.jobs`)."""
+import logging
+
+from django.conf import settings
+
+from apps.core.jobs import encolar, tarea
+from . import ranking, reconciliation, webhooks
+
+logger = logging.getLogger(__name__)
+
+
+@tarea('procesar_webhooks')
+def procesar_webhooks():
+    # Cada evento nuevo encola esta tarea, pero la primera drena todos los
+    # pendientes por lotes; las siguientes encuentran la cola vacía
+    totales = webhooks.procesar_pendientes()
+    if totales:
+        logger.info(f"Webhooks procesados: {totales}")
+
+
+@tarea('reconciliar_pagos')
+def reconciliar_pagos():
+    totales = reconciliation.reconciliar_stripe()
+    logger.info(f"Reconciliación de pagos: {totales}")
+    # Se reprograma mientras queden pagos sin confirmar
+    if reconciliation.pagos_pendientes().exists():
+        encolar('reconciliar_pagos', demora=getattr(settings, 'PAGOS_RECONCILIACION_INTERVALO', 60))
+
+
+@tarea('reconstruir_ranking')
+def reconstruir_ranking():
+    # Descarta las ventas que salieron de cada ventana y se reprograma para mañana
+    filas = ranking.reconstruir()
+    logger.info(f"Ranking de más vendidos recalculado: {filas} filas")
+    encolar('reconstruir_ranking', demora=ranking.segundos_hasta_reconstruccion())
@@ -0,0 +1,238 @@
+"""
+Recepción y procesamiento de webhooks de Stripe.
+
+El endpoint solo verifica la firma, guarda el evento en `WebhookEvent` y
+responde 200: la clave (proveedor, evento_id) descarta los reintentos de
+Stripe sin volver a procesarlos. El procesamiento corre fuera del request,
+en la cola de tareas (`procesar_webhooks`, ver `apps.orders.tasks`).
+
+`procesar_eventos` aplica un lote de eventos con una consulta para los pagos
+(con su pedido), `bulk_update` solo de los campos que cambian y un único
+UPDATE para los agregados de pago de los pedidos. Los manejadores son
+idempotentes: reaplicar un evento no escribe nada, de modo que tras una caída
+la ráfaga de eventos acumulados se drena en pocos lotes.
+"""
+import logging
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.core.jobs import encolar
+from . import aggregates, ranking
+from .models import Pago, Pedido, WebhookEvent
+
+logger = logging.getLogger(__name__)
+
+PROVEEDOR_STRIPE = 'stripe'
+LOTE = 500
+
+CAMPOS_PAGO = ['estado', 'id_transaccion', 'metodo_pago', 'razon_fallo', 'estado_proveedor', 'verificado_en', 'actualizado_en']
+CAMPOS_PEDIDO = ['estado', 'actualizado_en']
+
+
+def registrar_stripe(event):
+    """
+    Guarda un evento ya verificado (dict del JSON de Stripe). Retorna
+    (evento, creado); solo los eventos nuevos se encolan para procesarse.
+    """
+    creado_proveedor = None
+    if event.get('created'):
+        creado_proveedor = datetime.fromtimestamp(event['created'], tz=dt_timezone.utc)
+    evento, creado = WebhookEvent.objects.get_or_create(
+        proveedor=PROVEEDOR_STRIPE,
+        evento_id=event['id'],
+        defaults={'tipo': event['type'], 'payload': event, 'creado_proveedor': creado_proveedor},
+    )
+    if creado:
+        encolar('procesar_webhooks')
+    else:
+        logger.info(f"Webhook duplicado ignorado: {event['id']}")
+    return evento, creado
+
+
+def aplicar_pago_exitoso(pago, payment_intent):
+    pedido = pago.pedido
+    cambia_pedido = pedido.estado in ('pendiente', 'cancelado')
+    if pago.estado == 'exitoso' and not cambia_pedido:
+        return False, False
+    pago.estado = 'exitoso'
+    pago.estado_proveedor = 'succeeded'
+    pago.id_transaccion = payment_intent['id']
+    pago.metodo_pago = payment_intent.get('payment_method_details', {}).get('type', 'desconocido')
+    pago.razon_fallo = None
+    if cambia_pedido:
+        pedido.estado = 'procesando'
+    logger.info(f"Pago exitoso: {payment_intent['id']} - Pedido {pedido.numero_pedido}")
+    return True, cambia_pedido
+
+
+def aplicar_pago_fallido(pago, payment_intent):
+    pedido = pago.pedido
+    # Un fallo que llega después del éxito (reintento fuera de orden) no revierte el pago
+    if pago.estado == 'exitoso' or (pago.estado == 'fallido' and pedido.estado == 'cancelado'):
+        return False, False
+    error = payment_intent.get('last_payment_error') or {}
+    cargos = (payment_intent.get('charges') or {}).get('data') or [{}]
+    razon = error.get('message') or cargos[0].get('failure_message') or 'Razón desconocida'
+    pago.estado = 'fallido'
+    pago.estado_proveedor = payment_intent.get('status') or 'requires_payment_method'
+    pago.razon_fallo = razon
+    cambia_pedido = pedido.estado != 'cancelado'
+    pedido.estado = 'cancelado'
+    logger.warning(f"Pago fallido: {payment_intent['id']} - Razón: {razon}")
+    return True, cambia_pedido
+
+
+def aplicar_pago_cancelado(pago, payment_intent):
+    pedido = pago.pedido
+    if pago.estado in ('exitoso', 'cancelado'):
+        return False, False
+    pago.estado = 'cancelado'
+    pago.estado_proveedor = 'canceled'
+    cambia_pedido = pedido.estado == 'pendiente'
+    if cambia_pedido:
+        pedido.estado = 'cancelado'
+    return True, cambia_pedido
+
+
+def aplicar_payment_intent(pago, payment_intent):
+    """
+    Aplica el estado actual de un PaymentIntent (reconciliación o consulta
+    directa, sin evento). Retorna (cambia_pago, cambia_pedido).
+    """
+    estado = payment_intent.get('status')
+    if estado == 'succeeded':
+        return aplicar_pago_exitoso(pago, payment_intent)
+    if estado == 'canceled':
+        return aplicar_pago_cancelado(pago, payment_intent)
+    if estado == 'requires_payment_method' and payment_intent.get('last_payment_error'):
+        return aplicar_pago_fallido(pago, payment_intent)
+    if pago.estado_proveedor != estado:
+        pago.estado_proveedor = estado or ''
+        return True, False
+    return False, False
+
+
+MANEJADORES = {
+    'payment_intent.succeeded': aplicar_pago_exitoso,
+    'payment_intent.payment_failed': aplicar_pago_fallido,
+    'payment_intent.canceled': aplicar_pago_cancelado,
+}
+
+
+def guardar_cambios(pagos, pedidos, ahora):
+    """
+    Escribe en bloque los pagos y pedidos modificados por los manejadores
+    (solo los campos que estos tocan).
+    """
+    pagos, pedidos = list(pagos), list(pedidos)
+    if pagos:
+        for pago in pagos:
+            pago.verificado_en = pago.actualizado_en = ahora
+        Pago.objects.bulk_update(pagos, CAMPOS_PAGO)
+        # bulk_update no dispara señales: estado_pago de los pedidos en un UPDATE
+        aggregates.recalcular_pagos([pago.pedido_id for pago in pagos])
+    if pedidos:
+        # bulk_update tampoco dispara las señales que ajustan el ranking al cancelar
+        anteriores = dict(Pedido.objects.filter(id__in=[p.id for p in pedidos]).values_list('id', 'estado'))
+        for pedido in pedidos:
+            pedido.actualizado_en = ahora
+        Pedido.objects.bulk_update(pedidos, CAMPOS_PEDIDO)
+        ranking.ajustar_por_estado_al_confirmar(
+            cancelados=[p.id for p in pedidos if p.estado == 'cancelado' and anteriores.get(p.id) != 'cancelado'],
+            reactivados=[p.id for p in pedidos if p.estado != 'cancelado' and anteriores.get(p.id) == 'cancelado'],
+        )
+
+
+def procesar_eventos(eventos):
+    """
+    Aplica `eventos` (WebhookEvent) en orden del proveedor y actualiza su
+    estado. Retorna un dict estado -> cantidad.
+    """
+    eventos = sorted(eventos, key=lambda e: (e.creado_proveedor or e.recibido_en, e.id))
+    ids_pi = {e.payload['data']['object']['id'] for e in eventos if e.tipo in MANEJADORES}
+    pagos = {
+        pago.stripe_payment_intent_id: pago
+        for pago in Pago.objects.select_related('pedido').filter(stripe_payment_intent_id__in=ids_pi)
+    }
+
+    pagos_modificados, pedidos_modificados = {}, {}
+    por_estado = {'procesado': [], 'ignorado': [], 'sin_pago': []}
+    for evento in eventos:
+        manejador = MANEJADORES.get(evento.tipo)
+        if manejador is None:
+            por_estado['ignorado'].append(evento.id)
+            continue
+        payment_intent = evento.payload['data']['object']
+        pago = pagos.get(payment_intent['id'])
+        if pago is None:
+            logger.warning(f"Pago no encontrado para PaymentIntent: {payment_intent['id']}")
+            por_estado['sin_pago'].append(evento.id)
+            continue
+        cambia_pago, cambia_pedido = manejador(pago, payment_intent)
+        if cambia_pago:
+            pagos_modificados[pago.id] = pago
+        if cambia_pedido:
+            pedidos_modificados[pago.pedido_id] = pago.pedido
+        por_estado['procesado'].append(evento.id)
+
+    ahora = timezone.now()
+    with transaction.atomic():
+        guardar_cambios(pagos_modificados.values(), pedidos_modificados.values(), ahora)
+        for estado, ids in por_estado.items():
+            if ids:
+                WebhookEvent.objects.filter(id__in=ids).update(
+                    estado=estado, procesado_en=ahora, error='', intentos=F('intentos') + 1,
+                )
+    return {estado: len(ids) for estado, ids in por_estado.items()}
+
+
+def _marcar_fallido(evento, exc):
+    WebhookEvent.objects.filter(id=evento.id).update(
+        estado='fallido', error=str(exc), procesado_en=timezone.now(), intentos=F('intentos') + 1,
+    )
+
+
+def procesar_lote(eventos):
+    """
+    Procesa un lote; si falla, reintenta evento por evento para que uno
+    defectuoso quede 'fallido' sin bloquear al resto.
+    """
+    try:
+        with transaction.atomic():
+            return procesar_eventos(eventos)
+    except Exception:
+        logger.exception("Error procesando lote de webhooks; se reintenta evento por evento")
+
+    totales = {}
+    for evento in eventos:
+        try:
+            with transaction.atomic():
+                resultado = procesar_eventos([evento])
+        except Exception as exc:
+            logger.error(f"Error procesando webhook {evento.evento_id}: {str(exc)}")
+            _marcar_fallido(evento, exc)
+            resultado = {'fallido': 1}
+        for estado, cantidad in resultado.items():
+            totales[estado] = totales.get(estado, 0) + cantidad
+    return totales
+
+
+def procesar_pendientes(limite=LOTE):
+    """
+    Drena los eventos 'recibido' por lotes. Con varios workers, cada uno
+    bloquea su lote (SKIP LOCKED en PostgreSQL). Retorna los totales por estado.
+    """
+    totales = {}
+    while True:
+        with transaction.atomic():
+            pendientes = WebhookEvent.objects.filter(estado='recibido').order_by('recibido_en', 'id')
+            if connection.features.has_select_for_update_skip_locked:
+                pendientes = pendientes.select_for_update(skip_locked=True)
+            eventos = list(pendientes[:limite])
+            if not eventos:
+                return totales
+            for estado, cantidad in procesar_lote(eventos).items():
+                totales[estado] = totales.get(estado, 0) + cantidad
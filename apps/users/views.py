@@ -1,5 +1,4 @@
 import random
-import requests
 from datetime import timedelta
 
 from django.shortcuts import render, redirect
@@ -10,13 +9,15 @@ from django.contrib.auth import views as auth_views
 from django.urls import reverse, reverse_lazy
 from django.contrib.sites.shortcuts import get_current_site
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import EmailMessage, send_mail
+from django.core.mail import EmailMessage
 from django.utils.encoding import force_bytes, force_str
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils import timezone
 from django.conf import settings
 from django.contrib import messages
 
+from apps.core import recaptcha
+from apps.core.tasks import encolar_email
 from apps.orders.models import Carrito
 from .forms import RegistroForm
 from .models import UserProfile, EmailOTP
@@ -61,23 +62,15 @@ def _find_user_by_identifier(identifier):
 
 def _verify_recaptcha(request):
     """Valida el token de reCAPTCHA con Google."""
-    recaptcha_response = request.POST.get('g-recaptcha-response')
-    secret_key = getattr(settings, 'RECAPTCHA_PRIVATE_KEY', None)
-    if not secret_key:
+    resultado = recaptcha.verificar(request.POST.get('g-recaptcha-response'))
+    if resultado == recaptcha.SIN_CONFIGURAR:
         return False, 'El sitio no está configurado para reCAPTCHA.'
-    if not recaptcha_response:
+    if resultado == recaptcha.SIN_TOKEN:
         return False, 'Por favor completa el reCAPTCHA.'
-
-    data = {'secret': secret_key, 'response': recaptcha_response}
-    try:
-        r = requests.post('https://www.google.com/recaptcha/api/siteverify', data=data, timeout=10)
-        r.raise_for_status()
-        result = r.json()
-        if not result.get('success'):
-            return False, 'Verificación de CAPTCHA inválida. Inténtalo de nuevo.'
-    except requests.exceptions.RequestException:
+    if resultado == recaptcha.INVALIDO:
+        return False, 'Verificación de CAPTCHA inválida. Inténtalo de nuevo.'
+    if resultado == recaptcha.ERROR_CONEXION:
         return False, 'No se pudo conectar con el servicio reCAPTCHA.'
-
     return True, None
 
 
@@ -87,8 +80,8 @@ def _send_otp_email(user, code):
         f'Tu código de verificación es: {code}\n\n'
         'El código expira en 3 minutos. No compartas este código con nadie.'
     )
-    from_email = settings.DEFAULT_FROM_EMAIL
-    send_mail(subject, message, from_email, [user.email], fail_silently=False)
+    # El código vence en 3 minutos: pocos reintentos
+    encolar_email(subject, message, [user.email], max_intentos=3)
 
 
 def _create_pending_otp(request, user, next_url):
@@ -229,7 +222,9 @@ def logout_view(request):
 @login_required(login_url='auth:login')
 def perfil_view(request):
     """Vista del perfil de usuario."""
-    return render(request, 'auth/perfil.html')
+    # Los últimos pedidos se leen de una sola tabla (agregados desnormalizados en Pedido)
+    pedidos_recientes = list(request.user.pedidos.order_by('-creado_en')[:3])
+    return render(request, 'auth/perfil.html', {'pedidos_recientes': pedidos_recientes})
 
 
 class ForcedPasswordChangeView(auth_views.PasswordChangeView):
@@ -268,14 +263,14 @@ def signup_view(request):
                         is_active=False
                     )
 
-                    # Enviar email de activación
+                    # Encolar el email de activación (se envía al confirmar la transacción)
                     _send_activation_email(request, user)
 
                 messages.success(request, 'Cuenta creada exitosamente. Revisa tu correo para activar tu cuenta.')
                 return redirect('auth:login')
             except Exception as e:
                 logger.error(f"Error completo en el registro: {str(e)}")
-                errores = {'general': f'No se pudo enviar el correo de activación: {str(e)}'}
+                errores = {'general': f'No se pudo crear la cuenta: {str(e)}'}
                 return render(request, 'auth/registro.html', {
                     'errores': errores,
                     'username': request.POST.get('username'),
@@ -336,7 +331,7 @@ def activate_view(request, uidb64, token):
 
 
 def _send_activation_email(request, user):
-    """Envía el email de activación."""
+    """Encola el email de activación (lo envía `run_worker`)."""
     uid = urlsafe_base64_encode(force_bytes(user.pk))
     token = default_token_generator.make_token(user)
     activation_link = request.build_absolute_uri(
@@ -357,11 +352,4 @@ def _send_activation_email(request, user):
     El equipo de Aura Essence
     """
     
-    from_email = settings.DEFAULT_FROM_EMAIL
-    
-    logger.info(f"Intentando conectar a SMTP: Host={settings.EMAIL_HOST}, Puerto={settings.EMAIL_PORT}, Usuario={settings.EMAIL_HOST_USER}, TLS={settings.EMAIL_USE_TLS}")
-    try:
-        send_mail(subject, message, from_email, [user.email], fail_silently=False)
-    except Exception as e:
-        logger.error(f"Excepción al enviar el email: {str(e)}")
-        raise e
+    encolar_email(subject, message, [user.email])
@@ -41,6 +41,7 @@ INSTALLED_APPS = [
 SILENCED_SYSTEM_CHECKS = ['django_recaptcha.recaptcha_test_key_error']
 
 MIDDLEWARE = [
+    'apps.core.middleware.InstrumentacionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -92,9 +93,44 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            # Transacciones IMMEDIATE: las escrituras concurrentes (p. ej. checkout)
+            # esperan su turno en lugar de fallar con "database is locked"
+            'OPTIONS': {
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+            },
         }
     }
 
+# Caché: memoria local por defecto. Con varios workers conviene un backend
+# compartido: CACHE_BACKEND=file (CACHE_DIR) o CACHE_BACKEND=redis (REDIS_URL,
+# requiere el paquete `redis`; sirve cualquier servidor compatible).
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem').lower()
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_DIR', str(BASE_DIR / '.cache')),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'auraessence',
+        }
+    }
+
+# Segundos que viven las respuestas JSON cacheadas del catálogo
+CATALOGO_CACHE_TIMEOUT = int(os.getenv('CATALOGO_CACHE_TIMEOUT', '300'))
+
 LANGUAGE_CODE = 'es-es'
 TIME_ZONE = 'America/Mexico_City'
 USE_I18N = True
@@ -137,6 +173,8 @@ if not DEBUG:
         AWS_DEFAULT_ACL = None
         AWS_S3_SIGNATURE_VERSION = 's3v4'
         AWS_S3_ADDRESSING_STYLE = 'path'
+        # Endpoint alternativo (compatible con S3); para pruebas: `manage.py fake_s3`
+        AWS_S3_ENDPOINT_URL = os.getenv('AWS_S3_ENDPOINT_URL') or None
 
         STORAGES = {
             'default': {
@@ -221,6 +259,60 @@ EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
 EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'True').lower() == 'true'
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'noreply@auraessence.com')
 
+# Cola de tareas (apps.core.jobs): los correos se envían desde `manage.py run_worker`.
+# En modo sincrónico se ejecutan en el propio proceso al confirmar la transacción
+# (cómodo en desarrollo, sin worker).
+JOBS_SINCRONICO = os.getenv('JOBS_SINCRONICO', str(DEBUG)).lower() == 'true'
+
+# Proveedores de pago (apps.orders.payments / apps.orders.webhooks)
+STRIPE_PUBLIC_KEY = os.getenv('STRIPE_PUBLIC_KEY', '')
+STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY', '')
+STRIPE_WEBHOOK_SECRET = os.getenv('STRIPE_WEBHOOK_SECRET', '')
+# Solo para pruebas contra un servidor local que imite la API de Stripe
+STRIPE_API_BASE = os.getenv('STRIPE_API_BASE') or None
+MERCADOPAGO_ACCESS_TOKEN = os.getenv('MERCADOPAGO_ACCESS_TOKEN', '')
+MERCADOPAGO_PUBLIC_KEY = os.getenv('MERCADOPAGO_PUBLIC_KEY', 'TEST-3af62602-4fc4-4780-9989-13e87850a12e')
+MERCADOPAGO_POOL_SIZE = int(os.getenv('MERCADOPAGO_POOL_SIZE', '10'))
+# Segundos que se reutiliza la preferencia de un carrito sin cambios
+MERCADOPAGO_PREFERENCIA_TTL = int(os.getenv('MERCADOPAGO_PREFERENCIA_TTL', '1800'))
+# Solo para pruebas contra `manage.py fake_mercadopago`
+MERCADOPAGO_API_BASE = os.getenv('MERCADOPAGO_API_BASE') or None
+# Reconciliación de pagos (apps.orders.reconciliation): segundos que el estado
+# local responde sin consultar a Stripe, cada cuántos segundos se listan los
+# PaymentIntents mientras haya pagos pendientes y antigüedad máxima en días
+PAGOS_FRESCURA = int(os.getenv('PAGOS_FRESCURA', '15'))
+PAGOS_RECONCILIACION_INTERVALO = int(os.getenv('PAGOS_RECONCILIACION_INTERVALO', '60'))
+PAGOS_RECONCILIACION_DIAS = int(os.getenv('PAGOS_RECONCILIACION_DIAS', '3'))
+# Manifiesto local de `migrate_media_to_s3` (apps.core.media_s3): archivos ya subidos
+MEDIA_S3_MANIFIESTO = os.getenv('MEDIA_S3_MANIFIESTO', os.path.join(BASE_DIR, 'backups', 'media_s3.json'))
+# Instrumentación por request (apps.core.middleware): fracción de requests medidos (0 la
+# desactiva), umbral de request lento en ms y mediciones por vista para los percentiles.
+# Los percentiles combinan todos los procesos solo con una caché compartida (CACHE_BACKEND
+# redis o file); con locmem cada proceso reporta solo su propia ventana.
+METRICAS_MUESTREO = float(os.getenv('METRICAS_MUESTREO', '0.1'))
+METRICAS_LENTO_MS = float(os.getenv('METRICAS_LENTO_MS', '500'))
+METRICAS_VENTANA = int(os.getenv('METRICAS_VENTANA', '500'))
+# Header Server-Timing para todos los clientes; si no, solo para usuarios staff
+METRICAS_SERVER_TIMING = os.getenv('METRICAS_SERVER_TIMING', str(DEBUG)).lower() == 'true'
+# Versiones reducidas de las imágenes de producto (apps.catalog.imagenes): anchos en px y formatos
+IMAGENES_ANCHOS = [int(a) for a in os.getenv('IMAGENES_ANCHOS', '160,320,640').split(',')]
+IMAGENES_FORMATOS = os.getenv('IMAGENES_FORMATOS', 'webp').split(',')
+
+# Validación de correos con Hunter.io (apps.core.hunter)
+HUNTER_API_URL = os.getenv('HUNTER_API_URL', 'https://api.hunter.io/v2/email-verifier')
+HUNTER_TIMEOUT = (
+    float(os.getenv('HUNTER_CONNECT_TIMEOUT', '3')),
+    float(os.getenv('HUNTER_READ_TIMEOUT', '5')),
+)
+HUNTER_POOL_SIZE = int(os.getenv('HUNTER_POOL_SIZE', '10'))
+HUNTER_MAX_HILOS = int(os.getenv('HUNTER_MAX_HILOS', '4'))
+HUNTER_CACHE_DIAS = int(os.getenv('HUNTER_CACHE_DIAS', '30'))
+# Circuit breaker: fallos seguidos (o respuestas más lentas que el umbral, en
+# segundos) que lo abren, y segundos que permanece abierto
+HUNTER_UMBRAL_LENTO = float(os.getenv('HUNTER_UMBRAL_LENTO', '3'))
+HUNTER_CIRCUITO_FALLOS = int(os.getenv('HUNTER_CIRCUITO_FALLOS', '5'))
+HUNTER_CIRCUITO_ENFRIAMIENTO = int(os.getenv('HUNTER_CIRCUITO_ENFRIAMIENTO', '60'))
+
 # Configuración de reCAPTCHA
 # Si no se configuran en el .env, usamos las llaves de prueba oficiales de Google
 RECAPTCHA_PUBLIC_KEY = os.getenv(
@@ -231,3 +323,13 @@ RECAPTCHA_PRIVATE_KEY = os.getenv(
     'RECAPTCHA_PRIVATE_KEY', 
     '6LeIxAcTAAAAAGG-vFI1TnRWxMZNFuojJ4WifJWe' if DEBUG else ''
 )
+
+# Verificación (apps.core.recaptcha): 'google' o 'stub' (sin red, para pruebas)
+RECAPTCHA_BACKEND = os.getenv('RECAPTCHA_BACKEND', 'google').lower()
+RECAPTCHA_TIMEOUT = (
+    float(os.getenv('RECAPTCHA_CONNECT_TIMEOUT', '3')),
+    float(os.getenv('RECAPTCHA_READ_TIMEOUT', '5')),
+)
+RECAPTCHA_POOL_SIZE = int(os.getenv('RECAPTCHA_POOL_SIZE', '10'))
+# Segundos que se recuerda un token rechazado (los aceptados no se cachean: son de un solo uso)
+RECAPTCHA_CACHE_TTL = int(os.getenv('RECAPTCHA_CACHE_TTL', '30'))
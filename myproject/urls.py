@@ -12,6 +12,7 @@ from apps.core import views as core_views
 from apps.api import views as api_views
 
 urlpatterns = [
+    path('admin/metricas/', core_views.metricas_view, name='metricas'),
     path('admin/', admin.site.urls),
     path('api-auth/', include('rest_framework.urls')),
     